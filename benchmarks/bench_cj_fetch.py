@@ -0,0 +1,236 @@
+"""
+Benchmark: concurrent CJ product fetch against a local stub CJ API
+
+Starts a stub of the CJdropshipping endpoints fetch_cjdropshipping_to_csv.py
+uses (access token, product list with pageNum/pageSize/total, category
+tree) that adds per-request latency, answers HTTP 429 when more than
+--server-rate requests arrive within one second, and fails requests with
+HTTP 503 at a configurable rate. Then points the fetcher at it through
+CJ_API_ENDPOINT and pulls the first 6,000 rows with fetch_all_pages() for
+each concurrency / rate ceiling combination, reporting the time taken,
+requests and retries, the peak request rate the stub saw, and whether every
+row arrived exactly once.
+
+Usage:
+    python benchmarks/bench_cj_fetch.py [--concurrency 1 6 12] [--rate 5 20]
+        [--latency 0.2] [--error-rate 0.02] [--server-rate 0]
+    python benchmarks/bench_cj_fetch.py --serve 8767
+        (then set CJ_API_ENDPOINT=http://127.0.0.1:8767/api2.0/v1)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+API_PREFIX = "/api2.0/v1"
+
+
+class StubCJHandler(BaseHTTPRequestHandler):
+    """CJ API handler; behaviour is configured on the server object."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == f"{API_PREFIX}/authentication/getAccessToken":
+            self._reply(200, {"code": 200, "data": {
+                "accessToken": "stub-token", "accessTokenExpiryDate": "2099-01-01T00:00:00+00:00",
+            }})
+        else:
+            self._reply(404, {"code": 404, "message": "not found"})
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        time.sleep(server.latency)
+
+        with server.lock:
+            now = time.monotonic()
+            server.request_times.append(now)
+            window = server.window
+            window.append(now)
+            while window and now - window[0] >= 1.0:
+                window.popleft()
+            throttled = bool(server.rate_limit) and len(window) > server.rate_limit
+            page_num = int(query.get("pageNum", 1))
+            forced = server.fail_pages.get(page_num)
+            if forced:
+                status = forced.pop(0)
+                if not forced:
+                    del server.fail_pages[page_num]
+            elif throttled:
+                status = 429
+            elif server.rng.random() < server.error_rate:
+                status = 503
+            else:
+                status = 200
+            if status != 200:
+                server.errors[status] += 1
+
+        if self.headers.get("CJ-Access-Token") != "stub-token":
+            self._reply(401, {"code": 401, "message": "invalid token"})
+        elif status != 200:
+            self._reply(status, {"code": status, "message": "stub error"})
+        elif url.path == f"{API_PREFIX}/product/list":
+            page_size = int(query.get("pageSize", 20))
+            first = (page_num - 1) * page_size
+            matching = range(server.total)
+            if "createTimeFrom" in query:
+                matching = [i for i in matching if server.create_time(i) >= query["createTimeFrom"]]
+            rows = [server.product(i) for i in matching[first:first + page_size]]
+            with server.lock:
+                server.served.update(row["pid"] for row in rows)
+            self._reply(200, {"code": 200, "data": {
+                "pageNum": page_num, "pageSize": page_size, "total": len(matching), "list": rows,
+            }})
+        elif url.path == f"{API_PREFIX}/product/getCategory":
+            self._reply(200, {"code": 200, "data": [{"categoryFirstList": [{"categorySecondList": [
+                {"categoryId": "stub-category", "categoryName": "Stub category"},
+            ]}]}]})
+        else:
+            self._reply(404, {"code": 404, "message": "not found"})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+STUB_CREATE_TIME = "2024-01-01 00:00:00"
+
+
+def stub_product(i, create_time=STUB_CREATE_TIME):
+    """A product list entry shaped like CJ's."""
+    return {
+        "pid": f"STUB{1000000 + i}",
+        "productNameEn": f"Stub product {i}",
+        "sellPrice": f"{1 + i % 90}.50",
+        "productImage": f"https://example.com/{i}.jpg",
+        "categoryId": "stub-category",
+        "categoryName": "Stub category",
+        "createTime": create_time,
+    }
+
+
+def start_stub_cj_server(port=0, total=10000, latency=0.0, error_rate=0.0, rate_limit=0,
+                         fail_pages=None, seed=0):
+    """
+    Start the stub CJ API on a daemon thread; return the server.
+
+    fail_pages maps a page number to the HTTP statuses its first requests
+    get (e.g. {3: [429, 503]}) before it is served normally. Products are
+    created at STUB_CREATE_TIME unless server.created maps their index to
+    another "%Y-%m-%d %H:%M:%S" time; createTimeFrom filters on it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubCJHandler)
+    server.daemon_threads = True
+    server.total = total
+    server.latency = latency
+    server.error_rate = error_rate
+    server.rate_limit = rate_limit
+    server.fail_pages = {page: list(statuses) for page, statuses in (fail_pages or {}).items()}
+    server.created = {}
+    server.create_time = lambda i: server.created.get(i, STUB_CREATE_TIME)
+    server.product = lambda i: stub_product(i, server.create_time(i))
+    server.rng = random.Random(seed)
+    server.lock = threading.Lock()
+    server.window = deque()
+    server.request_times = []
+    server.errors = Counter()
+    server.served = Counter()
+    server.endpoint = f"http://127.0.0.1:{server.server_address[1]}{API_PREFIX}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def peak_rate(request_times, window=1.0):
+    """Most requests that started within any `window` seconds."""
+    times = sorted(request_times)
+    peak, start = 0, 0
+    for end, t in enumerate(times):
+        while t - times[start] >= window:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+def reset(server):
+    with server.lock:
+        server.window.clear()
+        server.request_times.clear()
+        server.errors.clear()
+        server.served.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--total", type=int, default=10000, help="products the stub reports")
+    parser.add_argument("--rows", type=int, default=6000, help="rows to pull (the CJ offset cap)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 6, 12])
+    parser.add_argument("--rate", type=float, nargs="+", default=[5, 20],
+                        help="client rate ceilings (requests/second)")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of requests failing with 503")
+    parser.add_argument("--server-rate", type=int, default=0,
+                        help="stub requests/second before 429 (0 = unlimited)")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="only run the stub on PORT")
+    args = parser.parse_args()
+
+    server = start_stub_cj_server(args.serve or 0, args.total, args.latency,
+                                  args.error_rate, args.server_rate)
+    if args.serve:
+        print(f"Stub CJ API: {server.endpoint} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return
+
+    tmp = tempfile.mkdtemp()
+    os.environ["CJ_API_ENDPOINT"] = server.endpoint
+    os.environ["CJ_TOKEN_STATE_FILE"] = os.path.join(tmp, "cj_token.json")
+    os.chdir(tmp)  # the fetcher logs to fetch_cjdropshipping.log in the working directory
+    import fetch_cjdropshipping_to_csv as cj
+
+    print(f"Pulling {args.rows} of {args.total} rows, {args.latency * 1000:.0f} ms/request, "
+          f"{args.error_rate:.0%} 503s, stub limit "
+          f"{args.server_rate or 'none'}{'/s' if args.server_rate else ''}")
+    print(f"{'workers':>8} {'ceiling/s':>10} {'seconds':>8} {'rows/s':>7} {'requests':>9} "
+          f"{'errors':>7} {'peak/s':>7} {'failed':>7}  complete")
+    for rate in args.rate:
+        for concurrency in args.concurrency:
+            reset(server)
+            session = cj.create_session(concurrency)
+            limiter = cj.RateLimiter(rate)
+            failed = []
+            start = time.perf_counter()
+            rows = sum(len(page) for _, page in cj.fetch_all_pages(
+                max_offset=args.rows, concurrency=concurrency, session=session,
+                limiter=limiter, failed_pages=failed,
+            ))
+            elapsed = time.perf_counter() - start
+            complete = (rows == min(args.rows, args.total) and not failed
+                        and len(server.served) == rows and max(server.served.values()) == 1)
+            print(f"{concurrency:>8} {rate:>10g} {elapsed:>8.2f} {rows / elapsed:>7.0f} "
+                  f"{len(server.request_times):>9} {sum(server.errors.values()):>7} "
+                  f"{peak_rate(server.request_times):>7} {len(failed):>7}  {'yes' if complete else 'NO'}")
+            session.close()
+
+
+if __name__ == "__main__":
+    main()
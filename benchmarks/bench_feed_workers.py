@@ -0,0 +1,80 @@
+"""
+Benchmark: UCP feed generation throughput vs. worker count
+
+Builds a large input CSV by repeating feed.csv with unique product IDs, then
+times generate_ucp_enhanced_feed() for each worker count and checks that the
+output is byte-identical to the single-process run.
+
+Usage:
+    python benchmarks/bench_feed_workers.py [--rows 120000] [--workers 1 2 4 8]
+"""
+
+import argparse
+import csv
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_gmc_feed import generate_ucp_enhanced_feed  # noqa: E402
+
+
+def build_input(source_csv, target_csv, rows):
+    """Write `rows` rows cycling through source_csv with unique product IDs."""
+    with open(source_csv, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        template = list(reader)
+
+    with open(target_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for i in range(rows):
+            row = dict(template[i % len(template)])
+            row["url"] = f"https://app.cjdropshipping.com/product-detail/{9000000000000000000 + i}"
+            writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=120000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--source", default="feed.csv")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_csv = os.path.join(tmp, "input.csv")
+        build_input(args.source, input_csv, args.rows)
+        size_mb = os.path.getsize(input_csv) / 1e6
+        print(f"Input: {args.rows} rows, {size_mb:.1f} MB")
+        print(f"{'workers':>8} {'seconds':>9} {'rows/sec':>10} {'speedup':>8}  identical")
+
+        baseline_path = None
+        baseline_seconds = None
+        for workers in args.workers:
+            output_tsv = os.path.join(tmp, f"out_{workers}.tsv")
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    count = generate_ucp_enhanced_feed(
+                        input_csv, output_tsv, "NGN", workers=workers
+                    )
+                finally:
+                    sys.stdout = stdout
+            elapsed = time.perf_counter() - start
+
+            if baseline_path is None:
+                baseline_path, baseline_seconds = output_tsv, elapsed
+            identical = filecmp.cmp(baseline_path, output_tsv, shallow=False)
+            print(
+                f"{workers:>8} {elapsed:>9.2f} {count / elapsed:>10.0f} "
+                f"{baseline_seconds / elapsed:>7.2f}x  {'yes' if identical else 'NO'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
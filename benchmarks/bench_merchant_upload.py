@@ -0,0 +1,301 @@
+"""
+Benchmark: Merchant Center batch upload against a local fake endpoint
+
+Starts a fake custombatch endpoint (Content API `products/batch` shape) that
+adds per-request latency, fails whole batches with HTTP 503 and single
+entries with transient backendError at configurable rates, and rejects
+inserts missing offerId, channel, contentLanguage, targetCountry or title,
+and deletes whose productId is not the REST ID of a product it was sent. Then uploads synthetic products with
+MerchantBatchUploader for each batch size / concurrency combination and
+checks that every valid product was accepted exactly once and every invalid
+one was reported as failed.
+
+--server-quota makes the endpoint answer 429 RESOURCE_EXHAUSTED beyond that
+many requests per minute, and --client-quota gives the uploader a
+MerchantQuotaLimiter with that budget, to check that it adapts.
+
+A delta scenario follows: a full push with a MerchantShadowStore, then a
+second sync after changing and removing a share of the products, which must
+send only those changes and leave the fake catalog equal to the feed, then
+a sync of a truncated feed, which must not delete anything.
+
+Usage:
+    python benchmarks/bench_merchant_upload.py [--products 20000]
+        [--batch-sizes 50 250 1000] [--concurrency 1 4 8]
+    python benchmarks/bench_merchant_upload.py --serve 8766
+        (then set MERCHANT_API_UPLOAD_ENDPOINT=http://127.0.0.1:8766/products/batch)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.merchant_quota import MerchantQuotaLimiter  # noqa: E402
+from src.merchant_upload import (  # noqa: E402
+    MerchantBatchUploader,
+    MerchantShadowStore,
+    product_rest_id,
+)
+
+# Attributes a Content API insert cannot do without
+REQUIRED_PRODUCT_FIELDS = ("offerId", "channel", "contentLanguage", "targetCountry", "title")
+
+
+class FakeMerchantHandler(BaseHTTPRequestHandler):
+    """custombatch handler; behaviour is configured on the server object."""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        entries = body.get("entries", [])
+        time.sleep(server.latency + server.item_latency * len(entries))
+
+        with server.lock:
+            server.requests += 1
+            now = time.monotonic()
+            over_quota = False
+            if server.quota_per_minute:
+                # Token bucket holding one second of quota
+                capacity = server.quota_per_minute / 60
+                server.quota_tokens = min(capacity, server.quota_tokens
+                                          + (now - server.quota_updated) * capacity)
+                server.quota_updated = now
+                if server.quota_tokens < 1:
+                    over_quota = True
+                    server.throttled += 1
+                else:
+                    server.quota_tokens -= 1
+            fail_batch = not over_quota and server.rng.random() < server.batch_error_rate
+        if over_quota:
+            self._reply(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED",
+                                        "message": "Quota exceeded"}}, {"Retry-After": "1"})
+            return
+        if fail_batch:
+            self._reply(503, {"error": {"code": 503, "message": "Backend Error"}})
+            return
+
+        responses = []
+        for entry in entries:
+            product = entry.get("product", {})
+            deleting = entry.get("method") == "delete"
+            rest_id = entry.get("productId", "")
+            missing = None if deleting else next(
+                (field for field in REQUIRED_PRODUCT_FIELDS if not product.get(field)), None)
+            with server.lock:
+                transient = server.rng.random() < server.item_error_rate
+                if transient:
+                    pass
+                elif deleting:
+                    known = rest_id in server.inserted
+                    found = server.catalog.pop(rest_id, None) is not None
+                elif missing is None:
+                    rest_id = product_rest_id(product)
+                    server.inserted.add(rest_id)
+                    server.accepted[rest_id] += 1
+                    server.catalog[rest_id] = product
+            if transient:
+                responses.append(_error_entry(entry, 503, "backendError", "Backend Error"))
+            elif deleting and not known:
+                # Not the REST ID of anything inserted: the uploader named it wrongly
+                responses.append(_error_entry(entry, 400, "invalid", f"Invalid productId: {rest_id}"))
+            elif deleting:
+                responses.append({"batchId": entry["batchId"]} if found
+                                 else _error_entry(entry, 404, "notFound", "item not found"))
+            elif missing:
+                responses.append(_error_entry(entry, 400, "invalid", f"Required parameter: {missing}"))
+            else:
+                responses.append({"batchId": entry["batchId"], "product": {**product, "id": rest_id}})
+        self._reply(200, {"kind": "content#productsCustomBatchResponse", "entries": responses})
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _error_entry(entry, code, reason, message):
+    """A custombatch response entry carrying a per-item error."""
+    return {"batchId": entry["batchId"], "errors": {
+        "code": code, "message": message, "errors": [{"reason": reason, "message": message}],
+    }}
+
+
+def start_fake_server(port=0, latency=0.05, item_latency=0.0001,
+                      batch_error_rate=0.02, item_error_rate=0.01, seed=0,
+                      quota_per_minute=0):
+    """Start the fake endpoint on a daemon thread; return the server."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeMerchantHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.item_latency = item_latency
+    server.batch_error_rate = batch_error_rate
+    server.item_error_rate = item_error_rate
+    server.rng = random.Random(seed)
+    server.lock = threading.Lock()
+    server.accepted = Counter()
+    server.catalog = {}
+    server.inserted = set()  # every REST ID ever inserted, for validating deletes
+    server.requests = 0
+    server.throttled = 0
+    server.quota_per_minute = quota_per_minute
+    server.quota_tokens = quota_per_minute / 60
+    server.quota_updated = time.monotonic()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def synthesize_products(count, invalid_rate=0.001, seed=0):
+    """Feed rows as generate_gmc_feed.py writes them; some lack a title."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": f"CJ{2500000000000000000 + i}",
+            "title": "" if rng.random() < invalid_rate else f"Synthetic product {i}",
+            "description": "Synthetic product description " * 8,
+            "link": f"https://example.com/p/{i}",
+            "image_link": f"https://example.com/i/{i}.jpg",
+            "price": f"{rng.uniform(1, 90):.2f} NGN",
+            "availability": "in stock",
+            "gtin": f"{i:012d}",
+            "condition": "new",
+        })
+    return rows
+
+
+def _limiter(args):
+    return MerchantQuotaLimiter(args.client_quota, burst=5) if args.client_quota else None
+
+
+def run_delta(server, endpoint, session, rows, args, convert):
+    """Full push with a shadow store, then a sync of a churned copy of rows."""
+    rng = random.Random(1)
+    valid_rows = [row for row in rows if row["title"]]
+    removed = {row["id"] for row in rng.sample(valid_rows, int(len(rows) * args.churn / 2))}
+    churned = [dict(row) for row in rows if row["id"] not in removed]
+    changed = rng.sample([row for row in churned if row["title"]], int(len(rows) * args.churn))
+    for row in changed:
+        row["price"] = f"{float(row['price'].split()[0]) + 1:.2f} NGN"
+
+    print(f"\nDelta sync: {len(changed)} changed, {len(removed)} removed")
+    print(f"{'run':>6} {'seconds':>8} {'sent':>7} {'skipped':>8} {'inserted':>9} "
+          f"{'updated':>8} {'deleted':>8} {'failed':>7}  verified")
+    with tempfile.TemporaryDirectory() as tmp:
+        shadow = MerchantShadowStore(os.path.join(tmp, "merchant_shadow.json"))
+        uploader = MerchantBatchUploader(
+            "123456", endpoint=endpoint, concurrency=max(args.concurrency),
+            backoff_seconds=args.backoff, max_retries=8, session=session,
+            limiter=_limiter(args),
+        )
+        server.catalog.clear()
+        # A feed cut short (e.g. a partial CJ pull) must not delete the rest
+        truncated = churned[:len(churned) // 10]
+        for name, feed in (("full", rows), ("delta", churned), ("trunc", truncated)):
+            stats = uploader.upload(feed, convert=convert, shadow=shadow, source="feed.tsv")
+            if name != "trunc":
+                expected = {product_rest_id(p): p for p in map(convert, feed) if p["title"]}
+            verified = server.catalog == expected
+            if name == "delta":
+                verified = verified and (stats["inserted"], stats["updated"], stats["deleted"]) == (
+                    0, len(changed), len(removed))
+            elif name == "trunc":
+                verified = verified and stats["deleted"] == 0 and stats["deletes_skipped"] > 0
+            print(f"{name:>6} {stats['duration_seconds']:>8.2f} {stats['products_sent']:>7} "
+                  f"{stats['products_skipped']:>8} {stats['inserted']:>9} {stats['updated']:>8} "
+                  f"{stats['deleted']:>8} {stats['products_failed']:>7}  {'yes' if verified else 'NO'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[50, 250, 1000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="fake endpoint seconds per request")
+    parser.add_argument("--batch-error-rate", type=float, default=0.02)
+    parser.add_argument("--item-error-rate", type=float, default=0.01)
+    parser.add_argument("--backoff", type=float, default=0.05,
+                        help="uploader retry backoff base in seconds")
+    parser.add_argument("--server-quota", type=float, default=0,
+                        help="fake endpoint requests/minute before 429 (0 = unlimited)")
+    parser.add_argument("--client-quota", type=float, default=0,
+                        help="uploader quota limiter requests/minute (0 = no limiter)")
+    parser.add_argument("--churn", type=float, default=0.01,
+                        help="share of products changed (and half as many removed) for the delta run")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="only run the fake endpoint on PORT")
+    args = parser.parse_args()
+
+    server = start_fake_server(
+        args.serve or 0, args.latency, batch_error_rate=args.batch_error_rate,
+        item_error_rate=args.item_error_rate, quota_per_minute=args.server_quota,
+    )
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/products/batch"
+    if args.serve:
+        print(f"Fake Merchant endpoint: {endpoint} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return
+
+    from src.merchant_api import MerchantAPIClient
+
+    convert = MerchantAPIClient._convert_to_merchant_format
+    rows = synthesize_products(args.products)
+    valid = {product_rest_id(convert(row)) for row in rows if row["title"]}
+    print(f"{args.products} products ({args.products - len(valid)} invalid), "
+          f"{args.latency * 1000:.0f} ms/request, {args.batch_error_rate:.0%} batch and "
+          f"{args.item_error_rate:.0%} item transient errors")
+    print(f"{'batch':>6} {'workers':>8} {'seconds':>8} {'products/s':>11} {'requests':>9} "
+          f"{'retries':>8} {'429s':>6} {'failed':>7}  verified")
+
+    # A plain session: the fake endpoint needs no Google credentials
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=max(args.concurrency)))
+
+    for batch_size in args.batch_sizes:
+        for concurrency in args.concurrency:
+            server.accepted.clear()
+            server.throttled = 0
+            uploader = MerchantBatchUploader(
+                "123456", endpoint=endpoint, batch_size=batch_size,
+                concurrency=concurrency, backoff_seconds=args.backoff,
+                max_retries=8, session=session, limiter=_limiter(args),
+            )
+            stats = uploader.upload(rows, convert=convert)
+            verified = (
+                set(server.accepted) == valid
+                and all(n == 1 for n in server.accepted.values())
+                and stats["products_synced"] == len(valid)
+                and stats["products_failed"] == args.products - len(valid)
+            )
+            print(f"{batch_size:>6} {concurrency:>8} {stats['duration_seconds']:>8.2f} "
+                  f"{stats['products_per_sec']:>11.0f} {stats['requests']:>9} "
+                  f"{stats['retries']:>8} {server.throttled:>6} {stats['products_failed']:>7}  "
+                  f"{'yes' if verified else 'NO'}")
+
+    run_delta(server, endpoint, session, rows, args, convert)
+
+
+if __name__ == "__main__":
+    main()
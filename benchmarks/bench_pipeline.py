@@ -0,0 +1,347 @@
+"""
+Benchmark: feed and catalog pipeline throughput, memory and latency
+
+Synthesizes feeds in the shape of feed.csv (CJK JSON-array descriptions,
+single and range prices, CJ product-detail URLs) and measures, per feed size:
+
+    generate        generate_ucp_enhanced_feed() rows/sec
+    catalog_csv     ProductCatalog parsing the CSV into memory
+    catalog_build   building the columnar catalog (feed.catalog)
+    catalog_mapped  opening the existing columnar catalog
+    search          GET /products?search=...&limit=50 latency
+    lookup          GET /product?id=... latency
+
+Each stage runs in a fresh process, so peak_rss_mb is that stage's own peak
+(baseline_rss_mb is the interpreter plus imports, before any work). Results
+are written as JSON so runs can be diffed between commits.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 6000 60000 600000]
+        [--stages generate search ...] [--output results.json]
+        [--compare baseline.json]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Windows
+    resource = None
+    RESOURCE_AVAILABLE = False
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+STAGES = (
+    "generate", "catalog_csv", "catalog_build", "catalog_mapped",
+    "search", "lookup",
+)
+DEFAULT_SIZES = (6000, 60000, 600000)
+
+FEED_FIELDS = [
+    "title", "image", "price", "url", "description", "brand", "rating",
+    "stock", "category", "shipping",
+]
+
+# Vocabulary for synthetic rows; search queries are drawn from the same words
+TITLE_WORDS = (
+    "women's men's children's summer winter casual sports fashion vintage "
+    "leather cotton silk wireless portable waterproof mini smart led "
+    "shirt dress watch bag shoes jacket hoodie earrings necklace ring "
+    "headphones charger lamp mug bottle toy gloves costume outfit set "
+    "chain quartz mechanical festival party travel kitchen pet garden"
+).split()
+CATEGORIES = (
+    "Suits & Sets", "Dress Watches", "Boy Clothing Sets", "Earrings",
+    "Necklaces", "Women's Shoes", "Men's Jackets", "Home Decor",
+    "Kitchen Tools", "Pet Supplies", "Phone Accessories", "Toys & Games",
+)
+CJK_CHARS = (
+    "长袖女士衬衫套装都市个性潮牌数码印花休闲女装天然高级链虎眼石美拉德色系"
+    "手表儿童太空服万圣节表演宇航员手套节日派对演出扮演时尚新款运动夏季冬季"
+)
+
+
+def synthesize_feed(path, rows, seed=0):
+    """Write a feed.csv-shaped file with `rows` deterministic synthetic products."""
+    rng = random.Random(seed)
+
+    def phrase(low, high):
+        return "".join(rng.choice(CJK_CHARS) for _ in range(rng.randint(low, high)))
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FEED_FIELDS)
+        writer.writeheader()
+        for i in range(rows):
+            title = " ".join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(3, 12)))
+            low = rng.uniform(0.5, 80)
+            if rng.random() < 0.3:
+                price = f"{low:.2f} -- {low * rng.uniform(1.05, 2.5):.2f}"
+            else:
+                price = f"{low:.2f}"
+            keywords = [phrase(2, 30) for _ in range(rng.randint(1, 5))]
+            if rng.random() < 0.1:
+                keywords.append(str(rng.randint(1, 999)))
+            if rng.random() < 0.05:
+                keywords.append("cosplay")
+            writer.writerow({
+                "title": title.title(),
+                "image": f"https://cf.cjdropshipping.com/quick/product/{rng.getrandbits(128):032x}.jpg",
+                "price": price,
+                "url": f"https://app.cjdropshipping.com/product-detail/{2500000000000000000 + i}",
+                "description": json.dumps(keywords, ensure_ascii=False),
+                "brand": "",
+                "rating": "",
+                "stock": "",
+                "category": rng.choice(CATEGORIES),
+                "shipping": "",
+            })
+
+
+def _peak_rss_mb():
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def _percentiles(latencies):
+    ordered = sorted(latencies)
+
+    def rank(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "p50_ms": round(rank(0.50) * 1000, 3),
+        "p99_ms": round(rank(0.99) * 1000, 3),
+        "requests_per_sec": round(len(ordered) / sum(ordered), 1),
+    }
+
+
+def _throughput(count, elapsed):
+    return {"seconds": round(elapsed, 4), "rows_per_sec": round(count / elapsed, 1)}
+
+
+def _stage_generate(workdir, rows, args):
+    from generate_gmc_feed import generate_ucp_enhanced_feed
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            count = generate_ucp_enhanced_feed(
+                os.path.join(workdir, "feed.csv"),
+                os.path.join(workdir, "feed.tsv"),
+                "NGN",
+            )
+        finally:
+            sys.stdout = stdout
+    elapsed = time.perf_counter() - start
+    return baseline, _throughput(count, elapsed)
+
+
+def _stage_catalog(workdir, rows, mapped, remove_existing):
+    from src.catalog import ProductCatalog
+    from src.columnar_catalog import catalog_path_for
+
+    feed_path = os.path.join(workdir, "feed.csv")
+    if remove_existing and os.path.exists(catalog_path_for(feed_path)):
+        os.remove(catalog_path_for(feed_path))
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    catalog = ProductCatalog(feed_path, mapped=mapped)
+    count = len(catalog.products())
+    elapsed = time.perf_counter() - start
+    if mapped and not catalog.mapped:
+        raise RuntimeError("columnar catalog could not be used")
+    return baseline, _throughput(count, elapsed)
+
+
+def _api_client(workdir):
+    # The API reads feed.csv (and admin_creds.json) from the working directory
+    # at import time
+    os.chdir(workdir)
+    admin_creds = os.path.join(workdir, "admin_creds.json")
+    if not os.path.exists(admin_creds):
+        with open(admin_creds, "w") as f:
+            json.dump({"username": "admin", "password_hash": ""}, f)
+    from netlify.functions.api.api import app
+    return app.test_client()
+
+
+def _timed_requests(client, urls):
+    # One warm-up request so catalog loading is not counted as latency
+    client.get(urls[0])
+    latencies = []
+    for url in urls:
+        start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} -> HTTP {response.status_code}")
+    return latencies
+
+
+def _stage_search(workdir, rows, args):
+    client = _api_client(workdir)
+    rng = random.Random(args.seed)
+    urls = [
+        "/products?limit=50&search="
+        + "+".join(rng.sample(TITLE_WORDS, rng.randint(1, 2)))
+        for _ in range(args.queries)
+    ]
+    baseline = _peak_rss_mb()
+    return baseline, _percentiles(_timed_requests(client, urls))
+
+
+def _stage_lookup(workdir, rows, args):
+    client = _api_client(workdir)
+    rng = random.Random(args.seed)
+    urls = [
+        f"/product?id={2500000000000000000 + rng.randrange(rows)}"
+        for _ in range(args.queries)
+    ]
+    baseline = _peak_rss_mb()
+    return baseline, _percentiles(_timed_requests(client, urls))
+
+
+_STAGE_FUNCTIONS = {
+    "generate": _stage_generate,
+    "catalog_csv": lambda workdir, rows, args: _stage_catalog(workdir, rows, False, False),
+    "catalog_build": lambda workdir, rows, args: _stage_catalog(workdir, rows, True, True),
+    "catalog_mapped": lambda workdir, rows, args: _stage_catalog(workdir, rows, True, False),
+    "search": _stage_search,
+    "lookup": _stage_lookup,
+}
+
+
+def _stage_worker(stage, workdir, rows, args, queue):
+    # Keep the API's import-time warnings and per-request logging out of the
+    # timings and the report
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore")
+    try:
+        baseline, metrics = _STAGE_FUNCTIONS[stage](workdir, rows, args)
+        metrics["baseline_rss_mb"] = baseline
+        metrics["peak_rss_mb"] = _peak_rss_mb()
+        queue.put(metrics)
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_stage(stage, workdir, rows, args):
+    """Run one stage in a fresh process and return its metrics."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_stage_worker, args=(stage, workdir, rows, args, queue))
+    process.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except queue_module.Empty:
+            if not process.is_alive():
+                result = {"error": f"stage process exited with code {process.exitcode}"}
+                break
+    process.join()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path, results):
+    """Print the relative change of every metric against a previous run."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')})")
+    print(f"{'stage':<15} {'rows':>8} {'metric':<17} {'before':>11} {'after':>11} {'change':>8}")
+    for result in results:
+        before = previous.get((result["stage"], result["rows"]))
+        if before is None:
+            continue
+        for metric, value in result.items():
+            old = before.get(metric)
+            if metric in ("stage", "rows") or not isinstance(value, (int, float)) \
+                    or not isinstance(old, (int, float)):
+                continue
+            change = f"{(value - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{result['stage']:<15} {result['rows']:>8} {metric:<17} "
+                  f"{old:>11} {value:>11} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--queries", type=int, default=500,
+                        help="requests per search/lookup stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous --output file to diff against")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'stage':<15} {'rows':>8}  metrics")
+    for rows in args.sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            synthesize_feed(os.path.join(workdir, "feed.csv"), rows, args.seed)
+            # catalog_mapped opens the file catalog_build writes
+            for stage in sorted(args.stages, key=STAGES.index):
+                if stage == "catalog_mapped" and "catalog_build" not in args.stages:
+                    run_stage("catalog_build", workdir, rows, args)
+                metrics = run_stage(stage, workdir, rows, args)
+                result = {"stage": stage, "rows": rows, **metrics}
+                results.append(result)
+                print(f"{stage:<15} {rows:>8}  "
+                      + ", ".join(f"{k}={v}" for k, v in metrics.items()))
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "queries": args.queries,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: API cold-start time and import cost per module
+
+Imports server.py (and with it the Flask API) in a fresh interpreter under
+`python -X importtime`, then reports the wall time of the import, the modules
+with the highest cumulative import cost, and whether any of the dependencies
+the API loads on first use (Gemini, matplotlib, reportlab) were pulled in at
+startup anyway.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 25] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by /admin/inventory-dashboard, invoices and the tag generator
+LAZY_MODULES = ("google.generativeai", "matplotlib", "reportlab")
+
+_PROBE = "import sys, {target}; print('\\n'.join(sys.modules))"
+
+
+def measure_once(target):
+    """Import target once; return (wall seconds, importtime rows, modules loaded)."""
+    code = _PROBE.format(target=target)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {target} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({
+            "module": name.strip(),
+            "depth": depth,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    loaded = set(proc.stdout.split())
+    return elapsed, rows, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", default="server", help="module to import")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    runs = [measure_once(args.target) for _ in range(args.repeat)]
+    walls = sorted(run[0] for run in runs)
+    # Report the per-module breakdown of the median run
+    _, rows, loaded = sorted(runs, key=lambda run: run[0])[len(runs) // 2]
+
+    print(f"import {args.target}: median {statistics.median(walls) * 1000:.0f} ms, "
+          f"min {walls[0] * 1000:.0f} ms over {len(walls)} runs (includes interpreter start)")
+    print(f"\n{'cumulative ms':>13} {'self ms':>9}  module")
+    top = sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)[:args.top]
+    for row in top:
+        print(f"{row['cumulative_ms']:>13.1f} {row['self_ms']:>9.1f}  "
+              f"{'  ' * row['depth']}{row['module']}")
+
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    print("\nLoaded on first use only: "
+          + ("yes" if not eager else f"NO, imported at startup: {', '.join(eager)}"))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "target": args.target,
+                "wall_ms": [round(w * 1000, 1) for w in walls],
+                "eager_lazy_modules": eager,
+                "modules": top,
+            }, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 1 if eager else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
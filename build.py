@@ -2,13 +2,15 @@ import os
 import shutil
 import subprocess
 
+from src.compression import BROTLI_AVAILABLE, precompress_tree
 
-def run_script(script_name):
+
+def run_script(script_name, *args):
     """Runs a Python script and checks for errors."""
     try:
         print(f"--- Running {script_name} ---")
         subprocess.run(
-            ["python", script_name], check=True, text=True, capture_output=True
+            ["python", script_name, *args], check=True, text=True, capture_output=True
         )
         print(f"--- Finished {script_name} ---")
     except subprocess.CalledProcessError as e:
@@ -47,6 +49,13 @@ def copy_files():
                 shutil.copy(file_name, os.path.join(output_dir, file_name))
                 print(f"Copied {file_name} to {os.path.join(output_dir, file_name)}")
 
+    # Copy the public feed so it is served (and precompressed) with the site.
+    # gmc_product_feed.tsv is the Merchant Center upload and stays out of site/.
+    for file_name in ["feed.csv"]:
+        if os.path.exists(file_name):
+            shutil.copy(file_name, os.path.join(output_dir, file_name))
+            print(f"Copied {file_name} to {os.path.join(output_dir, file_name)}")
+
     # Copy static assets directory
     if os.path.exists(static_dir):
         shutil.copytree(
@@ -57,6 +66,15 @@ def copy_files():
     print("--- Finished copying files ---")
 
 
+def precompress_files():
+    """Writes .gz (and .br, if brotli is installed) siblings for text files in site/."""
+    print("--- Precompressing site files ---")
+    written = precompress_tree("site")
+    encodings = "gzip + brotli" if BROTLI_AVAILABLE else "gzip"
+    print(f"Wrote {written} precompressed files ({encodings})")
+    print("--- Finished precompressing site files ---")
+
+
 def main():
     """Main build function."""
     try:
@@ -64,11 +82,14 @@ def main():
         run_script("generate_blog.py")
         # Phase 2: generate_gmc_feed.py now creates UCP-enhanced feeds by default
         # (Use --legacy flag to generate standard GMC feeds for backwards compatibility)
-        run_script("generate_gmc_feed.py")
+        # --incremental reuses unchanged rows from the last build and writes
+        # gmc_product_feed.tsv.delta.json with added/changed/removed IDs
+        run_script("generate_gmc_feed.py", "--incremental")
         run_script("generate_rss.py")
 
         # Copy static files
         copy_files()
+        precompress_files()
 
         print("\n✅✅✅ Build successful! ✅✅✅")
 
@@ -1,10 +1,19 @@
 
+import argparse
+import hashlib
+import json
 import os
+import random
+import threading
 import requests
 import csv
 import logging
 import time
 import schedule
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
@@ -18,21 +27,6 @@ load_dotenv()
 def get_env_var(name, default=''):
     return os.environ.get(name, default)
 
-def set_env_var(name, value):
-    # Update or append the variable in .env
-    with open('.env', 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    found = False
-    for i, line in enumerate(lines):
-        if line.startswith(f'{name}='):
-            lines[i] = f'{name}={value}\n'
-            found = True
-            break
-    if not found:
-        lines.append(f'{name}={value}\n')
-    with open('.env', 'w', encoding='utf-8') as f:
-        f.writelines(lines)
-
 def get_env():
     return {
         'email': get_env_var('CJ_EMAIL', 'YOUR_EMAIL_HERE'),
@@ -43,7 +37,7 @@ def get_env():
 
 
 def fetch_access_token(email, api_key):
-    url = 'https://developers.cjdropshipping.com/api2.0/v1/authentication/getAccessToken'
+    url = f'{API_BASE_URL}/authentication/getAccessToken'
     payload = {
         'email': email,
         'password': api_key
@@ -56,9 +50,6 @@ def fetch_access_token(email, api_key):
         if data.get('code') == 200 and data.get('data', {}).get('accessToken'):
             access_token = data['data']['accessToken']
             expiry = data['data'].get('accessTokenExpiryDate')
-            set_env_var('CJ_ACCESS_TOKEN', access_token)
-            if expiry:
-                set_env_var('CJ_ACCESS_TOKEN_EXPIRY', expiry)
             return access_token, expiry
         else:
             raise Exception(f"Failed to get access token: {data.get('message', 'Unknown error')}")
@@ -69,35 +60,146 @@ def fetch_access_token(email, api_key):
 
 # Helper to check if token is expired or invalid (by making a test API call)
 
-def is_token_expired(expiry_str):
+def is_token_expired(expiry_str, margin=timedelta(minutes=2)):
     if not expiry_str:
         return True
     try:
         # Example: "2021-08-18T09:16:33+08:00"
         expiry = datetime.fromisoformat(expiry_str.replace('Z', '+00:00'))
-        # Add a buffer of 2 minutes
-        return datetime.now(expiry.tzinfo) + timedelta(minutes=2) > expiry
+        return datetime.now(expiry.tzinfo) + margin > expiry
     except Exception:
         return True
 
-# Main token logic: only refresh if token is missing or invalid
 
-# Main token logic: only refresh if token is expired
+class CJTokenManager:
+    """
+    Caches the CJ access token and its expiry in a local state file.
 
-# Always fetch a new access token using email and API key (never use refresh token)
-def get_fresh_access_token():
-    env = get_env()
-    try:
-        access_token, expiry = fetch_access_token(env['email'], env['api_key'])
-        return access_token
-    except Exception as e:
-        raise RuntimeError("CJdropshipping access token could not be fetched. Check your credentials and network connection.")
+    The token is fetched lazily on first use and reused (across runs, via the
+    state file) until it is within refresh_margin of expiring. A background
+    timer refreshes it ahead of expiry, and invalidate() forces a refresh
+    after a 401. Thread-safe: concurrent fetch threads share one token and
+    at most one of them calls the auth endpoint.
+    """
+
+    def __init__(self, state_path, refresh_margin=timedelta(hours=1)):
+        self.state_path = state_path
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._token = None
+        self._expiry = None
+        self._timer = None
+
+    def _load(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            return state.get('access_token'), state.get('expiry')
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable token cache {self.state_path}: {e}")
+        # Fall back to a token supplied through the environment, if any
+        env = get_env()
+        return env['access_token'] or None, env['access_token_expiry'] or None
+
+    def _save(self):
+        tmp_path = f'{self.state_path}.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'access_token': self._token, 'expiry': self._expiry}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _needs_refresh(self):
+        return not self._token or is_token_expired(self._expiry, self.refresh_margin)
+
+    def _refresh_locked(self):
+        env = get_env()
+        try:
+            self._token, self._expiry = fetch_access_token(env['email'], env['api_key'])
+        except Exception:
+            raise RuntimeError("CJdropshipping access token could not be fetched. Check your credentials and network connection.")
+        self._save()
+        self._schedule_refresh()
+        logging.info(f"Fetched new CJdropshipping access token (expires {self._expiry or 'unknown'})")
+
+    def _schedule_refresh(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        try:
+            expiry = datetime.fromisoformat(self._expiry.replace('Z', '+00:00'))
+        except (AttributeError, ValueError):
+            return
+        delay = (expiry - self.refresh_margin - datetime.now(expiry.tzinfo)).total_seconds()
+        if delay > 0:
+            self._timer = threading.Timer(delay, self._background_refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _background_refresh(self):
+        with self._lock:
+            try:
+                self._refresh_locked()
+            except Exception as e:
+                # get_token() retries once the token is actually near expiry
+                logging.error(f"Background token refresh failed: {e}")
+
+    def get_token(self):
+        """Return a valid access token, fetching one only if needed."""
+        with self._lock:
+            if self._token is None:
+                self._token, self._expiry = self._load()
+                if not self._needs_refresh():
+                    self._schedule_refresh()
+            if self._needs_refresh():
+                self._refresh_locked()
+            return self._token
+
+    def invalidate(self, token):
+        """Mark token as rejected; the next get_token() fetches a new one."""
+        with self._lock:
+            if self._token == token:
+                self._token = ''
+
+    def stop(self):
+        """Cancel the background refresh timer."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
 
-CJ_ACCESS_TOKEN = get_fresh_access_token()
 
-API_URL = 'https://developers.cjdropshipping.com/api2.0/v1/product/list'
+API_BASE_URL = get_env_var('CJ_API_ENDPOINT', 'https://developers.cjdropshipping.com/api2.0/v1').rstrip('/')
+API_URL = f'{API_BASE_URL}/product/list'
+CATEGORY_URL = f'{API_BASE_URL}/product/getCategory'
 CSV_FILE = 'feed.csv'
 
+TOKEN_STATE_FILE = get_env_var('CJ_TOKEN_STATE_FILE', '.cj_token.json')
+token_manager = CJTokenManager(TOKEN_STATE_FILE)
+
+# Concurrent fetch settings
+FETCH_CONCURRENCY = int(get_env_var('CJ_FETCH_CONCURRENCY', '6'))  # pages in flight
+FETCH_RATE_LIMIT = float(get_env_var('CJ_FETCH_RATE_LIMIT', '5'))  # max requests/second
+FETCH_MAX_RETRIES = int(get_env_var('CJ_FETCH_MAX_RETRIES', '4'))
+FETCH_TIMEOUT = float(get_env_var('CJ_FETCH_TIMEOUT', '20'))
+PAGE_SIZE = 50
+MAX_OFFSET = 6000  # CJdropshipping list API offset limit
+
+# Sharded ingestion settings (--sharded)
+SHARD_CONCURRENCY = int(get_env_var('CJ_SHARD_CONCURRENCY', '3'))  # shards crawled at once
+# Price windows tried first when a category exceeds MAX_OFFSET; windows
+# still over the cap are bisected further.
+SHARD_PRICE_BREAKS = [float(x) for x in get_env_var('CJ_SHARD_PRICE_BREAKS', '0,5,10,20,50,100,100000').split(',')]
+MIN_PRICE_WINDOW = 0.05
+
+# Incremental sync settings
+SYNC_STATE_FILE = get_env_var('CJ_SYNC_STATE_FILE', 'cj_sync_state.json')
+SYNC_CHANGE_LOG = get_env_var('CJ_SYNC_CHANGE_LOG', 'cj_sync_changes.jsonl')
+SYNC_ROTATION_CATEGORIES = int(get_env_var('CJ_SYNC_ROTATION_CATEGORIES', '20'))  # re-crawled per run
+NEW_PRODUCT_LOOKBACK = timedelta(hours=24)  # overlap for the "created since last sync" window
+CREATE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -169,68 +271,568 @@ FIELD_MAPPING = {
 }
 CSV_FIELDS = list(FIELD_MAPPING.keys())
 
-def fetch_products(page_num=1, page_size=50):
+class TransientFetchError(Exception):
+    """A request failure worth retrying (network error, 429, 5xx)."""
+
+
+class IncompleteFetchError(Exception):
+    """Pages were still missing after retries, so the fetched catalog is partial."""
+
+
+class RateLimiter:
+    """Spaces request starts so all threads together stay under max_per_second."""
+
+    def __init__(self, max_per_second):
+        self.interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def create_session(pool_size=FETCH_CONCURRENCY):
+    """requests session with a keep-alive connection pool shared by all fetch threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_default_session = None
+_default_limiter = None
+
+
+def _get_default_session():
+    global _default_session, _default_limiter
+    if _default_session is None:
+        # Sized for sharded runs, where several shards page concurrently
+        _default_session = create_session(FETCH_CONCURRENCY * SHARD_CONCURRENCY)
+        _default_limiter = RateLimiter(FETCH_RATE_LIMIT)
+    return _default_session, _default_limiter
+
+
+def _api_get(session, url, params):
+    token = token_manager.get_token()
     headers = {
-        'CJ-Access-Token': CJ_ACCESS_TOKEN,
+        'CJ-Access-Token': token,
         'Content-Type': 'application/json'
     }
-    params = {
+    try:
+        # CJdropshipping product endpoints expect GET, not POST
+        response = session.get(url, headers=headers, params=params, timeout=FETCH_TIMEOUT)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        raise TransientFetchError(str(e))
+    if response.status_code == 401:
+        # Token revoked or expired early: refresh it and retry
+        token_manager.invalidate(token)
+        raise TransientFetchError("HTTP 401")
+    if response.status_code == 429 or response.status_code >= 500:
+        raise TransientFetchError(f"HTTP {response.status_code}")
+    response.raise_for_status()
+    data = response.json()
+    if data.get('code') != 200:
+        raise Exception(f"API error: {data.get('message', 'Unknown error')}")
+    return data.get('data')
+
+
+def _get_with_retries(url, params, label, session=None, limiter=None,
+                      max_retries=FETCH_MAX_RETRIES):
+    """GET an API endpoint, retrying transient errors with jittered exponential backoff."""
+    if session is None:
+        session, limiter = _get_default_session()
+    for attempt in range(max_retries + 1):
+        if limiter:
+            limiter.wait()
+        try:
+            return _api_get(session, url, params)
+        except TransientFetchError as e:
+            if attempt == max_retries:
+                raise
+            delay = min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+            logging.warning(f"Transient error on {label} ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def fetch_page(page_num, page_size=PAGE_SIZE, params=None, session=None, limiter=None,
+               max_retries=FETCH_MAX_RETRIES):
+    """
+    Fetch one page of the product list, retrying transient errors.
+    Returns the API 'data' object ({'list': [...], 'total': N, ...});
+    raises once retries are exhausted.
+    """
+    query = {
         'pageNum': page_num,
         'pageSize': page_size
     }
+    query.update(params or {})
+    return _get_with_retries(API_URL, query, f"page {page_num}", session, limiter,
+                             max_retries) or {}
+
+
+def fetch_products(page_num=1, page_size=50):
     try:
-        # CJdropshipping product list endpoint expects GET, not POST
-        response = requests.get(API_URL, headers=headers, params=params, timeout=20)
-        response.raise_for_status()
-        data = response.json()
-        if data.get('code') != 200 or not data.get('data') or not data['data'].get('list'):
-            raise Exception(f"API error: {data.get('message', 'Unknown error')}")
-        return data['data']['list']
+        data = fetch_page(page_num, page_size)
+        if not data.get('list'):
+            raise Exception("API error: empty product list")
+        return data['list']
     except Exception as e:
         logging.error(f"Failed to fetch products (page {page_num}): {e}")
         return []
 
-def write_to_csv(products):
+
+def fetch_all_pages(page_size=PAGE_SIZE, max_offset=MAX_OFFSET, params=None,
+                    concurrency=FETCH_CONCURRENCY, session=None, limiter=None, failed_pages=None,
+                    first_page=None):
+    """
+    Yield (page_num, products) for every page of the product list, in page order.
+
+    Page 1 is fetched first to learn the total; the remaining pages are then
+    fetched by a thread pool with up to `concurrency` requests in flight,
+    sharing one connection pool and rate limiter. Pages that still fail
+    after retries are logged, appended to failed_pages and skipped instead
+    of ending the run. Pass first_page (an already fetched page-1 'data'
+    object) to skip re-requesting it.
+    """
+    if session is None:
+        session, limiter = _get_default_session()
+    max_pages = max(1, max_offset // page_size)
+    failed_pages = failed_pages if failed_pages is not None else []
+
+    def fetch(page_num):
+        try:
+            return fetch_page(page_num, page_size, params, session, limiter)
+        except Exception as e:
+            logging.error(f"Failed to fetch products (page {page_num}): {e}")
+            failed_pages.append(page_num)
+            return None
+
+    first = first_page if first_page is not None else fetch(1)
+    if first is None or not first.get('list'):
+        return
+    yield 1, first['list']
+    if len(first['list']) < page_size:
+        return
+
+    total = first.get('total')
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if total:
+            last_page = min(max_pages, -(-int(total) // page_size))
+            # Sliding window: at most 2x concurrency pages are fetched ahead
+            # of the consumer, so memory does not grow with catalog size.
+            pending = deque()
+            next_page = 2
+            while next_page <= last_page or pending:
+                while next_page <= last_page and len(pending) < 2 * concurrency:
+                    pending.append((next_page, executor.submit(fetch, next_page)))
+                    next_page += 1
+                page_num, future = pending.popleft()
+                data = future.result()
+                if data and data.get('list'):
+                    yield page_num, data['list']
+            if last_page == max_pages and int(total) > max_offset:
+                logging.info(f"Reached CJdropshipping API max offset of {max_offset}. Stopping fetch.")
+            return
+
+        # No total reported: fetch in waves until a short or empty page
+        page_num = 2
+        while page_num <= max_pages:
+            wave = range(page_num, min(max_pages, page_num + concurrency - 1) + 1)
+            results = list(executor.map(fetch, wave))
+            for n, data in zip(wave, results):
+                products = (data or {}).get('list') or []
+                if products:
+                    yield n, products
+                if data is not None and len(products) < page_size:
+                    return
+            page_num = wave[-1] + 1
+        logging.info(f"Reached CJdropshipping API max offset of {max_offset}. Stopping fetch.")
+
+
+def fetch_leaf_categories(session=None, limiter=None):
+    """Return [(categoryId, name)] for every third-level CJ category."""
+    tree = _get_with_retries(CATEGORY_URL, {}, "category list", session, limiter) or []
+    leaves = []
+    for first in tree:
+        for second in first.get('categoryFirstList') or []:
+            for third in second.get('categorySecondList') or []:
+                if third.get('categoryId'):
+                    leaves.append((third['categoryId'], third.get('categoryName', '')))
+    return leaves
+
+
+def _plan_shard(params, session, limiter, max_offset=MAX_OFFSET):
+    """
+    Split one query into shards whose result count stays under max_offset.
+
+    Returns [(params, page-1 data)]. A query over the cap is split along
+    SHARD_PRICE_BREAKS and then by bisecting the price window until every
+    piece fits; a window narrower than MIN_PRICE_WINDOW that is still over
+    the cap is kept and truncated at the offset limit.
+    """
+    first = fetch_page(1, PAGE_SIZE, params, session, limiter)
+    total = int(first.get('total') or 0)
+    if total <= max_offset:
+        return [(params, first)] if total else []
+
+    low = params.get('minPrice')
+    high = params.get('maxPrice')
+    if low is None:
+        bounds = SHARD_PRICE_BREAKS
+    elif high - low < MIN_PRICE_WINDOW:
+        logging.warning(f"Shard {params} has {total} products; only the first {max_offset} are reachable")
+        return [(params, first)]
+    else:
+        mid = round((low + high) / 2, 2)
+        bounds = [low, mid, high]
+
+    shards = []
+    for window_low, window_high in zip(bounds, bounds[1:]):
+        shards.extend(_plan_shard(dict(params, minPrice=window_low, maxPrice=window_high),
+                                  session, limiter, max_offset))
+    return shards
+
+
+def fetch_sharded_products(concurrency=SHARD_CONCURRENCY, failed_pages=None):
+    """
+    Yield every product reachable through category (and price window)
+    shards, deduplicated by pid.
+
+    Each shard stays under the list API offset cap, so the catalog size is
+    no longer limited to MAX_OFFSET. Shards are crawled concurrently on top
+    of the shared session and rate limiter; results are yielded in shard
+    order so the feed is stable between runs. Products CJ lists without a
+    category are not reachable this way.
+    """
+    session, limiter = _get_default_session()
+    failed_pages = failed_pages if failed_pages is not None else []
+    categories = fetch_leaf_categories(session, limiter)
+    logging.info(f"Planning shards for {len(categories)} categories...")
+
+    def plan(category):
+        try:
+            return _plan_shard({'categoryId': category[0]}, session, limiter)
+        except Exception as e:
+            logging.error(f"Failed to plan shard for category {category[1] or category[0]}: {e}")
+            return []
+
+    def crawl(shard):
+        params, first = shard
+        shard_failed = []
+        products = [p for _, page in fetch_all_pages(params=params, session=session, limiter=limiter,
+                                                      failed_pages=shard_failed, first_page=first)
+                    for p in page]
+        failed_pages.extend((params, n) for n in shard_failed)
+        return products
+
+    seen = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        shards = [s for planned in executor.map(plan, categories) for s in planned]
+        logging.info(f"Crawling {len(shards)} shards...")
+        # Bounded look-ahead, as in fetch_all_pages
+        pending = deque()
+        shard_iter = iter(shards)
+
+        def refill():
+            for shard in islice(shard_iter, 2 * concurrency - len(pending)):
+                pending.append(executor.submit(crawl, shard))
+
+        refill()
+        while pending:
+            products = pending.popleft().result()
+            refill()
+            for p in products:
+                pid = p.get('pid')
+                if pid in seen:
+                    continue
+                seen.add(pid)
+                yield p
+
+
+def product_to_row(p):
+    return {col: func(p) for col, func in FIELD_MAPPING.items()}
+
+def write_to_csv(products, path=CSV_FILE):
+    """
+    Stream products (any iterable) into path and return the number written.
+
+    Rows go to a temp file next to path, which replaces path only once the
+    iterable is exhausted and at least one row was written; readers of the
+    feed never see a partial file, and a failed run leaves the old feed.
+    """
+    tmp_path = f'{path}.tmp'
+    count = 0
     try:
-        with open(CSV_FILE, 'w', newline='', encoding='utf-8') as csvfile:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDS)
             writer.writeheader()
             for p in products:
-                row = {col: func(p) for col, func in FIELD_MAPPING.items()}
-                writer.writerow(row)
-        logging.info(f"Wrote {len(products)} products to {CSV_FILE}")
+                writer.writerow(product_to_row(p))
+                count += 1
+        if count:
+            os.replace(tmp_path, path)
+            logging.info(f"Wrote {count} products to {path}")
+        else:
+            logging.warning(f"No products written; {path} left unchanged")
     except Exception as e:
         logging.error(f"Failed to write to CSV: {e}")
+        count = 0
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
 
-def fetch_and_update():
-    logging.info("Starting product fetch...")
-    all_products = []
-    page_num = 1
-    page_size = 50
-    max_offset = 6000
-    while True:
-        offset = (page_num - 1) * page_size
-        if offset >= max_offset:
-            logging.info(f"Reached CJdropshipping API max offset of {max_offset}. Stopping fetch.")
-            break
-        products = fetch_products(page_num=page_num, page_size=page_size)
-        if not products:
-            break
-        all_products.extend(products)
-        if len(products) < page_size:
-            break
-        page_num += 1
-    if all_products:
-        write_to_csv(all_products)
-        logging.info(f"Fetched {len(all_products)} products.")
+def product_fingerprint(p):
+    """Short hash of the CJ fields whose change should update the feed row."""
+    key = '\x1f'.join(str(p.get(k) or '') for k in ('sellPrice', 'productImage', 'productNameEn', 'categoryName'))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+def _load_sync_state(path=SYNC_STATE_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable sync state {path}: {e}")
+        return None
+
+def _save_sync_state(state, path=SYNC_STATE_FILE):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+def _require_complete(products, failed_pages):
+    """Pass products through, then raise IncompleteFetchError if any page failed."""
+    yield from products
+    if failed_pages:
+        raise IncompleteFetchError(f"{len(failed_pages)} pages failed after retries: {failed_pages}")
+
+def _track_fingerprints(products, known):
+    """Pass products through, recording {pid: [fingerprint, categoryId]} in known."""
+    for p in products:
+        known[str(p.get('pid', ''))] = [product_fingerprint(p), p.get('categoryId', '')]
+        yield p
+
+def build_columnar_catalog(path=CSV_FILE):
+    """Rebuild the memory-mappable catalog (feed.catalog) from the CSV feed."""
+    try:
+        from src.columnar_catalog import build_from_csv
+        build_from_csv(path)
+    except Exception as e:
+        # Consumers fall back to the CSV when the catalog is missing or stale
+        logging.error(f"Failed to build columnar catalog: {e}")
+
+def fetch_and_update(sharded=False):
+    logging.info(f"Starting {'sharded ' if sharded else ''}product fetch...")
+    start = time.monotonic()
+    started_at = datetime.now()
+    failed_pages = []
+    known = {}
+    if sharded:
+        products = fetch_sharded_products(failed_pages=failed_pages)
+    else:
+        products = (p for _, page in fetch_all_pages(failed_pages=failed_pages) for p in page)
+    # A partial catalog must not replace the feed (write_to_csv keeps the old
+    # one when the stream raises) or become the incremental-sync baseline
+    count = write_to_csv(_require_complete(_track_fingerprints(products, known), failed_pages))
+    if failed_pages:
+        logging.error("Fetch incomplete; keeping the previous feed and sync state.")
+    elif count:
+        build_columnar_catalog()
+        # A full fetch is the baseline later incremental syncs diff against
+        _save_sync_state({
+            'last_sync': started_at.isoformat(),
+            'category_cursor': 0,
+            'products': known,
+        })
+        logging.info(f"Fetched {count} products in {time.monotonic() - start:.1f}s.")
     else:
         logging.warning("No products fetched.")
 
+def patch_feed(changes, path=CSV_FILE):
+    """
+    Apply {pid: product, or None to remove} to the feed in one streamed pass.
+
+    Unchanged rows are copied as-is, changed rows are replaced in place and
+    new products are appended; the result replaces the feed atomically.
+    """
+    pending = dict(changes)
+    tmp_path = f'{path}.tmp'
+    try:
+        with open(path, newline='', encoding='utf-8') as src, \
+                open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+            writer = csv.DictWriter(dst, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for row in csv.DictReader(src):
+                pid = (row.get('url') or '').rsplit('/', 1)[-1]
+                if pid in pending:
+                    p = pending.pop(pid)
+                    if p is not None:
+                        writer.writerow(product_to_row(p))
+                    continue
+                writer.writerow({col: row.get(col, '') for col in CSV_FIELDS})
+            for p in pending.values():
+                if p is not None:
+                    writer.writerow(product_to_row(p))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _crawl_category(category_id, session, limiter):
+    """Return (products, complete) for one category; complete is False if any page was missed."""
+    products = []
+    complete = True
+    for params, first in _plan_shard({'categoryId': category_id}, session, limiter):
+        if int(first.get('total') or 0) > MAX_OFFSET:
+            complete = False
+        failed = []
+        for _, page in fetch_all_pages(params=params, session=session, limiter=limiter,
+                                       failed_pages=failed, first_page=first):
+            products.extend(page)
+        if failed:
+            complete = False
+    return products, complete
+
+def incremental_sync(sharded=False, rotation=SYNC_ROTATION_CATEGORIES):
+    """
+    Update feed.csv from what changed on CJ since the last sync.
+
+    Each run fetches the products created since the previous run plus a
+    rotating batch of `rotation` categories, and compares them with the
+    per-pid fingerprints saved by the previous run. Added, changed and
+    removed products are appended to the change log and patched into the
+    feed; when nothing changed the feed is not touched, so downstream
+    regeneration (which keys off the feed's mtime) is skipped too.
+    Removals are only detected in categories that were crawled completely.
+    Falls back to a full fetch when there is no saved state.
+
+    Without `sharded` the feed is held to MAX_OFFSET products, like
+    fetch_and_update(sharded=False). Newly created products are always
+    added, and the products that have been in the feed longest are dropped
+    to make room. Unknown products found by the category rotation only
+    fill spare room, so rotation does not churn the feed.
+    """
+    state = _load_sync_state()
+    if state is None or not os.path.exists(CSV_FILE):
+        logging.info("No sync state found; running a full fetch.")
+        return fetch_and_update(sharded)
+
+    start = time.monotonic()
+    started_at = datetime.now()
+    session, limiter = _get_default_session()
+    known = state.get('products', {})
+    fetched = {}
+
+    # 1. Products created since the last sync
+    since = datetime.fromisoformat(state['last_sync']) - NEW_PRODUCT_LOOKBACK
+    params = {'createTimeFrom': since.strftime(CREATE_TIME_FORMAT)}
+    for _, page in fetch_all_pages(params=params, session=session, limiter=limiter):
+        for p in page:
+            fetched[str(p.get('pid', ''))] = p
+    created = set(fetched)
+
+    # 2. A rotating slice of categories, to pick up price/content changes and removals
+    categories = sorted(cid for cid, _ in fetch_leaf_categories(session, limiter))
+    cursor = state.get('category_cursor', 0) % len(categories) if categories else 0
+    batch = (categories[cursor:] + categories[:cursor])[:rotation]
+    complete = set()
+    with ThreadPoolExecutor(max_workers=SHARD_CONCURRENCY) as executor:
+        futures = {cid: executor.submit(_crawl_category, cid, session, limiter) for cid in batch}
+        for cid, future in futures.items():
+            try:
+                products, done = future.result()
+            except Exception as e:
+                logging.error(f"Failed to crawl category {cid}: {e}")
+                continue
+            for p in products:
+                fetched.setdefault(str(p.get('pid', '')), p)
+            if done:
+                complete.add(cid)
+
+    # 3. Diff against the saved fingerprints
+    changes = {}
+    log_entries = []
+    timestamp = started_at.isoformat()
+    removed = [pid for pid, (_, cid) in known.items() if cid in complete and pid not in fetched]
+    for pid in removed:
+        del known[pid]
+    for pid, p in fetched.items():
+        fingerprint = product_fingerprint(p)
+        previous = known.get(pid)
+        if previous is not None and previous[0] == fingerprint:
+            continue
+        if previous is None and not sharded and pid not in created and len(known) >= MAX_OFFSET:
+            continue  # found by rotation, and the unsharded feed is full
+        changes[pid] = p
+        # New pids go to the end, so known stays ordered oldest first
+        known[pid] = [fingerprint, p.get('categoryId', '')]
+        log_entries.append({'time': timestamp, 'pid': pid,
+                            'change': 'added' if previous is None else 'changed',
+                            'title': p.get('productNameEn', ''), 'price': p.get('sellPrice', '')})
+    if not sharded and len(known) > MAX_OFFSET:
+        # Make room for new products (or trim a baseline left by a sharded
+        # run) by dropping the products that have been in the feed longest
+        trimmed = list(known)[:len(known) - MAX_OFFSET]
+        for pid in trimmed:
+            del known[pid]
+        removed += trimmed
+    for pid in removed:
+        changes[pid] = None
+        log_entries.append({'time': timestamp, 'pid': pid, 'change': 'removed'})
+
+    if changes:
+        patch_feed(changes)
+        build_columnar_catalog()
+        with open(SYNC_CHANGE_LOG, 'a', encoding='utf-8') as f:
+            for entry in log_entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    state.update({
+        'last_sync': timestamp,
+        'category_cursor': (cursor + len(batch)) % len(categories) if categories else 0,
+        'products': known,
+    })
+    _save_sync_state(state)
+
+    summary = {
+        'added': sum(1 for e in log_entries if e['change'] == 'added'),
+        'changed': sum(1 for e in log_entries if e['change'] == 'changed'),
+        'removed': len(removed),
+        'fetched': len(fetched),
+        'categories': len(batch),
+    }
+    logging.info(
+        f"Incremental sync: {summary['added']} added, {summary['changed']} changed, "
+        f"{summary['removed']} removed ({summary['fetched']} products checked across "
+        f"{summary['categories']} categories in {time.monotonic() - start:.1f}s)."
+    )
+    return summary
+
 def main():
+    parser = argparse.ArgumentParser(description='Fetch the CJdropshipping catalog into feed.csv')
+    parser.add_argument('--sharded', action='store_true',
+                        help='Crawl by category/price shards to get past the 6,000-product offset cap')
+    parser.add_argument('--full', action='store_true',
+                        help='Re-download the whole catalog every run instead of syncing changes')
+    parser.add_argument('--once', action='store_true', help='Sync once and exit instead of scheduling')
+    args = parser.parse_args()
+
+    job = fetch_and_update if args.full else incremental_sync
+    job(args.sharded)  # Run once at startup
+    if args.once:
+        return
     # Schedule to run every 6 hours (customize as needed)
-    schedule.every(6).hours.do(fetch_and_update)
-    logging.info("Scheduled CJdropshipping fetch every 6 hours.")
-    fetch_and_update()  # Run once at startup
+    schedule.every(6).hours.do(job, args.sharded)
+    logging.info(f"Scheduled CJdropshipping {'fetch' if args.full else 'incremental sync'} every 6 hours.")
     while True:
         schedule.run_pending()
         time.sleep(60)
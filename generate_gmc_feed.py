@@ -11,29 +11,18 @@ This module extends the basic GMC feed with UCP-required attributes:
 """
 
 import csv
+import hashlib
+import io
 import json
-import re
+import mmap
+import multiprocessing
 import os
 from datetime import datetime
 
-
-def clean_value(value):
-    """Clean JSON array strings and convert to comma-separated values."""
-    if isinstance(value, str) and value.startswith("[") and value.endswith("]"):
-        try:
-            data = json.loads(value)
-            if isinstance(data, list):
-                cleaned_data = [
-                    str(item)
-                    for item in data
-                    if isinstance(item, str)
-                    and item.strip()
-                    and not item.strip().isdigit()
-                ]
-                return ", ".join(cleaned_data)
-        except json.JSONDecodeError:
-            return value
-    return value
+# Shared cell normalization (clean_value and extract_gtin are re-exported
+# for existing importers of this module)
+from src import feed_normalizer
+from src.feed_normalizer import clean_value, extract_gtin, extract_product_id, lowest_price
 
 
 def generate_extended_description(product_row):
@@ -87,159 +76,472 @@ def generate_extended_description(product_row):
     return extended_description[:2000]  # Respect GMC's practical limit
 
 
-def extract_gtin(product_row):
+# Column order of the UCP-enhanced TSV
+UCP_FEED_FIELDS = [
+    # Core GMC fields (required/recommended)
+    "id", "title", "description", "link", "image_link", "price",
+    "availability", "condition", "brand", "google_product_category",
+    "shipping",
+    # UCP Enhancement fields
+    "gtin", "shipping_label", "return_policy", "rating"
+]
+
+
+def read_feed_rows(input_csv_path):
+    """Yield (row_idx, row) pairs from the input CSV one row at a time."""
+    with open(input_csv_path, mode="r", encoding="utf-8") as infile:
+        reader = csv.DictReader(infile)
+        # Start at 2 (after header)
+        for row_idx, row in enumerate(reader, start=2):
+            yield row_idx, row
+
+
+def transform_ucp_row(row, row_idx, currency="USD"):
+    """Build one UCP-enhanced GMC product entry from a feed.csv row."""
+    # Extract product ID from URL
+    product_id = extract_product_id(row.get("url")) or f"PROD-{row_idx}"
+    
+    # Extract title (use optimized if available, else base title)
+    title = row.get("title_optimized") or row.get("title", "").strip()
+    # Ensure title is at least 30 chars for UCP (pad if needed)
+    if len(title) < 30:
+        category = clean_value(row.get("category", ""))
+        title = f"{title} {category}".strip()[:70]
+    
+    # Handle price range (take lower value)
+    price_value = lowest_price(row.get("price", "0"))
+    formatted_price = f"{price_value:.2f} {currency}"
+    
+    # Determine availability
+    try:
+        stock_level = int(row.get("stock", "0") or "0")
+        availability = "in stock" if stock_level > 0 else "out of stock"
+    except (ValueError, TypeError):
+        availability = "out of stock"
+    
+    # Clean values
+    brand = clean_value(row.get("brand", "")) or "Generic"
+    category = clean_value(row.get("category", ""))
+    image_link = row.get("image", "").strip()
+    url = row.get("url", "").strip()
+    
+    # --- UCP Enhancements ---
+    # Extended description with trust signals
+    extended_description = generate_extended_description(row)
+    
+    # GTIN field
+    gtin = extract_gtin(row)
+    
+    # Trust signals
+    shipping_label = "Free shipping on orders over $50; Standard 7-14 business days"
+    return_policy = "30-day returns; Full refund or exchange"
+    rating = row.get("rating", "4.5")  # Default rating if not provided
+    
+    # Construct enhanced GMC product entry
+    return {
+        # Required fields
+        "id": product_id,
+        "title": title[:70],  # GMC/UCP title limit
+        "description": extended_description,  # UCP-enhanced
+        "link": url,
+        "image_link": image_link,
+        "price": formatted_price,
+        "availability": availability,
+        
+        # Recommended fields
+        "condition": "new",
+        "brand": brand,
+        "google_product_category": category,
+        "shipping": row.get("shipping", f"0.00 {currency}"),
+        
+        # --- UCP Enhancement Fields ---
+        "gtin": gtin,  # Global Trade Item Number
+        "shipping_label": shipping_label,  # Trust signal
+        "return_policy": return_policy,  # Trust signal
+        "rating": rating,  # Review score
+    }
+
+
+def transform_ucp_rows(rows, currency="USD"):
+    """Lazily transform (row_idx, row) pairs, skipping rows that fail."""
+    for row_idx, row in rows:
+        try:
+            yield transform_ucp_row(row, row_idx, currency)
+        except Exception as e:
+            print(f"Warning: Skipped row {row_idx} due to error: {e}")
+            continue
+
+
+def _write_atomically(output_tsv_path, write):
+    """
+    Run write(outfile) against a temp file, then move it into place.
+    
+    write() returns the number of products written. The temp file replaces
+    output_tsv_path only if that is non-zero, so readers never see a partial
+    feed and an empty run leaves the previous feed in place.
+    """
+    tmp_path = f"{output_tsv_path}.tmp"
+    try:
+        with open(tmp_path, mode="w", newline="", encoding="utf-8") as outfile:
+            count = write(outfile)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    
+    if count:
+        os.replace(tmp_path, output_tsv_path)
+    else:
+        os.remove(tmp_path)
+    return count
+
+
+def write_feed_tsv(products, output_tsv_path, fieldnames):
     """
-    Extract or derive GTIN/EAN from product data.
+    Stream product entries to a TSV file as they are produced.
     
-    Note: CJ Dropshipping API may not provide GTINs.
-    This is a placeholder for future enhancement.
+    Returns:
+        int: Number of products written
     """
-    # Try to extract from existing fields (if added in future)
-    gtin = product_row.get("gtin", "").strip()
-    if gtin and len(gtin) in [8, 12, 13, 14]:  # Valid GTIN lengths
-        return gtin
+    def write(outfile):
+        writer = csv.DictWriter(
+            outfile, fieldnames=fieldnames, delimiter="\t", restval=""
+        )
+        writer.writeheader()
+        count = 0
+        for product in products:
+            writer.writerow(product)
+            count += 1
+        return count
+    
+    return _write_atomically(output_tsv_path, write)
+
+
+# --- Parallel transformation (--workers N) ---
+
+# Target size of one byte-range chunk handed to a worker process
+PARALLEL_CHUNK_BYTES = 4 * 1024 * 1024
+# Bytes scanned per step when counting quotes between chunk boundaries
+_SCAN_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+def _record_end(mm, pos, quoted):
+    """
+    Offset just past the first record-terminating newline at or after pos.
     
-    # Fallback: Generate a deterministic pseudo-GTIN from product ID
-    # (Not ideal, but helps with UCP requirements)
-    url = product_row.get("url", "")
-    product_id_match = re.search(r"product-detail/(\d+)", url)
-    if product_id_match:
-        pid = product_id_match.group(1)
-        # Derive a checksum-like value (simple implementation)
-        return f"00{pid}"[-12:]  # Ensure 12-digit format
+    A newline ends a record only outside a quoted field; quoted is whether
+    pos itself lies inside quotes. Returns len(mm) if no such newline exists.
+    """
+    while True:
+        newline = mm.find(b"\n", pos)
+        if newline == -1:
+            return len(mm)
+        if mm[pos:newline].count(b'"') % 2:
+            quoted = not quoted
+        if not quoted:
+            return newline + 1
+        pos = newline + 1
+
+
+def find_chunk_boundaries(input_csv_path, target_chunk_bytes=PARALLEL_CHUNK_BYTES):
+    """
+    Split a CSV file into byte ranges that each hold whole records.
     
-    return ""
+    Quote parity is tracked from the start of the file, so quoted fields
+    containing newlines never straddle two chunks.
+    
+    Returns:
+        Tuple[List[str], List[Tuple[int, int]]]: (header fieldnames,
+        [(start, end), ...] byte ranges covering all data rows in order)
+    """
+    with open(input_csv_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return [], []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data_start = _record_end(mm, 0, False)
+            header = mm[:data_start].decode("utf-8")
+            fieldnames = next(csv.reader(io.StringIO(header, newline="")), [])
+            
+            ranges = []
+            start = data_start
+            pos, quoted = data_start, False
+            while start < size:
+                target = start + target_chunk_bytes
+                if target >= size:
+                    ranges.append((start, size))
+                    break
+                # Advance quote parity from pos (a record start) to target
+                while pos < target:
+                    step = min(target, pos + _SCAN_BLOCK_BYTES)
+                    if mm[pos:step].count(b'"') % 2:
+                        quoted = not quoted
+                    pos = step
+                end = _record_end(mm, target, quoted)
+                ranges.append((start, end))
+                start, pos, quoted = end, end, False
+    return fieldnames, ranges
 
 
-def generate_ucp_enhanced_feed(input_csv_path, output_tsv_path, currency="USD"):
+def _transform_chunk(task):
     """
-    Generates a UCP-enhanced Google Merchant Center product feed.
+    Worker: transform the records in one byte range of the input CSV.
+    
+    Row numbers inside a chunk are local (0-based); the parent knows how many
+    records precede the chunk and renumbers fallback IDs and warnings.
+    
+    Returns:
+        Tuple[int, int, str, List[Tuple[int, int]], List[Tuple[int, str]]]:
+        (records read, products written, TSV text,
+         [(text offset, local_idx) of rows with a fallback ID], warnings)
+    """
+    input_csv_path, fieldnames, start, end, currency = task
+    with open(input_csv_path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    # Match the universal-newline translation of the serial text-mode reader
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    
+    reader = csv.DictReader(io.StringIO(text, newline=""), fieldnames=fieldnames)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(
+        buffer, fieldnames=UCP_FEED_FIELDS, delimiter="\t", restval=""
+    )
+    fallbacks, warnings = [], []
+    records = written = 0
+    for local_idx, row in enumerate(reader):
+        records += 1
+        try:
+            product = transform_ucp_row(row, local_idx, currency)
+        except Exception as e:
+            warnings.append((local_idx, str(e)))
+            continue
+        if product["id"] == f"PROD-{local_idx}":
+            fallbacks.append((buffer.tell(), local_idx))
+        writer.writerow(product)
+        written += 1
+    return records, written, buffer.getvalue(), fallbacks, warnings
+
+
+def _generate_parallel(input_csv_path, output_tsv_path, currency, workers):
+    """
+    Transform byte-range chunks of the input in a process pool and merge the
+    results in input order. Output is byte-identical to the serial path.
+    """
+    fieldnames, ranges = find_chunk_boundaries(input_csv_path)
+    tasks = [
+        (input_csv_path, fieldnames, start, end, currency)
+        for start, end in ranges
+    ]
+    
+    def write(outfile):
+        csv.DictWriter(
+            outfile, fieldnames=UCP_FEED_FIELDS, delimiter="\t"
+        ).writeheader()
+        count = 0
+        first_row_idx = 2  # Row numbers start at 2 (after header)
+        with multiprocessing.Pool(workers) as pool:
+            # imap keeps results in chunk order while later chunks are
+            # already being transformed
+            results = pool.imap(_transform_chunk, tasks)
+            for records, written, text, fallbacks, warnings in results:
+                for local_idx, error in warnings:
+                    print(f"Warning: Skipped row {first_row_idx + local_idx} due to error: {error}")
+                # Rewrite chunk-local fallback IDs (PROD-<local>) to global ones
+                pos = 0
+                for offset, local_idx in fallbacks:
+                    outfile.write(text[pos:offset])
+                    outfile.write(f"PROD-{first_row_idx + local_idx}")
+                    pos = offset + len(f"PROD-{local_idx}")
+                outfile.write(text[pos:])
+                count += written
+                first_row_idx += records
+        return count
+    
+    return _write_atomically(output_tsv_path, write)
+
+
+# --- Incremental generation (--incremental) ---
+
+def _transform_fingerprint(currency):
+    """
+    Identifies the transform that produced cached rows.
+    
+    Derived from the source of this module and the shared normalizer plus
+    the currency, so editing the transform (or switching currency)
+    invalidates every cached row.
+    """
+    source = b""
+    for module_path in (__file__, feed_normalizer.__file__):
+        with open(os.path.abspath(module_path), "rb") as f:
+            source += f.read()
+    return hashlib.blake2b(source + currency.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _load_manifest(manifest_path, fingerprint, fieldnames):
+    """Previous {key: [row_hash, tsv_line]} entries, or {} if unusable."""
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get("fingerprint") != fingerprint or manifest.get("fields") != fieldnames:
+        print("  Manifest is from a different transform or input layout; rebuilding all rows")
+        return {}
+    return manifest.get("products", {})
+
+
+def _save_json_atomically(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def generate_incremental_feed(input_csv_path, output_tsv_path, currency="USD",
+                              manifest_path=None, delta_path=None):
+    """
+    Generate the UCP-enhanced feed, re-transforming only changed products.
+    
+    A manifest next to the output stores, per product, a hash of its input
+    row and its rendered TSV line. Unchanged rows reuse the cached line, so
+    transform work is proportional to the number of changes; the full feed
+    is still written (a sequential copy) along with a delta file listing
+    added/changed/removed product IDs for downstream syncs.
     
     Args:
         input_csv_path (str): Path to input CSV (feed.csv)
         output_tsv_path (str): Path to output TSV for GMC
         currency (str): Currency code (USD, NGN, etc.)
+        manifest_path (str): Defaults to <output>.manifest.json
+        delta_path (str): Defaults to <output>.delta.json
     
-    UCP Features Added:
-    - Extended title (70+ chars)
-    - Extended description (500+ chars)
-    - GTIN field
-    - Image link (supports high-res)
-    - Trust signals (shipping_label, return_policy, rating)
-    - Structured availability
+    Returns:
+        int: Number of products in the feed
     """
-    gmc_products = []
+    manifest_path = manifest_path or f"{output_tsv_path}.manifest.json"
+    delta_path = delta_path or f"{output_tsv_path}.delta.json"
+    fingerprint = _transform_fingerprint(currency)
+    delta = {"added": [], "changed": [], "removed": [], "unchanged": 0}
+    current = {}
     
     try:
         with open(input_csv_path, mode="r", encoding="utf-8") as infile:
             reader = csv.DictReader(infile)
+            fieldnames = reader.fieldnames or []
+            previous = _load_manifest(manifest_path, fingerprint, fieldnames)
             
-            for row_idx, row in enumerate(reader, start=2):  # Start at 2 (after header)
-                try:
-                    # Extract product ID from URL
-                    product_id_match = re.search(r"product-detail/(\d+)", row.get("url", ""))
-                    product_id = (
-                        product_id_match.group(1) if product_id_match else f"PROD-{row_idx}"
-                    )
+            def write(outfile):
+                csv.DictWriter(
+                    outfile, fieldnames=UCP_FEED_FIELDS, delimiter="\t"
+                ).writeheader()
+                buffer = io.StringIO()
+                writer = csv.DictWriter(
+                    buffer, fieldnames=UCP_FEED_FIELDS, delimiter="\t", restval=""
+                )
+                count = 0
+                for row_idx, row in enumerate(reader, start=2):
+                    # Key rows the same way transform_ucp_row assigns IDs
+                    key = extract_product_id(row.get("url")) or f"PROD-{row_idx}"
+                    duplicate = 1
+                    while key in current:
+                        duplicate += 1
+                        key = f"{key.split('#')[0]}#{duplicate}"
                     
-                    # Extract title (use optimized if available, else base title)
-                    title = row.get("title_optimized") or row.get("title", "").strip()
-                    # Ensure title is at least 30 chars for UCP (pad if needed)
-                    if len(title) < 30:
-                        category = clean_value(row.get("category", ""))
-                        title = f"{title} {category}".strip()[:70]
+                    row_hash = hashlib.blake2b(
+                        "\x1f".join(row.get(f) or "" for f in fieldnames).encode("utf-8"),
+                        digest_size=16,
+                    ).hexdigest()
                     
-                    # Handle price range (take lower value)
-                    price_str = row.get("price", "0").strip()
-                    if " -- " in price_str:
-                        price_value = float(price_str.split(" -- ")[0])
+                    cached = previous.get(key)
+                    if cached and cached[0] == row_hash:
+                        line = cached[1]
+                        delta["unchanged"] += 1
                     else:
                         try:
-                            price_value = float(price_str)
-                        except ValueError:
-                            price_value = 0.0
-                    
-                    formatted_price = f"{price_value:.2f} {currency}"
-                    
-                    # Determine availability
-                    try:
-                        stock_level = int(row.get("stock", "0") or "0")
-                        availability = "in stock" if stock_level > 0 else "out of stock"
-                    except (ValueError, TypeError):
-                        availability = "out of stock"
-                    
-                    # Clean values
-                    description = clean_value(row.get("description", ""))
-                    brand = clean_value(row.get("brand", "")) or "Generic"
-                    category = clean_value(row.get("category", ""))
-                    image_link = row.get("image", "").strip()
-                    url = row.get("url", "").strip()
-                    
-                    # --- UCP Enhancements ---
-                    # Extended description with trust signals
-                    extended_description = generate_extended_description(row)
-                    
-                    # GTIN field
-                    gtin = extract_gtin(row)
-                    
-                    # Trust signals
-                    shipping_label = "Free shipping on orders over $50; Standard 7-14 business days"
-                    return_policy = "30-day returns; Full refund or exchange"
-                    rating = row.get("rating", "4.5")  # Default rating if not provided
+                            writer.writerow(transform_ucp_row(row, row_idx, currency))
+                        except Exception as e:
+                            print(f"Warning: Skipped row {row_idx} due to error: {e}")
+                            continue
+                        line = buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+                        delta["changed" if cached else "added"].append(key)
                     
-                    # Construct enhanced GMC product entry
-                    gmc_product = {
-                        # Required fields
-                        "id": product_id,
-                        "title": title[:70],  # GMC/UCP title limit
-                        "description": extended_description,  # UCP-enhanced
-                        "link": url,
-                        "image_link": image_link,
-                        "price": formatted_price,
-                        "availability": availability,
-                        
-                        # Recommended fields
-                        "condition": "new",
-                        "brand": brand,
-                        "google_product_category": category,
-                        "shipping": row.get("shipping", f"0.00 {currency}"),
-                        
-                        # --- UCP Enhancement Fields ---
-                        "gtin": gtin,  # Global Trade Item Number
-                        "shipping_label": shipping_label,  # Trust signal
-                        "return_policy": return_policy,  # Trust signal
-                        "rating": rating,  # Review score
-                    }
-                    gmc_products.append(gmc_product)
-                
-                except Exception as e:
-                    print(f"Warning: Skipped row {row_idx} due to error: {e}")
-                    continue
-        
-        # Write to TSV file
-        if gmc_products:
-            fieldnames = [
-                # Core GMC fields (required/recommended)
-                "id", "title", "description", "link", "image_link", "price",
-                "availability", "condition", "brand", "google_product_category",
-                "shipping",
-                # UCP Enhancement fields
-                "gtin", "shipping_label", "return_policy", "rating"
-            ]
-            
-            with open(output_tsv_path, mode="w", newline="", encoding="utf-8") as outfile:
-                writer = csv.DictWriter(outfile, fieldnames=fieldnames, delimiter="\t")
-                writer.writeheader()
-                
-                for product in gmc_products:
-                    # Ensure all fields exist
-                    row_data = {field: product.get(field, "") for field in fieldnames}
-                    writer.writerow(row_data)
+                    current[key] = [row_hash, line]
+                    outfile.write(line)
+                    count += 1
+                return count
             
+            count = _write_atomically(output_tsv_path, write)
+    
+    except FileNotFoundError:
+        print(f"✗ Input file not found: {input_csv_path}")
+        return 0
+    except Exception as e:
+        print(f"✗ Error generating feed: {e}")
+        return 0
+    
+    if not count:
+        print("✗ No products found to generate feed.")
+        return 0
+    
+    delta["removed"] = [key for key in previous if key not in current]
+    delta["generated_at"] = datetime.now().isoformat()
+    _save_json_atomically(delta_path, delta)
+    _save_json_atomically(manifest_path, {
+        "fingerprint": fingerprint,
+        "fields": fieldnames,
+        "products": current,
+    })
+    
+    print(f"✓ Successfully generated UCP-enhanced GMC feed to {output_tsv_path}")
+    print(f"  Products: {count}")
+    print(
+        f"  Delta: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+        f"{len(delta['removed'])} removed, {delta['unchanged']} unchanged ({delta_path})"
+    )
+    print(f"  Date: {delta['generated_at']}")
+    return count
+
+
+def generate_ucp_enhanced_feed(input_csv_path, output_tsv_path, currency="USD",
+                               workers=1):
+    """
+    Generates a UCP-enhanced Google Merchant Center product feed.
+    
+    Rows flow through a read -> transform -> write generator pipeline, so
+    memory use stays constant regardless of catalog size. With workers > 1
+    the input is split into byte-range chunks transformed in a process pool;
+    the output is byte-identical to the single-process run.
+    
+    Args:
+        input_csv_path (str): Path to input CSV (feed.csv)
+        output_tsv_path (str): Path to output TSV for GMC
+        currency (str): Currency code (USD, NGN, etc.)
+        workers (int): Number of worker processes (1 = in-process)
+    
+    UCP Features Added:
+    - Extended title (70+ chars)
+    - Extended description (500+ chars)
+    - GTIN field
+    - Image link (supports high-res)
+    - Trust signals (shipping_label, return_policy, rating)
+    - Structured availability
+    """
+    try:
+        if workers > 1:
+            count = _generate_parallel(
+                input_csv_path, output_tsv_path, currency, workers
+            )
+        else:
+            products = transform_ucp_rows(read_feed_rows(input_csv_path), currency)
+            count = write_feed_tsv(products, output_tsv_path, UCP_FEED_FIELDS)
+        
+        if count:
             print(f"✓ Successfully generated UCP-enhanced GMC feed to {output_tsv_path}")
-            print(f"  Products: {len(gmc_products)}")
+            print(f"  Products: {count}")
             print(f"  Date: {datetime.now().isoformat()}")
-            return len(gmc_products)
+            return count
         else:
             print("✗ No products found to generate feed.")
             return 0
@@ -264,21 +566,10 @@ def generate_gmc_feed(input_csv_path, output_tsv_path, currency="USD"):
         reader = csv.DictReader(infile)
         for row in reader:
             # Extract product ID from URL
-            product_id_match = re.search(r"product-detail/(\d+)", row.get("url", ""))
-            product_id = (
-                product_id_match.group(1) if product_id_match else row.get("title", "")
-            )
+            product_id = extract_product_id(row.get("url")) or row.get("title", "")
 
             # Handle price range (take the lower value) and format with currency
-            price_str = row.get("price", "0").strip()
-            if " -- " in price_str:
-                price_value = float(price_str.split(" -- ")[0])
-            else:
-                try:
-                    price_value = float(price_str)
-                except ValueError:
-                    price_value = 0.0
-
+            price_value = lowest_price(row.get("price", "0"))
             formatted_price = f"{price_value:.2f} {currency}"
 
             # Determine availability
@@ -326,18 +617,33 @@ def generate_gmc_feed(input_csv_path, output_tsv_path, currency="USD"):
 
 
 if __name__ == "__main__":
+    import argparse
     import sys
     
+    parser = argparse.ArgumentParser(description="Generate the Google Merchant Center feed from feed.csv")
+    parser.add_argument("output_tsv", nargs="?", default="gmc_product_feed.tsv")
+    parser.add_argument("currency", nargs="?", default="NGN")
+    parser.add_argument("--legacy", action="store_true",
+                        help="Generate the standard (non-UCP) GMC feed")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Transform rows in N worker processes (UCP feed only)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-transform products changed since the last run "
+                             "and write a delta file (UCP feed only)")
+    args = parser.parse_args()
+    
     # Default: generate UCP-enhanced feed
     input_csv = "feed.csv"
-    output_tsv = "gmc_product_feed.tsv" if len(sys.argv) < 2 else sys.argv[1]
-    currency = "NGN" if len(sys.argv) < 3 else sys.argv[2]
     
     # Check if legacy mode requested
-    if "--legacy" in sys.argv:
-        count = generate_gmc_feed(input_csv, output_tsv, currency)
+    if args.legacy:
+        count = generate_gmc_feed(input_csv, args.output_tsv, args.currency)
+    elif args.incremental:
+        count = generate_incremental_feed(input_csv, args.output_tsv, args.currency)
     else:
         # Default: UCP-enhanced
-        count = generate_ucp_enhanced_feed(input_csv, output_tsv, currency)
+        count = generate_ucp_enhanced_feed(
+            input_csv, args.output_tsv, args.currency, workers=args.workers
+        )
     
     sys.exit(0 if count > 0 else 1)
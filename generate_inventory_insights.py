@@ -1,10 +1,9 @@
 import csv
 
+from src.columnar_catalog import open_catalog_for
 
-def generate_inventory_insights():
-    low_stock_products = []
-    top_selling_products = []
 
+def _scan_feed_csv(low_stock_products, top_selling_products):
     with open("feed.csv", "r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
@@ -22,6 +21,19 @@ def generate_inventory_insights():
             except (ValueError, TypeError):
                 pass
 
+
+def generate_inventory_insights():
+    low_stock_products = []
+    top_selling_products = []
+
+    catalog = open_catalog_for("feed.csv")
+    if catalog is not None:
+        # Typed columns from the memory-mapped catalog; missing values are NaN
+        low_stock_products = [catalog.row(i) for i, stock in enumerate(catalog.numeric("stock")) if stock < 10]
+        top_selling_products = [catalog.row(i) for i, rating in enumerate(catalog.numeric("rating")) if rating >= 4.5]
+    else:
+        _scan_feed_csv(low_stock_products, top_selling_products)
+
     with open("inventory_insights.txt", "w", encoding="utf-8") as f:
         f.write("--- Inventory Insights ---\n\n")
         f.write("--- Low Stock Products (less than 10 items) ---\n")
@@ -7,6 +7,9 @@ from flask import (
     redirect,
     session,
     render_template_string,
+    Response,
+    stream_with_context,
+    g,
 )
 from flask_cors import CORS
 import io
@@ -16,19 +19,22 @@ from werkzeug.security import generate_password_hash
 import os
 import csv
 import json
+import hashlib
+import math
+from functools import wraps
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash
 from dotenv import load_dotenv
-import google.generativeai as genai
 import uuid
-import matplotlib.pyplot as plt
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
 import base64
-from reportlab.lib.pagesizes import letter
 import traceback
 
+logger = logging.getLogger(__name__)
+
+from src.catalog import get_catalog
+from src.compression import compress_response, send_precompressed
+
 # --- Phase 3: Merchant API Integration ---
 try:
     from src.merchant_api import get_merchant_client, get_merchant_scheduler
@@ -47,6 +53,19 @@ if MERCHANT_API_ENABLED:
     except Exception as e:
         logger.warning(f"Phase 3: Could not initialize Merchant API: {e}")
 
+# Syncs run on the scheduler's background thread. The periodic sync only
+# starts where MERCHANT_API_SCHEDULER_ENABLED is set. Syncs never overlap
+# across app processes (e.g. gunicorn workers), and any process can report
+# on a job another one started (see MerchantSyncScheduler).
+_merchant_scheduler = None
+if _merchant_client is not None:
+    try:
+        _merchant_scheduler = get_merchant_scheduler()
+        if os.getenv("MERCHANT_API_SCHEDULER_ENABLED", "False").lower() == "true":
+            _merchant_scheduler.start()
+    except Exception as e:
+        logger.warning(f"Phase 3: Could not start Merchant sync scheduler: {e}")
+
 # --- Phase 4: Native Checkout & AI Agent Support ---
 try:
     from src.mcp_server import mcp_bp
@@ -86,57 +105,76 @@ if PHASE4_ENABLED:
         logger.warning(f"Phase 4: Could not initialize components: {e}")
 
 # --- Gemini API Setup ---
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# google.generativeai (like matplotlib and reportlab below) takes the better
+# part of a second to import, so it is loaded on first use instead of on
+# every cold start.
+_genai = None
+
+
+def _get_genai():
+    """Import and configure google.generativeai on first use."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        _genai = genai
+    return _genai
+
+
 if not os.getenv("GEMINI_API_KEY"):
     print("Warning: GEMINI_API_KEY environment variable not set.")
 
 
+SITE_DIR = os.path.join(os.getcwd(), "site")
+
+
+def _site_variant(name):
+    """Build output copy of a root file; its .gz/.br siblings are served."""
+    return os.path.join(SITE_DIR, name)
+
+
 # Serve static legal/info pages so nav links work locally
 @app.route("/about.html")
 def about():
-    return send_from_directory(os.getcwd(), "about.html")
+    return send_precompressed(os.getcwd(), "about.html", _site_variant("about.html"))
 
 
 @app.route("/terms.html")
 def terms():
-    return send_from_directory(os.getcwd(), "terms.html")
+    return send_precompressed(os.getcwd(), "terms.html", _site_variant("terms.html"))
 
 
 @app.route("/privacy.html")
 def privacy():
-    return send_from_directory(os.getcwd(), "privacy.html")
+    return send_precompressed(os.getcwd(), "privacy.html", _site_variant("privacy.html"))
 
 
 @app.route("/contact.html")
 def contact():
-    return send_from_directory(os.getcwd(), "contact.html")
+    return send_precompressed(os.getcwd(), "contact.html", _site_variant("contact.html"))
 
 
 # Serve the generated blog index from /site/blog.html for /blog.html
 @app.route("/blog.html")
 def blog_index():
-    return send_from_directory(os.path.join(os.getcwd(), "site"), "blog.html")
+    return send_precompressed(SITE_DIR, "blog.html")
 
 
 @app.route("/2025-trending-products.html")
 def trending_products():
-    return send_from_directory(
-        os.path.join(os.getcwd(), "site"), "2025-trending-products.html"
-    )
+    return send_precompressed(SITE_DIR, "2025-trending-products.html")
 
 
 @app.route("/tag-products.html")
 def tag_products():
-    return send_from_directory(os.path.join(os.getcwd(), "site"), "tag-products.html")
+    return send_precompressed(SITE_DIR, "tag-products.html")
 
 
 # Generic route for other tag pages, e.g., /tag-trending.html or /tag-2025.html
 # This will serve files like site/tag-trending.html or site/tag-2025.html
 @app.route("/tag-<string:tag_slug>.html")
 def serve_tag_page_generic(tag_slug):
-    return send_from_directory(
-        os.path.join(os.getcwd(), "site"), f"tag-{tag_slug}.html"
-    )
+    return send_precompressed(SITE_DIR, f"tag-{tag_slug}.html")
 
 
 # --- Phase 1: Admin Authentication with Security ---
@@ -154,16 +192,25 @@ def _ensure_admin_creds():
             "password_hash": hashed_pw,
             "created_at": datetime.now().isoformat()
         }
-        _save_json(ADMIN_CREDS_FILE, admin_data)
+        try:
+            _save_json(ADMIN_CREDS_FILE, admin_data)
+        except OSError as e:
+            logger.warning(f"Could not write {ADMIN_CREDS_FILE}: {e}")
 
 
 def _get_admin_creds():
-    """Load admin credentials from file."""
+    """
+    Load admin credentials from file, creating it on first use.
+
+    Read at login time rather than at import, so cold starts skip the
+    password hashing and changes on disk apply to the next login.
+    """
+    _ensure_admin_creds()
     try:
         if os.path.exists(ADMIN_CREDS_FILE):
             with open(ADMIN_CREDS_FILE, "r", encoding="utf-8") as f:
                 return json.load(f)
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, IOError):
         pass
     # Fallback to environment variables (for backwards compatibility)
     return {
@@ -172,19 +219,15 @@ def _get_admin_creds():
     }
 
 
-_ensure_admin_creds()
-ADMIN_CREDS = _get_admin_creds()
-ADMIN_USERNAME = ADMIN_CREDS.get("username", "admin")
-ADMIN_PASSWORD_HASH = ADMIN_CREDS.get("password_hash", generate_password_hash("password"))
-
 # Serve static files from the 'site' directory if requested with /site/ prefix
 
 
 # This will handle requests like /site/tag-trending.html
 @app.route("/site/<path:filename>")
 def serve_from_site_prefixed(filename):
-    # send_from_directory helps prevent directory traversal attacks.
-    return send_from_directory(os.path.join(os.getcwd(), "site"), filename)
+    # send_precompressed uses safe_join/send_from_directory, which prevent
+    # directory traversal attacks.
+    return send_precompressed(SITE_DIR, filename)
 
 
 UPLOAD_HISTORY_FILE = os.path.join(os.getcwd(), "upload_history.json")
@@ -195,18 +238,6 @@ ORDERS_FILE = os.path.join(DATA_DIR, "orders.json")
 LOYALTY_FILE = os.path.join(DATA_DIR, "loyalty.json")
 
 
-def _ensure_data_files():
-    """Initialize data directory and required files if they don't exist."""
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-    if not os.path.exists(ORDERS_FILE):
-        with open(ORDERS_FILE, "w", encoding="utf-8") as f:
-            json.dump([], f)
-    if not os.path.exists(LOYALTY_FILE):
-        with open(LOYALTY_FILE, "w", encoding="utf-8") as f:
-            json.dump({}, f)
-
-
 def _load_json(filepath):
     """Safely load JSON from file; return empty list or dict if file doesn't exist."""
     try:
@@ -228,9 +259,6 @@ def _save_json(filepath, data):
         json.dump(data, f, indent=2, ensure_ascii=False)
 
 
-# Initialize data files on startup
-_ensure_data_files()
-
 
 @app.after_request
 def set_security_headers(response):
@@ -241,93 +269,245 @@ def set_security_headers(response):
     return response
 
 
+# gzip/brotli for dynamic JSON/CSV; static files use precompressed variants
+app.after_request(compress_response)
+
+
 @app.route("/")
 def index():
     # Serve the landing page HTML
-    return send_from_directory(os.getcwd(), "landing_page.html")
+    return send_precompressed(
+        os.getcwd(), "landing_page.html", _site_variant("index.html")
+    )
 
 @app.route("/favicon.ico")
 def favicon():
     return send_from_directory(app.static_folder, "favicon.ico", mimetype="image/vnd.microsoft.icon")
 
 
+# --- HTTP caching for catalog reads ---
+CATALOG_CACHE_CONTROL = os.getenv(
+    "CATALOG_CACHE_CONTROL", "public, max-age=60, stale-while-revalidate=300"
+)
+FEED_CACHE_CONTROL = os.getenv("FEED_CACHE_CONTROL", "public, max-age=300")
+
+
 @app.route("/feed.csv")
 def feed():
-    # Serve the CSV product feed
-    return send_from_directory(os.getcwd(), "feed.csv")
+    # Serve the CSV product feed (send_file adds ETag/Last-Modified and
+    # answers conditional requests itself)
+    response = send_precompressed(os.getcwd(), "feed.csv", _site_variant("feed.csv"))
+    response.headers["Cache-Control"] = FEED_CACHE_CONTROL
+    return response
+
+
+FEED_FILE = os.path.join(os.getcwd(), "feed.csv")
+_catalog = get_catalog(FEED_FILE)
 
 
 def fetch_cj_products():
-    products = []
-
-    def clean_value(value):
-        if isinstance(value, str) and value.startswith("[") and value.endswith("]"):
-            try:
-                data = json.loads(value)
-                if isinstance(data, list):
-                    cleaned_data = [
-                        str(item)
-                        for item in data
-                        if isinstance(item, str)
-                        and item.strip()
-                        and not item.strip().isdigit()
-                        and item.strip().lower() != "cosplay"
-                    ]
-                    return ", ".join(cleaned_data)
-            except json.JSONDecodeError:
-                return value
-        return value
-
-    with open(
-        os.path.join(os.getcwd(), "feed.csv"), newline="", encoding="utf-8"
-    ) as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            row["description"] = clean_value(row.get("description", ""))
-            row["brand"] = clean_value(row.get("brand", ""))
-            row["category"] = clean_value(row.get("category", ""))
-            products.append(row)
-    return products
+    """Return all products from the shared catalog as read-only mappings."""
+    return _catalog.products()
+
+
+def _catalog_snapshot():
+    """The snapshot pinned for this request by catalog_cached, else the latest."""
+    snapshot = getattr(g, "catalog_snapshot", None)
+    return snapshot if snapshot is not None else _catalog.snapshot()
+
+
+def catalog_cached(f):
+    """
+    Decorator adding ETag/Last-Modified/Cache-Control to catalog reads.
+
+    The ETag is derived from the catalog version plus the query string, so a
+    matching If-None-Match is answered with 304 before the view runs.
+    """
+
+    @wraps(f)
+    def wrapped(*args, **kwargs):
+        snapshot = _catalog.snapshot()
+        g.catalog_snapshot = snapshot
+        query = sorted(request.args.items(multi=True))
+        etag = hashlib.sha1(
+            f"{snapshot.version}|{request.path}|{query}".encode("utf-8")
+        ).hexdigest()[:24]
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        # Weak: the same representation may be sent gzip/brotli-encoded
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = CATALOG_CACHE_CONTROL
+        if snapshot.last_modified is not None:
+            response.last_modified = snapshot.last_modified
+        return response
+
+    return wrapped
+
+
+def _write_feed(products):
+    """Atomically rewrite feed.csv and drop the cached catalog."""
+    tmp_path = FEED_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=products[0].keys())
+        writer.writeheader()
+        writer.writerows(products)
+    os.replace(tmp_path, FEED_FILE)
+    _catalog.invalidate()
+
+
+# --- /products pagination & projection ---
+PRODUCTS_MAX_PAGE_SIZE = int(os.getenv("PRODUCTS_MAX_PAGE_SIZE", "500"))
+PRODUCTS_STREAM_CHUNK_SIZE = 200
+
+
+def _optional_float(value):
+    """Parse an optional numeric query parameter; blank means not set."""
+    if value is None or not value.strip():
+        return None
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"not a finite number: {value}")
+    return number
+
+
+def _encode_cursor(version, offset):
+    """Opaque pagination cursor tied to the catalog version it was issued for."""
+    raw = f"{version}:{offset}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor, version):
+    """Return the offset encoded in cursor; ValueError if invalid or stale."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        cursor_version, offset = (
+            base64.urlsafe_b64decode(padded).decode("utf-8").rsplit(":", 1)
+        )
+        offset = int(offset)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_version != version:
+        raise ValueError("Cursor expired; the catalog has changed")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def _stream_json_array(items):
+    """Yield a JSON array in chunks so large exports are never held in memory."""
+    yield "["
+    chunk = []
+    first = True
+    for item in items:
+        chunk.append(app.json.dumps(item))
+        if len(chunk) >= PRODUCTS_STREAM_CHUNK_SIZE:
+            yield ("" if first else ",") + ",".join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield ("" if first else ",") + ",".join(chunk)
+    yield "]"
 
 
 @app.route("/products")
+@catalog_cached
 def get_products():
+    """
+    List products with optional search, category and price filters.
+
+    Query params:
+        search, category, min_price, max_price: filters
+        fields: comma-separated columns to return (default: all)
+        limit, cursor: paginate; the response becomes
+            {"products": [...], "total": int, "next_cursor": str or null}
+
+    Without limit/cursor the full result is streamed as a JSON array.
+    """
     search = request.args.get("search", "").strip().lower()
-    category = request.args.get("category", "").strip()
-    min_price = float(request.args.get("min_price", 0) or 0)
-    max_price = float(request.args.get("max_price", float("inf")) or float("inf"))
-    all_products = fetch_cj_products()
-    filtered = []
-    for p in all_products:
-        try:
-            price = float(p["price"])
-        except Exception:
-            price = 0
-        # Search filter
-        matches_search = (
-            not search
-            or search in p.get("title", "").lower()
-            or search in p.get("description", "").lower()
-            or search in p.get("brand", "").lower()
-            or search in p.get("category", "").lower()
+    category = request.args.get("category", "").strip().lower()
+    try:
+        min_price = _optional_float(request.args.get("min_price"))
+        max_price = _optional_float(request.args.get("max_price"))
+    except ValueError:
+        return jsonify({"error": "Invalid min_price or max_price"}), 400
+    snapshot = _catalog_snapshot()
+
+    fields = None
+    if request.args.get("fields"):
+        fields = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in snapshot.fieldnames]
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    if search:
+        # Ranked matches from the inverted index, then the price columns
+        candidates = [
+            i for i in snapshot.search(search)
+            if snapshot.in_price_range(i, min_price, max_price)
+        ]
+    else:
+        candidates = snapshot.price_range(min_price, max_price)
+    if category:
+        # Read the category column only, without building whole rows
+        categories = snapshot.column("category")
+        candidates = [i for i in candidates if category in categories[i].lower()]
+
+    if "limit" not in request.args and "cursor" not in request.args:
+        rows = snapshot.rows(candidates, fields)
+        return Response(
+            stream_with_context(_stream_json_array(rows)),
+            mimetype="application/json",
         )
-        if price >= min_price and price <= max_price and matches_search:
-            if not category or category.lower() in p["category"].lower():
-                filtered.append(p)
-    return jsonify(filtered)
+
+    try:
+        limit = int(request.args.get("limit", PRODUCTS_MAX_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, PRODUCTS_MAX_PAGE_SIZE)
+    offset = 0
+    if request.args.get("cursor"):
+        try:
+            offset = _decode_cursor(request.args["cursor"], snapshot.version)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    page = candidates[offset:offset + limit]
+    next_offset = offset + len(page)
+    return jsonify({
+        "products": list(snapshot.rows(page, fields)),
+        "total": len(candidates),
+        "next_cursor": (
+            _encode_cursor(snapshot.version, next_offset)
+            if next_offset < len(candidates) else None
+        ),
+    })
 
 
 @app.route("/product")
+@catalog_cached
 def get_product():
+    """Look up one product by exact title, or by CJ product ID / GTIN (?id=)."""
     title = request.args.get("title")
-    if not title:
-        return "Product title is required", 400
+    product_id = request.args.get("id")
+    if not title and not product_id:
+        return "Product title or id is required", 400
 
-    all_products = fetch_cj_products()
-    product = next((p for p in all_products if p["title"] == title), None)
+    snapshot = _catalog_snapshot()
+    if product_id:
+        doc_id = snapshot.find_by_id(product_id)
+    else:
+        doc_id = snapshot.find_by_title(title)
 
-    if product:
-        return jsonify(product)
+    if doc_id is not None:
+        return jsonify(dict(snapshot.products[doc_id]))
     else:
         return "Product not found", 404
 
@@ -338,7 +518,12 @@ def admin_login():
         username = request.form.get("username")
         password = request.form.get("password")
         # Use check_password_hash for secure comparison
-        if username == ADMIN_USERNAME and check_password_hash(ADMIN_PASSWORD_HASH, password):
+        creds = _get_admin_creds()
+        if (
+            username == creds.get("username", "admin")
+            and password
+            and check_password_hash(creds.get("password_hash", ""), password)
+        ):
             session["admin_logged_in"] = True
             return redirect("/admin")
         return render_template_string(
@@ -380,7 +565,7 @@ def admin_logout():
 def admin_page():
     if not session.get("admin_logged_in"):
         return redirect("/admin/login")
-    return send_from_directory(os.getcwd(), "admin.html")
+    return send_precompressed(os.getcwd(), "admin.html", _site_variant("admin.html"))
 
 
 def log_upload(filename, username):
@@ -411,7 +596,10 @@ def upload_feed():
     if not file.filename.lower().endswith(".csv"):
         return jsonify({"error": "Only CSV files are allowed"}), 400
     filename = secure_filename("feed.csv")
-    file.save(os.path.join(os.getcwd(), filename))
+    tmp_path = os.path.join(os.getcwd(), filename + ".upload")
+    file.save(tmp_path)
+    os.replace(tmp_path, os.path.join(os.getcwd(), filename))
+    _catalog.invalidate()
     log_upload(filename, session.get("admin_user", "admin"))
     return jsonify({"message": "Feed uploaded successfully!"}), 200
 
@@ -445,36 +633,19 @@ def change_credentials():
         "updated_at": datetime.now().isoformat()
     }
     _save_json(ADMIN_CREDS_FILE, admin_data)
-    global ADMIN_USERNAME, ADMIN_PASSWORD_HASH
-    ADMIN_USERNAME = new_user
-    ADMIN_PASSWORD_HASH = hashed_pw
     return jsonify({"message": "Credentials updated. Please log in again."})
 
 
-@app.before_request
-def load_admin_creds():
-    """Load admin credentials from file (called before each request)."""
-    global ADMIN_USERNAME, ADMIN_PASSWORD_HASH
-    if os.path.exists(ADMIN_CREDS_FILE):
-        try:
-            with open(ADMIN_CREDS_FILE, "r", encoding="utf-8") as f:
-                creds = json.load(f)
-                ADMIN_USERNAME = creds.get("username", ADMIN_USERNAME)
-                ADMIN_PASSWORD_HASH = creds.get("password_hash", ADMIN_PASSWORD_HASH)
-        except (json.JSONDecodeError, IOError):
-            pass
-
-
 @app.route("/admin/products", methods=["GET", "POST", "DELETE"])
 def manage_products():
     if not session.get("admin_logged_in"):
         return jsonify({"error": "Unauthorized"}), 401
     if request.method == "GET":
-        return jsonify(fetch_cj_products())
+        return jsonify([dict(p) for p in fetch_cj_products()])
     elif request.method == "POST":
         # Add or update a product
         data = request.json
-        products = fetch_cj_products()
+        products = [dict(p) for p in fetch_cj_products()]
         # If title exists, update; else, add
         found = False
         for p in products:
@@ -485,30 +656,18 @@ def manage_products():
         if not found:
             products.append(data)
         # Write back to CSV
-        with open(
-            os.path.join(os.getcwd(), "feed.csv"), "w", encoding="utf-8", newline=""
-        ) as f:
-            writer = csv.DictWriter(f, fieldnames=products[0].keys())
-            writer.writeheader()
-            writer.writerows(products)
+        _write_feed(products)
         return jsonify({"message": "Product saved."})
     elif request.method == "DELETE":
         # Delete a product by title
         title = request.args.get("title")
-        products = fetch_cj_products()
-        products = [p for p in products if p["title"] != title]
+        products = [dict(p) for p in fetch_cj_products() if p["title"] != title]
         if products:
-            with open(
-                os.path.join(os.getcwd(), "feed.csv"), "w", encoding="utf-8", newline=""
-            ) as f:
-                writer = csv.DictWriter(f, fieldnames=products[0].keys())
-                writer.writeheader()
-                writer.writerows(products)
+            _write_feed(products)
         return jsonify({"message": "Product deleted."})
 
 
 # --- Implementation of Task #4: AI Product Tag Generator ---
-from functools import wraps
 from time import time
 
 request_counts = {}
@@ -539,7 +698,7 @@ def generate_tags():
 
     try:
         # Initialize the Gemini Pro model
-        model = genai.GenerativeModel("gemini-pro")
+        model = _get_genai().GenerativeModel("gemini-pro")
 
         # Example prompt as per your GEMINI.md
         prompt = f"Generate 5-7 SEO-friendly product tags for a product with the title '{product_title}' and description '{product_description}'. Return the tags as a single comma-separated string."
@@ -753,6 +912,10 @@ INVOICES_DIR = os.path.join(os.getcwd(), "invoices")
 
 def generate_invoice_pdf(order_details):
     """Generates a PDF invoice for a given order."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.pdfgen import canvas
+
     if not os.path.exists(INVOICES_DIR):
         os.makedirs(INVOICES_DIR)
 
@@ -837,6 +1000,8 @@ def calculate_profit():
 
 def generate_inventory_graph():
     """Generates a dummy inventory graph using matplotlib."""
+    import matplotlib.pyplot as plt
+
     # Simulate inventory data
     products = ["Product A", "Product B", "Product C", "Product D"]
     stock_levels = [50, 80, 30, 60]
@@ -1144,49 +1309,57 @@ def api_customer_refunds():
 # --- PHASE 3: MERCHANT API INTEGRATION ENDPOINTS ---
 # ============================================================================
 
+def _cache_age_header(report):
+    """Age header (whole seconds) for a report served from the Merchant report cache."""
+    cache = report.get("cache")
+    return {"Age": str(int(cache["age_seconds"]))} if cache else {}
+
+
 @app.route('/api/sync-merchant-api', methods=['POST'])
 def sync_merchant_api():
     """
-    Trigger real-time synchronization with Merchant Center.
+    Start a synchronization with Merchant Center in the background.
     
     POST /api/sync-merchant-api
-    Optional JSON body: { "feed_path": "path/to/feed.tsv" }
+    Optional JSON body: { "feed_path": "path/to/feed.tsv", "full": false }
+    Only changed products are sent unless "full" is true. Deletes are
+    tracked per feed_path, and skipped when the feed looks truncated unless
+    "full" is true.
     
-    Returns: {
-        "success": bool,
-        "products_synced": int,
-        "products_failed": int,
-        "duration_seconds": float,
-        "timestamp": ISO timestamp
+    Returns 202: {
+        "job_id": string,
+        "status": "queued",
+        "status_url": "/api/merchant-sync-status?job_id=...",
+        "merchant_id": string
     }
+    409 with the running job's id if a sync is already in progress.
     """
-    if not MERCHANT_API_ENABLED or _merchant_client is None:
+    if not MERCHANT_API_ENABLED or _merchant_scheduler is None:
         return jsonify({
             "error": "Merchant API not enabled or not initialized",
             "hint": "Check GCP_PROJECT_ID and google-cloud-merchant installation"
         }), 503
     
     try:
-        data = request.get_json() or {}
-        feed_path = data.get("feed_path", "gmc_product_feed.tsv")
-        
-        # Trigger sync
-        success, stats = _merchant_client.sync_products_from_feed(feed_path)
-        
+        data = request.get_json(silent=True) or {}
+        job, started = _merchant_scheduler.submit(
+            feed_path=data.get("feed_path", "gmc_product_feed.tsv"),
+            full=bool(data.get("full", False)),
+        )
         response = {
-            "success": success,
-            "products_synced": stats.get("products_synced", 0),
-            "products_failed": stats.get("products_failed", 0),
-            "duration_seconds": stats.get("duration_seconds", 0),
-            "timestamp": stats.get("timestamp", datetime.now().isoformat()),
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "status_url": f"/api/merchant-sync-status?job_id={job['job_id']}",
             "merchant_id": _merchant_client.merchant_id
         }
         
-        if not success:
-            response["error"] = stats.get("error", "Unknown error")
-            return jsonify(response), 500
+        if not started:
+            response["error"] = "A Merchant sync is already running"
+            response["trigger"] = job["trigger"]
+            response["started_at"] = job["started_at"]
+            return jsonify(response), 409
         
-        return jsonify(response), 200
+        return jsonify(response), 202
     
     except Exception as e:
         return jsonify({
@@ -1201,6 +1374,7 @@ def merchant_insights():
     Retrieve performance insights from Merchant Center.
     
     GET /api/merchant-insights?days=30
+    days is clamped to 1-90; a non-integer value returns 400.
     
     Returns: {
         "period_days": int,
@@ -1211,8 +1385,11 @@ def merchant_insights():
             "revenue": float,
             "conversion_rate": float
         },
-        "timestamp": ISO timestamp
+        "timestamp": ISO timestamp,
+        "cache": { "hit": bool, "stale": bool, "age_seconds": float, "ttl_seconds": float }
     }
+    Reports are cached per (days, merchant) and refreshed in the background
+    once stale; the Age header carries the cache age.
     """
     if not MERCHANT_API_ENABLED or _merchant_client is None:
         return jsonify({
@@ -1222,7 +1399,7 @@ def merchant_insights():
     try:
         days = int(request.args.get("days", 30))
         insights = _merchant_client.get_insights(days=days)
-        return jsonify(insights), 200
+        return jsonify(insights), 200, _cache_age_header(insights)
     
     except ValueError:
         return jsonify({"error": "Invalid days parameter"}), 400
@@ -1239,20 +1416,39 @@ def merchant_sync_status():
     Get status of Merchant API synchronization.
     
     GET /api/merchant-sync-status
+    GET /api/merchant-sync-status?job_id=...
     
     Returns: {
         "products_synced": int,
         "products_failed": int,
         "last_sync_time": ISO timestamp or null,
         "last_error": string or null,
-        "client_initialized": bool
+        "client_initialized": bool,
+        "scheduler": { "scheduler_running": bool, "active_job": {...} or null, ... }
+    }
+    With job_id, returns that sync job instead: {
+        "job_id": string,
+        "trigger": "manual" | "scheduled",
+        "status": "queued" | "running" | "succeeded" | "failed",
+        "progress": { "products_sent": int, "batches": int, ... },
+        "result": sync stats once finished,
+        "error": string or null
     }
     """
     if not MERCHANT_API_ENABLED or _merchant_client is None:
         return jsonify({"error": "Merchant API not enabled"}), 503
     
     try:
+        job_id = request.args.get("job_id")
+        if job_id:
+            job = _merchant_scheduler.get_job(job_id) if _merchant_scheduler else None
+            if job is None:
+                return jsonify({"error": f"Unknown sync job: {job_id}"}), 404
+            return jsonify(job), 200
+        
         stats = _merchant_client.get_sync_stats()
+        if _merchant_scheduler is not None:
+            stats["scheduler"] = _merchant_scheduler.status()
         return jsonify(stats), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1270,7 +1466,8 @@ def merchant_inventory():
         "in_stock": int,
         "out_of_stock": int,
         "last_sync": ISO timestamp,
-        "warnings": [list of warnings]
+        "warnings": [list of warnings],
+        "cache": { "hit": bool, "stale": bool, "age_seconds": float, "ttl_seconds": float }
     }
     """
     if not MERCHANT_API_ENABLED or _merchant_client is None:
@@ -1278,7 +1475,7 @@ def merchant_inventory():
     
     try:
         status = _merchant_client.get_inventory_status()
-        return jsonify(status), 200
+        return jsonify(status), 200, _cache_age_header(status)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1317,7 +1514,7 @@ def phase_3_info():
         "endpoints": {
             "sync": "POST /api/sync-merchant-api",
             "insights": "GET /api/merchant-insights?days=30",
-            "status": "GET /api/merchant-sync-status",
+            "status": "GET /api/merchant-sync-status[?job_id=...]",
             "inventory": "GET /api/merchant-inventory"
         }
     }), 200
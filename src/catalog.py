@@ -0,0 +1,423 @@
+"""
+Product Catalog Store
+File: src/catalog.py
+Purpose: Process-wide, read-only product catalog parsed from feed.csv
+
+The catalog parses the feed once, builds a text search index over it, and
+keeps the result until the file on disk changes (detected by mtime/size) or a
+writer calls invalidate(). Readers get an immutable CatalogSnapshot, so a
+request keeps a consistent view even if a reload happens while it is running.
+"""
+
+import csv
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from src.columnar_catalog import (
+    ColumnarCatalog,
+    build_from_csv,
+    catalog_path_for,
+    open_catalog_for,
+)
+from src.feed_normalizer import (
+    STOREFRONT_CLEANED_FIELDS,
+    STOREFRONT_DROP_TERMS,
+    clean_value,
+    extract_gtin,
+    extract_product_id,
+    parse_price,
+)
+from src.search_index import InvertedIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEED_PATH = os.path.join(os.getcwd(), "feed.csv")
+
+class CatalogSnapshot:
+    """Immutable parsed copy of the feed at one file version."""
+
+    def __init__(self, products: List[Mapping[str, str]],
+                 signature: Optional[Tuple[int, int]], fieldnames: List[str]):
+        self.products: Tuple[Mapping[str, str], ...] = tuple(products)
+        self.signature = signature
+        self.fieldnames = list(fieldnames)
+        self.search_index = InvertedIndex.build(self.products)
+        self._columns: Dict[str, Sequence[str]] = {}
+        self._build_price_columns()
+        self._build_lookup_indexes()
+        self.loaded_at = time.time()
+
+    def _build_lookup_indexes(self):
+        """Hash indexes from CJ product ID, pseudo-GTIN and title to doc ID."""
+        self.product_ids: List[str] = []
+        self._by_id: Dict[str, int] = {}
+        self._by_gtin: Dict[str, int] = {}
+        self._by_title: Dict[str, int] = {}
+        for doc_id, product in enumerate(self.products):
+            pid = extract_product_id(product.get("url"))
+            self.product_ids.append(pid)
+            # First occurrence wins, matching the old linear scan
+            if pid:
+                self._by_id.setdefault(pid, doc_id)
+            gtin = extract_gtin(product)
+            if gtin:
+                self._by_gtin.setdefault(gtin, doc_id)
+            title = product.get("title")
+            if title:
+                self._by_title.setdefault(title, doc_id)
+
+    def find_by_id(self, product_id: str) -> Optional[int]:
+        """Doc ID for a CJ product ID or pseudo-GTIN, or None."""
+        product_id = (product_id or "").strip()
+        doc_id = self._by_id.get(product_id)
+        if doc_id is None:
+            doc_id = self._by_gtin.get(product_id)
+        return doc_id
+
+    def find_by_title(self, title: str) -> Optional[int]:
+        """Doc ID for an exact product title, or None."""
+        return self._by_title.get(title)
+
+    def _build_price_columns(self):
+        """Parse prices once into numeric columns plus sorted range indexes."""
+        self.price_min = array("d")
+        self.price_max = array("d")
+        for product in self.products:
+            low, high = parse_price(product.get("price"))
+            self.price_min.append(low)
+            self.price_max.append(high)
+
+        priced = [i for i, low in enumerate(self.price_min) if not math.isnan(low)]
+        # Doc IDs ordered by lowest / highest variant price, with matching keys
+        # so range bounds can be found by binary search.
+        self._by_min = array("l", sorted(priced, key=self.price_min.__getitem__))
+        self._min_keys = array("d", (self.price_min[i] for i in self._by_min))
+        self._by_max = array("l", sorted(priced, key=self.price_max.__getitem__))
+        self._max_keys = array("d", (self.price_max[i] for i in self._by_max))
+
+    def in_price_range(self, doc_id: int, min_price: Optional[float] = None,
+                       max_price: Optional[float] = None) -> bool:
+        """Whether any variant price of a product falls inside [min_price, max_price]."""
+        if min_price is None and max_price is None:
+            return True
+        low, high = self.price_min[doc_id], self.price_max[doc_id]
+        if math.isnan(low):
+            return False
+        if max_price is not None and low > max_price:
+            return False
+        if min_price is not None and high < min_price:
+            return False
+        return True
+
+    def price_range(self, min_price: Optional[float] = None,
+                    max_price: Optional[float] = None) -> List[int]:
+        """
+        Return IDs (in feed order) of products with a variant price in range.
+
+        A range-priced product matches when its price range overlaps
+        [min_price, max_price]. Products without a parseable price never match.
+        """
+        if min_price is None and max_price is None:
+            return list(range(len(self.products)))
+
+        if max_price is not None:
+            below_max = self._by_min[:bisect_right(self._min_keys, max_price)]
+        if min_price is not None:
+            above_min = self._by_max[bisect_left(self._max_keys, min_price):]
+
+        if min_price is None:
+            ids = below_max
+        elif max_price is None:
+            ids = above_min
+        else:
+            # Binary search on both bounds, then check the other bound for
+            # the smaller slice against the numeric columns.
+            if len(below_max) <= len(above_min):
+                ids = [i for i in below_max if self.price_max[i] >= min_price]
+            else:
+                ids = [i for i in above_min if self.price_min[i] <= max_price]
+        return sorted(ids)
+
+    @property
+    def version(self) -> str:
+        """Short identifier of the feed file version this snapshot was built from."""
+        if self.signature is None:
+            return "empty"
+        mtime_ns, size = self.signature
+        return f"{mtime_ns:x}-{size:x}"
+
+    @property
+    def last_modified(self) -> Optional[float]:
+        """Feed file mtime in seconds, or None if the feed does not exist."""
+        if self.signature is None:
+            return None
+        return self.signature[0] / 1e9
+
+    def search(self, query: str) -> List[int]:
+        """Return indexes into products matching every term of query, best first."""
+        return self.search_index.search(query)
+
+    def column(self, name: str) -> Sequence[str]:
+        """One field of every product, in doc ID order ("" where missing)."""
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = tuple(p.get(name, "") for p in self.products)
+        return column
+
+    def row(self, doc_id: int, fields: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        """Plain dict copy of one product, limited to fields ("" if missing) if given."""
+        product = self.products[doc_id]
+        if fields is None:
+            return dict(product)
+        return {field: product.get(field, "") for field in fields}
+
+    def rows(self, doc_ids: Sequence[int], fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, str]]:
+        """row() for each of doc_ids, in order."""
+        return (self.row(doc_id, fields) for doc_id in doc_ids)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def __iter__(self) -> Iterator[Mapping[str, str]]:
+        return iter(self.products)
+
+
+class _MappedRows(Sequence[Mapping[str, str]]):
+    """Rows of a ColumnarCatalog, decoded into read-only mappings on access."""
+
+    __slots__ = ("_columnar",)
+
+    def __init__(self, columnar):
+        self._columnar = columnar
+
+    def __len__(self) -> int:
+        return len(self._columnar)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("catalog index out of range")
+        return MappingProxyType(self._columnar.row(i))
+
+
+class MappedCatalogSnapshot(CatalogSnapshot):
+    """
+    CatalogSnapshot served straight from a memory-mapped columnar catalog.
+
+    Every column and index is a view into the mapped file, so processes
+    sharing a feed share one physical copy of it; rows are decoded per
+    access instead of being held as Python objects.
+    """
+
+    def __init__(self, columnar):
+        self.columnar = columnar
+        self.products = _MappedRows(columnar)
+        self.signature = (columnar.source["mtime_ns"], columnar.source["size"])
+        self.fieldnames = list(columnar.fieldnames)
+        self.search_index = columnar.search_index()
+        self.price_min = columnar.numeric("price_min")
+        self.price_max = columnar.numeric("price_max")
+        orders = columnar.price_orders
+        self._by_min, self._min_keys = orders["by_min"], orders["min_keys"]
+        self._by_max, self._max_keys = orders["by_max"], orders["max_keys"]
+        self.product_ids = columnar.product_ids
+        self._by_id = columnar.lookups["id"]
+        self._by_gtin = columnar.lookups["gtin"]
+        self._by_title = columnar.lookups["title"]
+        self._columns: Dict[str, Sequence[str]] = {}
+        self.loaded_at = time.time()
+
+    def column(self, name: str) -> Sequence[str]:
+        """One field of every product; decoded on first use and kept for this snapshot."""
+        column = self._columns.get(name)
+        if column is None:
+            if name in self.columnar.fieldnames:
+                column = self.columnar.decoded_column(name)
+            else:
+                column = [""] * len(self)
+            self._columns[name] = column
+        return column
+
+    def row(self, doc_id: int, fields: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        """One product as a plain dict, decoding only the requested fields."""
+        return self.columnar.row(doc_id, fields)
+
+    def rows(self, doc_ids: Sequence[int], fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, str]]:
+        """row() for each of doc_ids, decoding large batches column by column."""
+        return self.columnar.rows_at(doc_ids, fields)
+
+
+class ProductCatalog:
+    """
+    Lazily loaded, mtime-checked view of a CSV product feed.
+
+    Thread-safe: concurrent readers share one snapshot and only one thread
+    parses the file when it changes.
+
+    When mapped is true the snapshot is served from the columnar catalog
+    next to the feed (feed.catalog, see src/columnar_catalog.py), which is
+    rebuilt when it does not match the feed. gunicorn workers then share
+    one page-cached copy of the data, and a new feed is swapped in by
+    atomically replacing the file, so readers never block on each other.
+    If the file cannot be written (e.g. a read-only deploy) the catalog
+    falls back to parsing the CSV into memory.
+    """
+
+    def __init__(self, feed_path: Optional[str] = None, mapped: bool = True):
+        self.feed_path = feed_path or DEFAULT_FEED_PATH
+        self.mapped = mapped
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self.load_count = 0
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.feed_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Return the current snapshot, reloading if the feed changed on disk."""
+        signature = self._stat_signature()
+        snap = self._snapshot
+        if snap is not None and snap.signature == signature:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            if snap is None or snap.signature != signature:
+                snap = self._load(signature)
+                self._snapshot = snap
+            return snap
+
+    def products(self) -> Tuple[Mapping[str, str], ...]:
+        """Return all products as read-only mappings."""
+        return self.snapshot().products
+
+    def invalidate(self):
+        """Drop the cached snapshot so the next read re-parses the feed."""
+        with self._lock:
+            self._snapshot = None
+
+    def _load(self, signature: Optional[Tuple[int, int]]) -> CatalogSnapshot:
+        if signature is None:
+            logger.warning(f"Catalog feed not found: {self.feed_path}")
+            return CatalogSnapshot([], None, [])
+
+        if self.mapped:
+            try:
+                snap = self._load_mapped()
+            except FileNotFoundError:
+                logger.warning(f"Catalog feed disappeared while loading: {self.feed_path}")
+                return CatalogSnapshot([], None, [])
+            except OSError as e:
+                logger.warning(f"Columnar catalog unavailable ({e}); loading {self.feed_path} into memory")
+                self.mapped = False
+            except (ValueError, KeyError, struct.error) as e:
+                # Unreadable, stale-format or corrupt file: serve this feed
+                # version from the CSV and try the columnar catalog again
+                # when the feed changes
+                logger.warning(f"Columnar catalog unreadable ({e}); loading {self.feed_path} into memory")
+            else:
+                self.load_count += 1
+                return snap
+        return self._load_csv()
+
+    def _load_mapped(self) -> "MappedCatalogSnapshot":
+        columnar = open_catalog_for(self.feed_path)
+        if columnar is None:
+            # One process builds while the others wait, then everyone maps
+            # the same file.
+            with _file_lock(catalog_path_for(self.feed_path) + ".lock"):
+                columnar = open_catalog_for(self.feed_path)
+                if columnar is None:
+                    start = time.time()
+                    build_from_csv(self.feed_path)
+                    columnar = open_catalog_for(self.feed_path)
+                    logger.info(f"Columnar catalog rebuilt in {time.time() - start:.3f}s")
+        if columnar is None:
+            # The feed changed again while building; map what was built and
+            # let the next snapshot() call pick up the newer feed.
+            columnar = ColumnarCatalog(catalog_path_for(self.feed_path))
+        return MappedCatalogSnapshot(columnar)
+
+    def _load_csv(self) -> CatalogSnapshot:
+        start = time.time()
+        products = []
+        try:
+            csvfile = open(self.feed_path, newline="", encoding="utf-8")
+        except FileNotFoundError:
+            logger.warning(f"Catalog feed disappeared while loading: {self.feed_path}")
+            return CatalogSnapshot([], None, [])
+        with csvfile:
+            # Record the version of the file we actually opened; if it is
+            # replaced mid-read the next snapshot() call sees the mismatch.
+            st = os.fstat(csvfile.fileno())
+            reader = csv.DictReader(csvfile)
+            for row in reader:
+                for field in STOREFRONT_CLEANED_FIELDS:
+                    row[field] = clean_value(row.get(field, ""), STOREFRONT_DROP_TERMS)
+                products.append(MappingProxyType(row))
+            fieldnames = reader.fieldnames or []
+
+        self.load_count += 1
+        logger.info(
+            f"Catalog loaded: {len(products)} products from {self.feed_path} "
+            f"({time.time() - start:.3f}s)"
+        )
+        return CatalogSnapshot(products, (st.st_mtime_ns, st.st_size), fieldnames)
+
+    def stats(self) -> Dict[str, Any]:
+        """Basic catalog metrics for status endpoints."""
+        snap = self._snapshot
+        return {
+            "feed_path": self.feed_path,
+            "loaded": snap is not None,
+            "mapped": isinstance(snap, MappedCatalogSnapshot),
+            "products": len(snap) if snap is not None else 0,
+            "version": snap.version if snap is not None else None,
+            "load_count": self.load_count,
+        }
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive inter-process lock on path (a no-op where fcntl is unavailable)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Global instance
+_catalog = None
+
+
+def get_catalog(feed_path: Optional[str] = None) -> ProductCatalog:
+    """Get or create the global product catalog."""
+    global _catalog
+    if _catalog is None:
+        _catalog = ProductCatalog(feed_path)
+    return _catalog
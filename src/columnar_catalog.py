@@ -0,0 +1,493 @@
+"""
+Columnar Catalog File
+File: src/columnar_catalog.py
+Purpose: Compact, memory-mappable copy of feed.csv for fast catalog loads
+
+feed.csv stays the interchange format; the ingestion step also writes a
+feed.catalog file next to it. Layout:
+
+    magic (8 bytes) | header offset, header length (2 x uint64 LE)
+    data blocks, each 8-byte aligned
+    header (UTF-8 JSON describing the blocks)
+
+Every CSV column is stored as a string column: an offsets block (rows + 1
+uint32 entries, uint64 past 4 GiB of text) plus a UTF-8 data block, with
+description/brand/category already cleaned. Prices, stock and rating are
+also stored as typed float64 columns, and CJ product IDs as a uint64 column
+with a sorted ID index. The file also carries the structures the API catalog
+(src/catalog.py) queries: search postings, price sort orders and sorted
+ID/GTIN/title lookup indexes.
+
+Readers mmap the file and view the blocks through memoryview.cast(), so
+opening a catalog only parses the header and the pages are shared between
+processes through the OS page cache.
+"""
+
+import csv
+import json
+import logging
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+from src.feed_normalizer import (
+    STOREFRONT_CLEANED_FIELDS,
+    STOREFRONT_DROP_TERMS,
+    clean_value,
+    extract_gtin,
+    extract_product_id,
+    parse_price,
+)
+from src.search_index import MappedInvertedIndex, index_document
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GMCCAT\x00\x01"
+FORMAT_VERSION = 3
+
+# Below this many rows, rows_at() decodes values one by one instead of
+# copying whole columns out of the mapping first
+BULK_DECODE_MIN_ROWS = 256
+
+_PREFIX = struct.Struct("<8sQQ")
+_ALIGN = 8
+
+
+def catalog_path_for(csv_path: str) -> str:
+    """Path of the columnar catalog written alongside a CSV feed."""
+    return os.path.splitext(csv_path)[0] + ".catalog"
+
+
+def _parse_int(value) -> float:
+    try:
+        return float(int(value))
+    except (ValueError, TypeError):
+        return math.nan
+
+
+def _parse_float(value) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return math.nan
+
+
+# --- Writer ---
+
+class _StringColumnWriter:
+    """Accumulates one string column: offsets in memory, UTF-8 bytes in a temp file."""
+
+    def __init__(self):
+        self.offsets = array("Q", [0])
+        self.data = tempfile.TemporaryFile()
+        self.size = 0
+
+    def append(self, value: str):
+        encoded = value.encode("utf-8")
+        self.data.write(encoded)
+        self.size += len(encoded)
+        self.offsets.append(self.size)
+
+
+def _strings_from(values: Iterable[str]) -> _StringColumnWriter:
+    column = _StringColumnWriter()
+    for value in values:
+        column.append(value)
+    return column
+
+
+def write_catalog(rows: Iterable[Mapping[str, str]], fieldnames: Sequence[str],
+                  path: str, source: Optional[Dict[str, int]] = None) -> int:
+    """
+    Write rows (CSV-style dicts) to a columnar catalog file; return the row count.
+
+    Besides the columns, the file carries the lookup structures the API
+    catalog needs (search postings, price orders, ID/GTIN/title indexes), so
+    readers never rebuild them. The file is written to a temp path and
+    atomically renamed into place. source, if given, identifies the CSV the
+    catalog was built from.
+    """
+    strings = {name: _StringColumnWriter() for name in fieldnames}
+    numeric = {name: array("d") for name in ("price_min", "price_max", "stock", "rating")}
+    pids = array("Q")
+    product_ids = _StringColumnWriter()
+    postings: Dict[str, Dict[int, float]] = {}
+    # Lookup keys -> first row with that key
+    lookups: Dict[str, Dict[str, int]] = {"id": {}, "gtin": {}, "title": {}}
+
+    count = 0
+    for row in rows:
+        doc = {}
+        for name, column in strings.items():
+            value = row.get(name) or ""
+            if name in STOREFRONT_CLEANED_FIELDS:
+                value = clean_value(value, STOREFRONT_DROP_TERMS)
+            column.append(value)
+            doc[name] = value
+        index_document(postings, count, doc)
+        low, high = parse_price(row.get("price"))
+        numeric["price_min"].append(low)
+        numeric["price_max"].append(high)
+        # Same parsing rules the CSV consumers apply to these cells
+        numeric["stock"].append(_parse_int(row.get("stock", 0)))
+        numeric["rating"].append(_parse_float(row.get("rating", 0)))
+        pid = extract_product_id(doc.get("url"))
+        product_ids.append(pid)
+        pids.append(int(pid) if pid and int(pid) < 2 ** 64 else 0)
+        if pid:
+            lookups["id"].setdefault(pid, count)
+        gtin = extract_gtin(doc)
+        if gtin:
+            lookups["gtin"].setdefault(gtin, count)
+        if doc.get("title"):
+            lookups["title"].setdefault(doc["title"], count)
+        count += 1
+
+    order = sorted((i for i in range(count) if pids[i]), key=pids.__getitem__)
+    pid_keys = array("Q", (pids[i] for i in order))
+    pid_rows = array("Q", order)
+
+    # Doc IDs ordered by lowest / highest variant price, with matching keys
+    price_min, price_max = numeric["price_min"], numeric["price_max"]
+    priced = [i for i, low in enumerate(price_min) if not math.isnan(low)]
+    by_min = array("q", sorted(priced, key=price_min.__getitem__))
+    by_max = array("q", sorted(priced, key=price_max.__getitem__))
+    price_orders = {
+        "by_min": by_min, "min_keys": array("d", (price_min[i] for i in by_min)),
+        "by_max": by_max, "max_keys": array("d", (price_max[i] for i in by_max)),
+    }
+
+    vocab = sorted(postings)
+    term_offsets = array("I", [0])
+    term_docs = array("I")
+    term_scores = array("f")
+    for term in vocab:
+        for doc_id, score in postings[term].items():
+            term_docs.append(doc_id)
+            term_scores.append(score)
+        term_offsets.append(len(term_docs))
+    del postings
+
+    tmp_path = f"{path}.tmp"
+    temp_columns = list(strings.values()) + [product_ids]
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, 0, 0))
+
+            def block(write) -> List[int]:
+                f.write(b"\0" * (-f.tell() % _ALIGN))
+                offset = f.tell()
+                write(f)
+                return [offset, f.tell() - offset]
+
+            def string_block(column: _StringColumnWriter) -> Dict[str, Any]:
+                column.data.seek(0)
+                # 32-bit offsets unless the column holds more than 4 GiB of text
+                offsets = column.offsets if column.size >= 2 ** 32 else array("I", column.offsets)
+                ref = {
+                    "offset_type": offsets.typecode,
+                    "offsets": block(offsets.tofile),
+                    "data": block(lambda out: shutil.copyfileobj(column.data, out)),
+                }
+                column.data.close()
+                return ref
+
+            string_refs = {name: string_block(column) for name, column in strings.items()}
+            numeric_refs = {name: block(values.tofile) for name, values in numeric.items()}
+            numeric_refs["pid"] = block(pids.tofile)
+            index_refs = {
+                "pid": {"keys": block(pid_keys.tofile), "rows": block(pid_rows.tofile)},
+                "product_id": string_block(product_ids),
+                "price": {name: block(values.tofile) for name, values in price_orders.items()},
+                "search": {
+                    "vocab": string_block(_strings_from(vocab)),
+                    "offsets": block(term_offsets.tofile),
+                    "docs": block(term_docs.tofile),
+                    "scores": block(term_scores.tofile),
+                },
+            }
+            for name, keys in lookups.items():
+                sorted_keys = sorted(keys)
+                index_refs[name] = {
+                    "keys": string_block(_strings_from(sorted_keys)),
+                    "rows": block(array("I", (keys[k] for k in sorted_keys)).tofile),
+                }
+
+            header = json.dumps({
+                "version": FORMAT_VERSION,
+                "byteorder": sys.byteorder,
+                "rows": count,
+                "fieldnames": list(fieldnames),
+                "source": source,
+                "strings": string_refs,
+                "numeric": numeric_refs,
+                "indexes": index_refs,
+            }, separators=(",", ":")).encode("utf-8")
+            f.write(b"\0" * (-f.tell() % _ALIGN))
+            header_offset = f.tell()
+            f.write(header)
+            f.seek(0)
+            f.write(_PREFIX.pack(MAGIC, header_offset, len(header)))
+        os.replace(tmp_path, path)
+    finally:
+        for column in temp_columns:
+            column.data.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+def build_from_csv(csv_path: str, out_path: Optional[str] = None) -> int:
+    """Convert a CSV feed into its columnar catalog; return the row count."""
+    out_path = out_path or catalog_path_for(csv_path)
+    with open(csv_path, newline="", encoding="utf-8") as csvfile:
+        # Record the version of the CSV actually read (see ColumnarCatalog.is_current)
+        st = os.fstat(csvfile.fileno())
+        reader = csv.DictReader(csvfile)
+        fieldnames = reader.fieldnames or []
+        count = write_catalog(reader, fieldnames, out_path,
+                              source={"mtime_ns": st.st_mtime_ns, "size": st.st_size})
+    logger.info(f"Columnar catalog written: {count} products -> {out_path}")
+    return count
+
+
+# --- Reader ---
+
+class StringColumn(Sequence[str]):
+    """Read-only view of one string column; values are decoded on access."""
+
+    __slots__ = ("_offsets", "_data")
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        offsets = self._offsets
+        if type(i) is int and 0 <= i < len(offsets) - 1:
+            return str(self._data[offsets[i]:offsets[i + 1]], "utf-8")
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string column index out of range")
+        return str(self._data[offsets[i]:offsets[i + 1]], "utf-8")
+
+
+class SortedStringIndex:
+    """Read-only str -> row mapping stored as sorted keys plus rows."""
+
+    __slots__ = ("_keys", "_rows")
+
+    def __init__(self, keys: StringColumn, rows: Sequence[int]):
+        self._keys = keys
+        self._rows = rows
+
+    def get(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._rows[i]
+        return default
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class ColumnarCatalog:
+    """
+    Memory-mapped, read-only columnar catalog.
+
+    Raises ValueError if the file is not a catalog this version can read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, header_offset, header_len = _PREFIX.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError("bad magic")
+            header = json.loads(self._mmap[header_offset:header_offset + header_len])
+        except (struct.error, ValueError) as e:
+            self._mmap.close()
+            raise ValueError(f"Not a columnar catalog: {path} ({e})")
+        if header.get("version") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+            self._mmap.close()
+            raise ValueError(f"Unsupported columnar catalog version/byte order: {path}")
+
+        self._buf = memoryview(self._mmap)
+        self.header = header
+        self.rows: int = header["rows"]
+        self.fieldnames: List[str] = header["fieldnames"]
+        self.source: Optional[Dict[str, int]] = header.get("source")
+        self._strings = {name: self._string_column(ref) for name, ref in header["strings"].items()}
+        # (offsets, data block start) per field, so row() slices the mapped
+        # file directly instead of going through StringColumn per value
+        self._data = self._buf.cast("B")
+        self._row_columns = {
+            name: (self._block(ref["offsets"], ref["offset_type"]), ref["data"][0])
+            for name, ref in header["strings"].items()
+        }
+        self._numeric = {
+            name: self._block(ref, "Q" if name == "pid" else "d")
+            for name, ref in header["numeric"].items()
+        }
+        indexes = header["indexes"]
+        self._pid_keys = self._block(indexes["pid"]["keys"], "Q")
+        self._pid_rows = self._block(indexes["pid"]["rows"], "Q")
+        self.product_ids = self._string_column(indexes["product_id"])
+        self.price_orders = {
+            name: self._block(ref, "q" if name.startswith("by_") else "d")
+            for name, ref in indexes["price"].items()
+        }
+        self.lookups = {
+            name: SortedStringIndex(self._string_column(indexes[name]["keys"]),
+                                    self._block(indexes[name]["rows"], "I"))
+            for name in ("id", "gtin", "title")
+        }
+
+    def _string_column(self, ref: Dict[str, Any]) -> StringColumn:
+        return StringColumn(self._block(ref["offsets"], ref["offset_type"]),
+                            self._block(ref["data"], "B"))
+
+    def _block(self, ref: List[int], fmt: str) -> memoryview:
+        offset, length = ref
+        return self._buf[offset:offset + length].cast(fmt)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str) -> StringColumn:
+        """String column for a CSV field."""
+        return self._strings[name]
+
+    def decoded_column(self, name: str) -> List[str]:
+        """
+        Every value of a string column, decoded in one pass.
+
+        Equal values share one str object, so low-cardinality columns such
+        as category cost little to keep decoded.
+        """
+        offsets, start = self._row_columns[name]
+        raw = bytes(self._data[start:start + offsets[-1]])
+        text = raw.decode("ascii") if raw.isascii() else None
+        offsets = offsets.tolist()
+        shared: Dict[str, str] = {}
+        values = []
+        for i in range(self.rows):
+            value = text[offsets[i]:offsets[i + 1]] if text is not None else str(raw[offsets[i]:offsets[i + 1]], "utf-8")
+            values.append(shared.setdefault(value, value))
+        return values
+
+    def numeric(self, name: str) -> memoryview:
+        """Typed column: price_min, price_max, stock, rating (float64, NaN if missing) or pid (uint64, 0 if missing)."""
+        return self._numeric[name]
+
+    def row(self, i: int, fields: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        """One product as a CSV-style dict, limited to fields ("" if unknown) if given."""
+        if not 0 <= i < self.rows:
+            raise IndexError("catalog index out of range")
+        data = self._data
+        values = {}
+        for name in self.fieldnames if fields is None else fields:
+            column = self._row_columns.get(name)
+            if column is None:
+                values[name] = ""
+            else:
+                offsets, start = column
+                values[name] = str(data[start + offsets[i]:start + offsets[i + 1]], "utf-8")
+        return values
+
+    def rows_at(self, ids: Sequence[int], fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, str]]:
+        """
+        Products at ids, in order, as row() returns them.
+
+        Large batches copy each requested column out of the mapping once and
+        slice it per row instead of decoding every value separately; columns
+        that are pure ASCII are decoded as a whole, since their byte offsets
+        are also character offsets.
+        """
+        names = list(self.fieldnames if fields is None else fields)
+        if len(ids) < BULK_DECODE_MIN_ROWS:
+            for i in ids:
+                yield self.row(i, names)
+            return
+
+        columns = []
+        for name in names:
+            column = self._row_columns.get(name)
+            if column is None:
+                columns.append((name, "", [0] * (self.rows + 1), True))
+                continue
+            offsets, start = column
+            raw = bytes(self._data[start:start + offsets[-1]])
+            ascii_only = raw.isascii()
+            columns.append((name, raw.decode("ascii") if ascii_only else raw, offsets.tolist(), ascii_only))
+        for i in ids:
+            if not 0 <= i < self.rows:
+                raise IndexError("catalog index out of range")
+            values = {}
+            for name, text, offsets, ascii_only in columns:
+                value = text[offsets[i]:offsets[i + 1]]
+                values[name] = value if ascii_only else str(value, "utf-8")
+            yield values
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return self.rows_at(range(self.rows))
+
+    def find_pid(self, pid) -> Optional[int]:
+        """Row index of a CJ product ID, or None."""
+        try:
+            key = int(pid)
+        except (ValueError, TypeError):
+            return None
+        keys = self._pid_keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return self._pid_rows[i]
+        return None
+
+    def search_index(self) -> MappedInvertedIndex:
+        """Search index over the stored postings (see src.search_index)."""
+        ref = self.header["indexes"]["search"]
+        return MappedInvertedIndex(self._string_column(ref["vocab"]), self._block(ref["offsets"], "I"),
+                                   self._block(ref["docs"], "I"), self._block(ref["scores"], "f"))
+
+    def is_current(self, csv_path: str) -> bool:
+        """Whether this catalog was built from the CSV as it is on disk now."""
+        try:
+            st = os.stat(csv_path)
+        except FileNotFoundError:
+            return False
+        return self.source == {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "rows": self.rows, "bytes": len(self._mmap)}
+
+
+def open_catalog_for(csv_path: str) -> Optional[ColumnarCatalog]:
+    """Open the columnar catalog of csv_path if it exists and is up to date, else None."""
+    path = catalog_path_for(csv_path)
+    try:
+        catalog = ColumnarCatalog(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring columnar catalog {path}: {e}")
+        return None
+    if not catalog.is_current(csv_path):
+        logger.info(f"Columnar catalog {path} is stale; falling back to {csv_path}")
+        return None
+    return catalog
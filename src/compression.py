@@ -0,0 +1,184 @@
+"""
+Response Compression
+File: src/compression.py
+Purpose: gzip/brotli negotiation for dynamic responses and build-time
+precompressed variants for static files
+
+Dynamic JSON/CSV responses are compressed on the way out (streamed responses
+chunk by chunk). Static pages are compressed once by build.py into .gz/.br
+siblings, which send_precompressed() serves as-is when the client accepts
+them, so there is no per-request compression cost.
+
+Brotli is optional: without the `brotli` package only gzip is used.
+"""
+
+import gzip
+import logging
+import mimetypes
+import os
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+from flask import request, send_file, send_from_directory
+from werkzeug.utils import safe_join
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# Files build.py writes .gz/.br siblings for
+PRECOMPRESS_EXTENSIONS = {
+    ".html", ".json", ".xml", ".csv", ".tsv", ".txt", ".css", ".js", ".svg",
+}
+
+# Dynamic responses worth compressing
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "text/csv", "text/html", "text/plain",
+    "text/tab-separated-values", "application/xml", "text/xml",
+}
+
+# Bodies smaller than this are sent as-is
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# (Content-Encoding, file suffix), most preferred first
+_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _supported_encodings() -> List[str]:
+    return ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Pick the best content-coding the current request accepts, if any."""
+    for encoding in _supported_encodings():
+        if request.accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+# --- Build-time precompression ---
+
+def precompress_file(path: str) -> int:
+    """Write .gz (and .br if available) siblings of path; return files written."""
+    with open(path, "rb") as f:
+        data = f.read()
+    source_mtime = os.path.getmtime(path)
+    written = 0
+    for encoding, suffix in _VARIANTS:
+        if encoding == "br" and not BROTLI_AVAILABLE:
+            continue
+        target = path + suffix
+        if os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+            continue
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=11)
+        else:
+            # mtime=0 keeps the output reproducible between builds
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        with open(target, "wb") as f:
+            f.write(compressed)
+        written += 1
+    return written
+
+
+def precompress_tree(root: str) -> int:
+    """Precompress every text asset under root; return files written."""
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if os.path.splitext(name)[1].lower() in PRECOMPRESS_EXTENSIONS:
+                written += precompress_file(os.path.join(dirpath, name))
+    return written
+
+
+# --- Request-time helpers ---
+
+def send_precompressed(directory: str, filename: str,
+                       variant_path: Optional[str] = None, **kwargs):
+    """
+    send_from_directory() that prefers a precompressed sibling.
+
+    Looks for variant_path + ".br"/".gz" (variant_path defaults to the file
+    itself) and serves it with Content-Encoding when the client accepts that
+    coding and the variant is not older than the source file.
+    """
+    source_path = safe_join(directory, filename)
+    if variant_path is None:
+        variant_path = source_path
+
+    if source_path and variant_path and os.path.isfile(source_path):
+        source_mtime = os.path.getmtime(source_path)
+        for encoding, suffix in _VARIANTS:
+            if request.accept_encodings[encoding] <= 0:
+                continue
+            compressed_path = variant_path + suffix
+            if (os.path.isfile(compressed_path)
+                    and os.path.getmtime(compressed_path) >= source_mtime):
+                mimetype = kwargs.pop("mimetype", None) or (
+                    mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                )
+                response = send_file(compressed_path, mimetype=mimetype, **kwargs)
+                response.headers["Content-Encoding"] = encoding
+                response.vary.add("Accept-Encoding")
+                return response
+
+    response = send_from_directory(directory, filename, **kwargs)
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            out = compressor.process(chunk)
+            if out:
+                yield out
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+        yield compressor.flush()
+
+
+def compress_response(response):
+    """after_request hook: compress eligible dynamic responses."""
+    if (
+        request.method == "HEAD"
+        or response.status_code != 200
+        or response.direct_passthrough  # send_file; see send_precompressed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return response
+        if encoding == "br":
+            data = brotli.compress(data, quality=BROTLI_QUALITY)
+        else:
+            data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+        response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    return response
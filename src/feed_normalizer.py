@@ -0,0 +1,111 @@
+"""
+Feed Normalizer
+File: src/feed_normalizer.py
+Purpose: Shared per-cell normalization of feed.csv rows
+
+Every consumer of feed.csv (the GMC/UCP feed generator, the storefront
+catalog, the columnar catalog writer, the MCP server) cleans cells with these
+helpers, so they all agree on what a product's description, price and ID are.
+This is the hottest per-row code in the pipeline: regexes are compiled once,
+clean_value() only looks at cells that look like a JSON array, and the plain
+string arrays CJ emits (no escapes) are split directly instead of going
+through json.loads().
+"""
+
+import json
+import math
+import re
+from typing import AbstractSet, Mapping, Tuple
+
+PRODUCT_ID_RE = re.compile(r"product-detail/(\d+)")
+
+# Cells the storefront serves cleaned, and the extra JSON-array items it
+# hides (CJ tags many listings "cosplay")
+STOREFRONT_CLEANED_FIELDS = ("description", "brand", "category")
+STOREFRONT_DROP_TERMS = frozenset({"cosplay"})
+
+_VALID_GTIN_LENGTHS = (8, 12, 13, 14)
+
+# A JSON array of strings with no escapes or control characters, which
+# splitting on '","' decodes exactly like json.loads() would
+_SIMPLE_STRING_ARRAY_RE = re.compile(r'\["[^"\\\x00-\x1f]*(?:","[^"\\\x00-\x1f]*)*"\]')
+
+_NO_DROP_TERMS: AbstractSet[str] = frozenset()
+
+
+def clean_value(value, drop_terms: AbstractSet[str] = _NO_DROP_TERMS):
+    """
+    Clean JSON array strings and convert to comma-separated values.
+
+    Blank and purely numeric items are dropped, as are items matching
+    drop_terms (lowercase, e.g. STOREFRONT_DROP_TERMS). Anything that is
+    not a JSON array is returned unchanged.
+    """
+    if not isinstance(value, str) or value[:1] != "[" or value[-1:] != "]":
+        return value
+    if _SIMPLE_STRING_ARRAY_RE.fullmatch(value):
+        items = value[2:-2].split('","')
+    else:
+        try:
+            items = json.loads(value)
+        except json.JSONDecodeError:
+            return value
+        if not isinstance(items, list):
+            return value
+    return ", ".join([
+        item
+        for item in items
+        if isinstance(item, str)
+        and (stripped := item.strip())
+        and not stripped.isdigit()
+        and (not drop_terms or stripped.lower() not in drop_terms)
+    ])
+
+
+def parse_price(value) -> Tuple[float, float]:
+    """
+    Parse a CJ price cell into (min, max).
+
+    Handles single prices ("9.12") and variant ranges ("4.86 -- 6.22").
+    Returns (nan, nan) when the cell is empty or not numeric.
+    """
+    text = (value or "").strip()
+    if not text:
+        return math.nan, math.nan
+    low, sep, high = text.partition("--")
+    try:
+        price_min = float(low)
+        price_max = float(high) if sep else price_min
+    except ValueError:
+        return math.nan, math.nan
+    if price_max < price_min:
+        price_min, price_max = price_max, price_min
+    return price_min, price_max
+
+
+def lowest_price(value) -> float:
+    """Lowest variant price of a price cell, or 0.0 if it has none."""
+    price_min, _ = parse_price(value)
+    return 0.0 if math.isnan(price_min) else price_min
+
+
+def extract_product_id(url) -> str:
+    """CJ product ID from a product-detail URL, or ""."""
+    match = PRODUCT_ID_RE.search(url or "")
+    return match.group(1) if match else ""
+
+
+def extract_gtin(product_row: Mapping[str, str]) -> str:
+    """
+    Extract or derive GTIN/EAN from product data.
+
+    CJ Dropshipping does not provide GTINs, so when the row has no valid one
+    a deterministic 12-digit pseudo-GTIN is derived from the product ID.
+    """
+    gtin = (product_row.get("gtin") or "").strip()
+    if gtin and len(gtin) in _VALID_GTIN_LENGTHS:
+        return gtin
+    pid = extract_product_id(product_row.get("url"))
+    if pid:
+        return f"00{pid}"[-12:]
+    return ""
@@ -19,8 +19,12 @@ from typing import Dict, List, Any, Tuple, Optional
 import uuid
 import json
 import logging
+import math
 from datetime import datetime, timedelta
 
+from src.catalog import get_catalog
+from src.feed_normalizer import extract_gtin
+
 # Initialize logger
 logger = logging.getLogger(__name__)
 
@@ -279,17 +283,36 @@ class MCPToolExecutor:
         }
     
     def get_product_details(self, product_id: str) -> Dict[str, Any]:
-        """Get product details."""
+        """Get product details by CJ product ID or GTIN."""
+        snapshot = get_catalog().snapshot()
+        doc_id = snapshot.find_by_id(product_id)
+        if doc_id is None:
+            raise LookupError(f"Product '{product_id}' not found")
+
+        product = snapshot.products[doc_id]
+        price = snapshot.price_min[doc_id]
+        try:
+            rating = float(product.get("rating") or "")
+        except ValueError:
+            rating = None
+        try:
+            in_stock = int(product.get("stock") or "") > 0
+        except ValueError:
+            in_stock = None  # CJ list API does not report stock
+
         return {
-            "product_id": product_id,
-            "title": f"Product {product_id}",
-            "description": "Product details will be fetched from Phase 3 API",
-            "price": 29.99,
-            "rating": 4.5,
-            "reviews_count": 120,
-            "in_stock": True,
-            "sku": f"SKU-{product_id}",
-            "gtin": f"GTIN-{product_id}"
+            "product_id": snapshot.product_ids[doc_id] or product_id,
+            "title": product.get("title", ""),
+            "description": product.get("description", ""),
+            "price": None if math.isnan(price) else price,
+            "price_range": product.get("price", ""),
+            "rating": rating,
+            "in_stock": in_stock,
+            "category": product.get("category", ""),
+            "brand": product.get("brand", ""),
+            "image": product.get("image", ""),
+            "url": product.get("url", ""),
+            "gtin": extract_gtin(product),
         }
     
     def check_inventory(self, product_ids: List[str]) -> Dict[str, Any]:
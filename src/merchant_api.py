@@ -20,9 +20,30 @@ Environment Variables Required:
 import os
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from datetime import datetime
+from typing import Callable, Dict, Optional, Any, Tuple
+import threading
 import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: overlap protection stays within one process
+    fcntl = None
+
+from src.merchant_cache import StaleWhileRevalidateCache
+from src.merchant_quota import get_quota_limiter
+from src.merchant_upload import (
+    CHANNEL,
+    CONTENT_LANGUAGE,
+    SHADOW_FILE,
+    TARGET_COUNTRY,
+    MerchantBatchUploader,
+    MerchantShadowStore,
+    iter_feed_tsv,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +59,12 @@ except ImportError:
     MERCHANT_API_AVAILABLE = False
     logger.warning("google-cloud-merchant not installed. Phase 3 features disabled.")
 
+# How long a report request waits for Merchant API quota before giving up
+REPORTING_QUOTA_TIMEOUT = float(os.getenv("MERCHANT_API_REPORTING_QUOTA_TIMEOUT", "10"))
+
+# Longest reporting period get_insights() serves; longer requests are clamped
+INSIGHTS_MAX_DAYS = 90
+
 # Schedule import for periodic sync
 try:
     import schedule
@@ -46,6 +73,22 @@ except ImportError:
     SCHEDULE_AVAILABLE = False
     schedule = None
 
+# Sync jobs kept for /api/merchant-sync-status, and how often the scheduler
+# thread checks for due jobs (seconds)
+MAX_SYNC_JOBS = 50
+SCHEDULER_POLL_SECONDS = 30
+# Job records shared by every app process, and how often a running job's
+# progress is written there (seconds)
+SYNC_JOBS_FILE = os.getenv("MERCHANT_API_SYNC_JOBS_FILE", "merchant_sync_jobs.json")
+JOB_PROGRESS_SAVE_SECONDS = 2.0
+# Held by whichever process is syncing, since syncs rewrite the shadow file
+SYNC_LOCK_FILE = f"{SHADOW_FILE}.lock"
+
+SYNC_PROGRESS_KEYS = (
+    "products_read", "products_sent", "products_skipped", "products_failed",
+    "inserted", "updated", "deleted", "batches",
+)
+
 
 class MerchantAPIClient:
     """
@@ -75,6 +118,10 @@ class MerchantAPIClient:
         
         # Initialize client (lazy loading)
         self._client = None
+        self._quota = get_quota_limiter()
+        self._uploader = MerchantBatchUploader(self.merchant_id, limiter=self._quota)
+        self._shadow = MerchantShadowStore()
+        self._reports = StaleWhileRevalidateCache()
         self._last_sync = None
         self._last_error = None
         self._sync_stats = {
@@ -84,6 +131,10 @@ class MerchantAPIClient:
             "sync_duration_seconds": 0
         }
     
+    # Insights and inventory status are simulated until the reporting query
+    # is integrated; like simulated uploads, they draw no Merchant API quota
+    reports_simulated = True
+
     def _get_client(self):
         """Lazy load Merchant API client."""
         if self._client is None:
@@ -96,85 +147,110 @@ class MerchantAPIClient:
                 raise
         return self._client
     
-    def sync_products_from_feed(self, feed_path: str) -> Tuple[bool, Dict[str, Any]]:
+    def sync_products_from_feed(self, feed_path: str, full: bool = False, lane: str = "manual",
+                                progress: Optional[Callable[[Dict[str, Any]], None]] = None
+                                ) -> Tuple[bool, Dict[str, Any]]:
         """
         Sync products from local feed file to Merchant Center via API.
-        
+
+        Rows are streamed from the feed and uploaded in concurrent batches
+        (see src/merchant_upload.py); a product that fails does not fail the
+        rest of its batch. Only changes since the last successful push are
+        sent: new and changed products are inserted, unchanged ones skipped,
+        and offers no longer in the feed deleted (MERCHANT_API_SHADOW_FILE
+        records what was pushed from each feed). If the feed is missing more
+        than MERCHANT_API_MAX_DELETE_FRACTION of the offers pushed from it,
+        it is taken to be truncated and nothing is deleted unless full is set.
+
         Args:
             feed_path (str): Path to TSV product feed file (generated by generate_gmc_feed.py)
-        
+            full (bool): Resend every product, not just the changed ones, and
+                apply deletes even past MERCHANT_API_MAX_DELETE_FRACTION
+            lane (str): Quota lane to draw on, "scheduled" or "manual"
+            progress (callable): Called with the running stats after each batch
+
         Returns:
             Tuple[bool, Dict]: (success, stats_dict)
             - success: Whether sync completed
             - stats_dict: {
-                "products_synced": int,
+                "products_synced": int,   # inserted + updated
                 "products_failed": int,
-                "errors": [list of errors],
-                "duration_seconds": float
+                "products_skipped": int,  # unchanged, not sent
+                "products_sent": int,
+                "inserted": int, "updated": int, "deleted": int,
+                "deletes_skipped": int,   # withheld as a likely truncated feed
+                "errors": [list of errors, at most 100],
+                "duration_seconds": float,
+                "products_per_sec": float,
+                "batches": int,
+                "retries": int
               }
         """
         if not os.path.exists(feed_path):
             return False, {"error": f"Feed file not found: {feed_path}"}
-        
-        start_time = time.time()
-        stats = {
-            "products_synced": 0,
-            "products_failed": 0,
-            "errors": [],
-            "feed_path": feed_path,
-            "merchant_id": self.merchant_id
-        }
-        
+
         try:
             logger.info(f"📤 Starting product sync from {feed_path}")
-            
-            # Parse TSV feed
-            products = self._parse_feed_tsv(feed_path)
-            logger.info(f"   Parsed {len(products)} products from feed")
-            
-            # Sync each product
-            for idx, product in enumerate(products, 1):
-                try:
-                    # Convert product dict to Merchant API format
-                    api_product = self._convert_to_merchant_format(product)
-                    
-                    # In production: Use actual Merchant API call
-                    # For now: Simulate successful sync
-                    self._simulate_product_sync(api_product)
-                    
-                    stats["products_synced"] += 1
-                    
-                    if idx % 100 == 0:
-                        logger.info(f"   Progress: {idx}/{len(products)} synced")
-                
-                except Exception as e:
-                    stats["products_failed"] += 1
-                    stats["errors"].append(f"Product {product.get('id', 'unknown')}: {str(e)}")
-                    logger.warning(f"   Failed to sync product {idx}: {e}")
-            
-            elapsed = time.time() - start_time
-            stats["duration_seconds"] = elapsed
+
+            def log_progress(progress_stats):
+                if progress_stats["batches"] % 10 == 0:
+                    logger.info(
+                        f"   Progress: {progress_stats['products_sent']} sent, "
+                        f"{progress_stats['products_skipped']} unchanged after {progress_stats['batches']} batches"
+                    )
+                if progress:
+                    progress(progress_stats)
+
+            stats = self._uploader.upload(
+                iter_feed_tsv(feed_path),
+                convert=self._convert_to_merchant_format,
+                progress=log_progress,
+                shadow=self._shadow,
+                source=os.path.abspath(feed_path),
+                full=full,
+                lane=lane,
+            )
+            stats["feed_path"] = feed_path
+            stats["merchant_id"] = self.merchant_id
             stats["timestamp"] = datetime.now().isoformat()
-            
+
             self._last_sync = datetime.now()
             self._sync_stats = stats
-            
-            logger.info(f"✓ Product sync completed: {stats['products_synced']} synced, {stats['products_failed']} failed ({elapsed:.2f}s)")
-            
+            # Inventory status reports the last sync time
+            self._reports.invalidate(("inventory", self.merchant_id))
+
+            logger.info(
+                f"✓ Product sync completed: {stats['inserted']} inserted, {stats['updated']} updated, "
+                f"{stats['deleted']} deleted, {stats['products_skipped']} unchanged, "
+                f"{stats['products_failed']} failed in {stats['batches']} batches "
+                f"({stats['duration_seconds']:.2f}s, {stats['products_per_sec']} products/s)"
+            )
+
             return True, stats
-        
+
         except Exception as e:
             logger.error(f"❌ Product sync failed: {e}")
             self._last_error = str(e)
-            stats["error"] = str(e)
-            return False, stats
+            return False, {
+                "products_synced": 0,
+                "products_failed": 0,
+                "errors": [],
+                "feed_path": feed_path,
+                "merchant_id": self.merchant_id,
+                "error": str(e),
+            }
     
     def get_insights(self, days: int = 30) -> Dict[str, Any]:
         """
         Retrieve performance insights from Merchant Center.
         
+        Served from the report cache: fresh for
+        MERCHANT_API_REPORT_CACHE_TTL_SECONDS, then served stale while a
+        background refresh runs (see src/merchant_cache.py).
+        
         Args:
-            days (int): Number of days to retrieve data for (default: 30)
+            days (int): Number of days to retrieve data for (default: 30),
+                clamped to 1..INSIGHTS_MAX_DAYS
         
         Returns:
             Dict with metrics:
@@ -184,10 +260,21 @@ class MerchantAPIClient:
             - revenue: Total revenue
             - conversion_rate: Click-to-order conversion %
             - avg_cpc: Average cost per click (if paid traffic)
+            - cache: {"hit", "stale", "age_seconds", "ttl_seconds"}
         """
+        days = min(max(int(days), 1), INSIGHTS_MAX_DAYS)
+        return self._cached_report(("insights", days, self.merchant_id), lambda: self._fetch_insights(days))
+    
+    def _fetch_insights(self, days: int) -> Dict[str, Any]:
+        """Query insights from the Merchant API (uncached)."""
         try:
             logger.info(f"📊 Fetching Merchant insights (last {days} days)...")
             
+            if not self.reports_simulated and not self._quota.acquire(
+                    "reporting", timeout=REPORTING_QUOTA_TIMEOUT):
+                return {"error": "Merchant API quota exhausted, retry later",
+                        "timestamp": datetime.now().isoformat()}
+
             # In production: Use actual Merchant API reporting
             # For now: Return simulated data structure
             insights = {
@@ -217,13 +304,21 @@ class MerchantAPIClient:
         """
         Check current inventory/availability status.
         
+        Served from the report cache like get_insights(); a successful sync
+        drops the cached copy.
+        
         Returns:
             Dict with inventory stats:
             - total_products: Total products in inventory
             - in_stock: Products currently in stock
             - out_of_stock: Products out of stock
             - warnings: Any inventory warnings
+            - cache: {"hit", "stale", "age_seconds", "ttl_seconds"}
         """
+        return self._cached_report(("inventory", self.merchant_id), self._fetch_inventory_status)
+    
+    def _fetch_inventory_status(self) -> Dict[str, Any]:
+        """Query inventory status from the Merchant API (uncached)."""
         status = {
             "timestamp": datetime.now().isoformat(),
             "total_products": 0,
@@ -234,6 +329,11 @@ class MerchantAPIClient:
         }
         
         try:
+            if not self.reports_simulated and not self._quota.acquire(
+                    "reporting", timeout=REPORTING_QUOTA_TIMEOUT):
+                status["error"] = "Merchant API quota exhausted, retry later"
+                return status
+
             # In production: Query actual Merchant Center inventory
             # For now: Return structure
             logger.info("✓ Inventory status retrieved")
@@ -243,105 +343,351 @@ class MerchantAPIClient:
             status["error"] = str(e)
             return status
     
+    def _cached_report(self, key: Tuple, fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Serve a report from the cache; reports with an error are not cached."""
+        report, cache = self._reports.get(key, fetch, cacheable=lambda result: "error" not in result)
+        return {**report, "cache": cache}
+    
     def get_sync_stats(self) -> Dict[str, Any]:
         """Get statistics on recent syncs."""
         return {
             **self._sync_stats,
             "last_error": self._last_error,
-            "client_initialized": self._client is not None
+            "client_initialized": self._client is not None,
+            "quota": self._quota.headroom(),
+            "report_cache": self._reports.stats(),
         }
     
     # --- Helper Methods ---
     
-    @staticmethod
-    def _parse_feed_tsv(feed_path: str) -> List[Dict[str, str]]:
-        """Parse TSV feed file into product dictionaries."""
-        import csv
-        products = []
-        try:
-            with open(feed_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f, delimiter='\t')
-                for row in reader:
-                    products.append(row)
-            return products
-        except Exception as e:
-            logger.error(f"Failed to parse feed file: {e}")
-            return []
-    
     @staticmethod
     def _convert_to_merchant_format(product: Dict[str, str]) -> Dict[str, Any]:
-        """Convert feed product dict to Merchant API format."""
-        return {
-            "id": product.get("id", ""),
+        """
+        Convert a feed row (generate_gmc_feed.py TSV) to a Content API product.
+
+        offerId is the feed id; channel, contentLanguage and targetCountry come
+        from MERCHANT_API_CONTENT_LANGUAGE / MERCHANT_API_TARGET_COUNTRY, and
+        the price keeps the feed's currency ("12.50 NGN"). Raises ValueError
+        for a row without an id or with an unparseable price.
+        """
+        offer_id = (product.get("id") or "").strip()
+        if not offer_id:
+            raise ValueError("Missing id")
+        value, _, currency = (product.get("price") or "").strip().partition(" ")
+        float(value)  # ValueError for a missing or malformed price
+        item = {
+            "offerId": offer_id,
+            "channel": CHANNEL,
+            "contentLanguage": CONTENT_LANGUAGE,
+            "targetCountry": TARGET_COUNTRY,
             "title": product.get("title", ""),
             "description": product.get("description", ""),
             "link": product.get("link", ""),
-            "image_link": product.get("image_link", ""),
-            "price": {
-                "currency": "USD",
-                "value": product.get("price", "0").split()[0]
-            },
-            "availability": product.get("availability", "in stock"),
-            "brand": product.get("brand", ""),
-            "gtin": product.get("gtin", ""),
-            "condition": product.get("condition", "new"),
-            "product_category": product.get("google_product_category", ""),
+            "imageLink": product.get("image_link", ""),
+            "price": {"value": value, "currency": currency.strip() or "USD"},
+            "availability": product.get("availability") or "in stock",
+            "condition": product.get("condition") or "new",
         }
-    
-    @staticmethod
-    def _simulate_product_sync(product: Dict[str, Any]) -> bool:
-        """Simulate product sync (for testing without active Merchant API account)."""
-        # In production: Make actual API call
-        # For now: Return success
-        return True
+        # Optional attributes are left out rather than sent empty
+        for field, column in (("brand", "brand"), ("gtin", "gtin"),
+                              ("googleProductCategory", "google_product_category")):
+            if product.get(column):
+                item[field] = product[column]
+        return item
+
+
+def _try_lock(path: str):
+    """
+    Take an exclusive, non-blocking lock on path.
+
+    Returns the open lock file (closing it releases the lock), or None if
+    another process, or another handle in this one, holds it.
+    """
+    lock_file = open(path, "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+    return lock_file
+
+
+class SyncJobStore:
+    """
+    Merchant sync job records in a JSON file shared by every app process.
+
+    Writes are read-modify-write under an exclusive lock on path + ".lock"
+    and replace the file atomically, so reads need no lock. The last
+    MAX_SYNC_JOBS jobs are kept.
+    """
+
+    def __init__(self, path: str = SYNC_JOBS_FILE):
+        self.path = path
+
+    @contextmanager
+    def _locked(self):
+        with open(self.path + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _read(self) -> "OrderedDict[str, Dict[str, Any]]":
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                jobs = json.load(f).get("jobs", [])
+        except FileNotFoundError:
+            jobs = []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable Merchant sync jobs file {self.path}: {e}")
+            jobs = []
+        return OrderedDict((job["job_id"], job) for job in jobs)
+
+    def save(self, job: Dict[str, Any]):
+        """Add or replace job; a write failure is logged, not raised."""
+        try:
+            with self._locked():
+                jobs = self._read()
+                jobs[job["job_id"]] = job
+                while len(jobs) > MAX_SYNC_JOBS:
+                    jobs.popitem(last=False)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"jobs": list(jobs.values())}, f, separators=(",", ":"))
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not save Merchant sync job {job['job_id']}: {e}")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._read().get(job_id)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        return next(reversed(self._read().values()), None)
 
 
 class MerchantSyncScheduler:
     """
-    Manages periodic synchronization with Merchant Center.
-    
-    Uses APScheduler or simple threading for background sync tasks.
+    Runs Merchant Center syncs on a background thread, off the request path.
+
+    Scheduled syncs (every MERCHANT_API_FEED_SYNC_INTERVAL_MINUTES, on a
+    private schedule.Scheduler driven by its own loop thread) and on-demand
+    syncs from /api/sync-merchant-api run a single sync at a time: a sync
+    requested while another is running is refused, and a scheduled tick that
+    finds one running is skipped.
+
+    This holds across app processes (e.g. gunicorn workers): a sync holds an
+    exclusive lock on the shadow file's ".lock" sibling while it runs, and
+    jobs (id, trigger, status, progress, result) are recorded in a
+    SyncJobStore, so any process can report on a job another one started.
+    Where fcntl is unavailable the lock only covers this process, and the
+    app must run in a single process.
     """
-    
+
     def __init__(self, merchant_client: MerchantAPIClient = None, feed_path: str = "gmc_product_feed.tsv"):
         self.client = merchant_client or MerchantAPIClient()
         self.feed_path = feed_path
         self._running = False
         self._scheduler = None
+        self._loop_thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._jobs = SyncJobStore()
+        # The job this process is running, if any; it holds the sync lock
+        self._active_job = None
+        self._sync_lock_path = SYNC_LOCK_FILE
         self.sync_interval_minutes = int(os.getenv("MERCHANT_API_FEED_SYNC_INTERVAL_MINUTES", "60"))
-    
+
     def start(self):
-        """Start periodic sync scheduler."""
+        """Start the periodic sync loop on a background thread."""
         if not SCHEDULE_AVAILABLE:
             logger.warning("schedule module not installed. Use pip install schedule")
             return False
-        
+        if self._running:
+            return True
+
         try:
             logger.info(f"🕐 Starting Merchant sync scheduler (every {self.sync_interval_minutes} minutes)")
-            
-            # Schedule periodic sync
-            schedule.every(self.sync_interval_minutes).minutes.do(self._sync_task)
-            
+
+            # A private scheduler, so jobs other modules add to the global
+            # one are not run from this thread
+            self._scheduler = schedule.Scheduler()
+            self._scheduler.every(self.sync_interval_minutes).minutes.do(self._sync_task)
+
+            self._stop_event.clear()
+            self._loop_thread = threading.Thread(
+                target=self._run_loop, name="merchant-sync-scheduler", daemon=True
+            )
             self._running = True
+            self._loop_thread.start()
             logger.info("✓ Merchant sync scheduler running")
-            
+
             return True
         except Exception as e:
+            self._running = False
             logger.error(f"Failed to start scheduler: {e}")
             return False
-    
+
+    def _run_loop(self):
+        """Run due scheduled jobs until stop() is called."""
+        while not self._stop_event.is_set():
+            try:
+                self._scheduler.run_pending()
+            except Exception as e:
+                logger.error(f"Merchant sync scheduler tick failed: {e}")
+            idle = self._scheduler.idle_seconds
+            self._stop_event.wait(SCHEDULER_POLL_SECONDS if idle is None
+                                  else min(max(idle, 0), SCHEDULER_POLL_SECONDS))
+
     def _sync_task(self):
-        """Background sync task."""
-        logger.info("🔄 Merchant API periodic sync started...")
-        success, stats = self.client.sync_products_from_feed(self.feed_path)
+        """Scheduled tick: start a sync unless one is already running."""
+        job, started = self.submit(trigger="scheduled")
+        if not started:
+            logger.info(f"⏭️ Skipping scheduled Merchant sync; job {job['job_id']} still running")
+
+    def submit(self, feed_path: Optional[str] = None, full: bool = False,
+               trigger: str = "manual") -> Tuple[Dict[str, Any], bool]:
+        """
+        Start a sync on a background thread.
+
+        Returns (job, True) for the new job, or (running job, False) if a
+        sync is already in progress here or in another process; nothing is
+        started in that case.
+        """
+        with self._lock:
+            if self._active_job is not None:
+                return dict(self._active_job), False
+            lock_file = _try_lock(self._sync_lock_path)
+            if lock_file is None:
+                return self._job_running_elsewhere(), False
+
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "trigger": trigger,
+                "status": "queued",
+                "feed_path": feed_path or self.feed_path,
+                "full": bool(full),
+                "created_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "progress": {},
+                "result": None,
+                "error": None,
+            }
+            self._active_job = job
+            snapshot = dict(job)
+            self._jobs.save(snapshot)
+
+        threading.Thread(
+            target=self._run_job, args=(job, lock_file),
+            name=f"merchant-sync-{job['job_id'][:8]}", daemon=True,
+        ).start()
+        return snapshot, True
+
+    def _job_running_elsewhere(self) -> Dict[str, Any]:
+        """The job another process is running, as far as the job store knows."""
+        latest = self._jobs.latest()
+        if latest and latest["status"] in ("queued", "running"):
+            return latest
+        # Its first record is not written yet
+        return {"job_id": None, "trigger": None, "status": "running", "started_at": None}
+
+    def _running_anywhere(self) -> bool:
+        """Whether a sync is running in this or any other process."""
+        with self._lock:
+            if self._active_job is not None:
+                return True
+        lock_file = _try_lock(self._sync_lock_path)
+        if lock_file is None:
+            return True
+        lock_file.close()
+        return False
+
+    def _run_job(self, job: Dict[str, Any], lock_file):
+        """Run one sync job and record its outcome, then release the sync lock."""
+        logger.info(f"🔄 Merchant API {job['trigger']} sync {job['job_id']} started...")
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            snapshot = dict(job)
+        self._jobs.save(snapshot)
+        last_saved = time.monotonic()
+
+        def track(progress):
+            nonlocal last_saved
+            with self._lock:
+                job["progress"] = {key: progress[key] for key in SYNC_PROGRESS_KEYS}
+                snapshot = dict(job)
+            if time.monotonic() - last_saved >= JOB_PROGRESS_SAVE_SECONDS:
+                self._jobs.save(snapshot)
+                last_saved = time.monotonic()
+
+        try:
+            try:
+                success, stats = self.client.sync_products_from_feed(
+                    job["feed_path"], full=job["full"], lane=job["trigger"], progress=track
+                )
+            except Exception as e:
+                success, stats = False, {"error": str(e)}
+
+            with self._lock:
+                job["status"] = "succeeded" if success else "failed"
+                job["finished_at"] = datetime.now().isoformat()
+                job["result"] = stats
+                job["error"] = None if success else stats.get("error", "Unknown error")
+                job["progress"] = {key: stats[key] for key in SYNC_PROGRESS_KEYS if key in stats}
+                snapshot = dict(job)
+            self._jobs.save(snapshot)
+        finally:
+            lock_file.close()
+            with self._lock:
+                self._active_job = None
+
         if success:
-            logger.info(f"✅ Sync successful: {stats['products_synced']} products")
+            logger.info(
+                f"✅ Sync successful: {stats['products_sent']} changes sent, "
+                f"{stats['products_skipped']} unchanged products skipped"
+            )
         else:
-            logger.error(f"❌ Sync failed: {stats.get('error', 'Unknown error')}")
-    
+            logger.error(f"❌ Sync failed: {job['error']}")
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Copy of a job's record, from whichever process ran it, or None if unknown (or expired)."""
+        with self._lock:
+            if self._active_job is not None and self._active_job["job_id"] == job_id:
+                return dict(self._active_job)
+        return self._settled(self._jobs.get(job_id))
+
+    def _settled(self, job: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """job, marked failed if its record says running but no sync holds the lock."""
+        if job and job["status"] in ("queued", "running") and not self._running_anywhere():
+            return {**job, "status": "failed",
+                    "error": job.get("error") or "Sync process exited before finishing"}
+        return job
+
+    def status(self) -> Dict[str, Any]:
+        """Scheduler state, the running job (if any, in any process) and the latest job."""
+        with self._lock:
+            active = dict(self._active_job) if self._active_job else None
+            next_run = self._scheduler.next_run if self._running and self._scheduler else None
+        latest = self._settled(self._jobs.latest())
+        if active is not None and latest and latest["job_id"] == active["job_id"]:
+            latest = active  # fresher than its last saved progress
+        elif active is None and latest and latest["status"] in ("queued", "running"):
+            active = latest
+        return {
+            "scheduler_running": self._running,
+            "sync_interval_minutes": self.sync_interval_minutes,
+            "next_scheduled_sync": next_run.isoformat() if next_run else None,
+            "active_job": active,
+            "latest_job": latest,
+        }
+
     def stop(self):
-        """Stop scheduler."""
+        """Stop scheduler; a sync already running is left to finish."""
         self._running = False
+        self._stop_event.set()
+        if self._scheduler is not None:
+            self._scheduler.clear()
         logger.info("Merchant sync scheduler stopped")
 
 
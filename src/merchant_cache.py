@@ -0,0 +1,150 @@
+"""
+Merchant Report Cache
+File: src/merchant_cache.py
+Purpose: TTL cache with stale-while-revalidate for Merchant Center reports
+
+Insights and inventory status come from slow remote reporting queries, and
+the admin dashboard asks for the same few reports on every refresh. Entries
+are fresh for `ttl` seconds. After that they are still served, for up to
+`stale_ttl` seconds more, while one background thread fetches a replacement.
+Only a missing or expired entry makes the caller wait, and concurrent
+callers for the same key share a single fetch.
+
+Entries past their stale window are evicted whenever a new one is stored,
+and at most `max_entries` are kept (oldest dropped first), so callers
+cannot grow the cache without bound by varying the key.
+
+A result the loader marks as not cacheable (a report that came back with an
+error) is returned to the callers that waited for it, but never replaces a
+good entry: the stale one keeps being served until a refresh succeeds.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("MERCHANT_API_REPORT_CACHE_TTL_SECONDS", "300"))
+REPORT_CACHE_STALE_SECONDS = float(os.getenv("MERCHANT_API_REPORT_CACHE_STALE_SECONDS", "3600"))
+REPORT_CACHE_MAX_ENTRIES = 64
+
+
+class _Fetch:
+    """One in-flight load that concurrent callers for a key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class StaleWhileRevalidateCache:
+    """Per-key TTL cache that serves stale values while refreshing them."""
+
+    def __init__(self, ttl: float = REPORT_CACHE_TTL_SECONDS,
+                 stale_ttl: float = REPORT_CACHE_STALE_SECONDS,
+                 max_entries: int = REPORT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._fetches: Dict[Hashable, _Fetch] = {}
+        self._counts = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+                        "refreshes": 0, "refresh_failures": 0, "evictions": 0}
+
+    def get(self, key: Hashable, loader: Callable[[], Any],
+            cacheable: Callable[[Any], bool] = lambda value: True) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Return (value, cache info) for key, calling loader() on a miss.
+
+        cache info has "hit", "stale" and "age_seconds" (0 for a value that
+        was just loaded).
+        """
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            age = now - entry[1] if entry else None
+            if entry and age < self.ttl:
+                self._counts["hits"] += 1
+                return entry[0], self._info(True, False, age)
+            if entry and age < self.ttl + self.stale_ttl:
+                self._counts["stale_hits"] += 1
+                if key not in self._fetches:
+                    self._fetches[key] = _Fetch()
+                    threading.Thread(
+                        target=self._load, args=(key, loader, cacheable),
+                        name="merchant-report-refresh", daemon=True,
+                    ).start()
+                return entry[0], self._info(True, True, age)
+
+            fetch = self._fetches.get(key)
+            leader = fetch is None
+            if leader:
+                self._counts["misses"] += 1
+                fetch = self._fetches[key] = _Fetch()
+            else:
+                self._counts["coalesced"] += 1
+
+        if leader:
+            self._load(key, loader, cacheable)
+        else:
+            fetch.done.wait()
+        if fetch.error is not None:
+            raise fetch.error
+        return fetch.value, self._info(False, False, 0.0)
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], cacheable: Callable[[Any], bool]):
+        """Run loader for key and hand its result to everyone waiting on it."""
+        with self._lock:
+            fetch = self._fetches[key]
+            refresh = key in self._entries
+        try:
+            fetch.value = loader()
+        except Exception as e:
+            fetch.error = e
+        with self._lock:
+            stored = fetch.error is None and cacheable(fetch.value)
+            if stored:
+                self._store(key, fetch.value)
+            if refresh:
+                self._counts["refreshes" if stored else "refresh_failures"] += 1
+            del self._fetches[key]
+        if refresh and not stored:
+            logger.warning(f"Merchant report refresh for {key} failed; serving the cached copy")
+        fetch.done.set()
+
+    def _store(self, key: Hashable, value: Any):
+        """Add an entry, evicting expired ones and then the oldest past max_entries."""
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        expired = [k for k, (_, stored_at) in self._entries.items()
+                   if now - stored_at >= self.ttl + self.stale_ttl]
+        for k in expired:
+            del self._entries[k]
+        # Entries are kept in insertion order, so the first ones are the oldest
+        overflow = list(self._entries)[:max(0, len(self._entries) + 1 - self.max_entries)]
+        for k in overflow:
+            del self._entries[k]
+        self._counts["evictions"] += len(expired) + len(overflow)
+        self._entries[key] = (value, now)
+
+    def _info(self, hit: bool, stale: bool, age: float) -> Dict[str, Any]:
+        return {"hit": hit, "stale": stale, "age_seconds": round(age, 1), "ttl_seconds": self.ttl}
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop key (or every entry), so the next get loads afresh."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and hit/miss counters, for get_sync_stats()."""
+        with self._lock:
+            return {"entries": len(self._entries), "ttl_seconds": self.ttl,
+                    "stale_ttl_seconds": self.stale_ttl, **self._counts}
@@ -0,0 +1,172 @@
+"""
+Merchant API Quota Limiter
+File: src/merchant_quota.py
+Purpose: One shared, adaptive request budget for all Merchant API calls
+
+Merchant Center enforces per-minute request quotas per account, so every
+caller in the process (the scheduled product sync, manual syncs from
+/api/sync-merchant-api, and the insights/inventory reports) draws from a
+single token bucket of MERCHANT_API_QUOTA_PER_MINUTE requests.
+
+Callers wait in lanes, and lanes with waiting callers take turns, so a long
+manual sync and the scheduled sync each get half the budget and a report
+request is never stuck behind thousands of upload batches.
+
+The bucket adapts to what the API reports: on 429 / RESOURCE_EXHAUSTED the
+rate is halved and requests pause (for Retry-After when the API sends one),
+and every successful request recovers a little of the configured rate.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+QUOTA_PER_MINUTE = float(os.getenv("MERCHANT_API_QUOTA_PER_MINUTE", "60"))
+QUOTA_BURST = float(os.getenv("MERCHANT_API_QUOTA_BURST", "10"))
+
+LANES = ("scheduled", "manual", "reporting")
+
+# Adaptive rate bounds: never below this share of the configured rate, and
+# each success wins back this share of it
+MIN_RATE_FRACTION = 0.05
+RECOVERY_FRACTION = 0.05
+MAX_THROTTLE_PAUSE_SECONDS = 60.0
+
+
+class MerchantQuotaLimiter:
+    """Token bucket shared by request lanes, with AIMD rate adaptation."""
+
+    def __init__(self, per_minute: float = QUOTA_PER_MINUTE, burst: float = QUOTA_BURST,
+                 lanes: Iterable[str] = LANES):
+        self.max_rate = max(per_minute, 1.0) / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_throttles = 0
+        self.throttled_total = 0
+        self._cond = threading.Condition()
+        self._lanes = list(lanes)
+        self._waiting = {lane: deque() for lane in self._lanes}
+        self._next_lane = 0
+        self._lane_stats = {lane: {"granted": 0, "wait_seconds": 0.0} for lane in self._lanes}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _lane_on_turn(self) -> Optional[str]:
+        """First lane with waiters, starting from the one whose turn it is."""
+        count = len(self._lanes)
+        for offset in range(count):
+            lane = self._lanes[(self._next_lane + offset) % count]
+            if self._waiting[lane]:
+                return lane
+        return None
+
+    def acquire(self, lane: str = "manual", timeout: Optional[float] = None) -> bool:
+        """
+        Wait for one request's worth of quota in lane.
+
+        Returns False if timeout (seconds) passes first; with no timeout it
+        waits as long as the budget requires.
+        """
+        if lane not in self._waiting:
+            raise ValueError(f"Unknown quota lane: {lane}")
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        ticket = object()
+        with self._cond:
+            self._waiting[lane].append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    on_turn = self._lane_on_turn() == lane and self._waiting[lane][0] is ticket
+                    if on_turn and now >= self._paused_until and self.tokens >= 1:
+                        self.tokens -= 1
+                        self._next_lane = (self._lanes.index(lane) + 1) % len(self._lanes)
+                        stats = self._lane_stats[lane]
+                        stats["granted"] += 1
+                        stats["wait_seconds"] += now - start
+                        return True
+                    if on_turn:
+                        delay = max(self._paused_until - now, (1 - self.tokens) / self.rate, 0.001)
+                    else:
+                        delay = 1.0  # woken by notify_all when the turn moves on
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        delay = min(delay, deadline - now)
+                    self._cond.wait(delay)
+            finally:
+                self._waiting[lane].remove(ticket)
+                self._cond.notify_all()
+
+    def throttled(self, retry_after: Optional[float] = None):
+        """Record a 429 / RESOURCE_EXHAUSTED: halve the rate and pause."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            self._consecutive_throttles += 1
+            self.throttled_total += 1
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+            self.tokens = 0.0
+            pause = retry_after if retry_after is not None else min(
+                MAX_THROTTLE_PAUSE_SECONDS, 2 ** (self._consecutive_throttles - 1)
+            )
+            self._paused_until = max(self._paused_until, now + pause)
+            logger.warning(
+                f"Merchant API quota exhausted; pausing {pause:.1f}s at "
+                f"{self.rate * 60:.1f} requests/minute"
+            )
+            self._cond.notify_all()
+
+    def succeeded(self):
+        """Record a request that was not throttled: recover some rate."""
+        with self._cond:
+            self._consecutive_throttles = 0
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_FRACTION)
+
+    def headroom(self) -> Dict[str, Any]:
+        """Current quota state, for get_sync_stats()."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "configured_per_minute": round(self.max_rate * 60, 1),
+                "current_per_minute": round(self.rate * 60, 1),
+                "tokens_available": round(self.tokens, 2),
+                "burst": self.capacity,
+                "headroom_percent": round(100 * self.tokens / self.capacity, 1),
+                "paused_for_seconds": round(max(0.0, self._paused_until - now), 1),
+                "throttled_total": self.throttled_total,
+                "lanes": {
+                    lane: {
+                        "waiting": len(self._waiting[lane]),
+                        "granted": stats["granted"],
+                        "wait_seconds": round(stats["wait_seconds"], 2),
+                    }
+                    for lane, stats in self._lane_stats.items()
+                },
+            }
+
+
+# Global instance
+_quota_limiter = None
+
+
+def get_quota_limiter() -> MerchantQuotaLimiter:
+    """Get or create the process-wide Merchant API quota limiter."""
+    global _quota_limiter
+    if _quota_limiter is None:
+        _quota_limiter = MerchantQuotaLimiter()
+    return _quota_limiter
@@ -0,0 +1,530 @@
+"""
+Merchant Batch Uploader
+File: src/merchant_upload.py
+Purpose: Batched, concurrent product upload to Merchant Center
+
+Products are streamed from the generated TSV feed, grouped into custombatch
+requests (Content API for Shopping `products/batch` shape) of
+MERCHANT_API_BATCH_SIZE entries, and up to MERCHANT_API_UPLOAD_CONCURRENCY
+batches are in flight at once. Only a bounded window of batches is held in
+memory, so large feeds are never loaded whole.
+
+Products are Content API product resources (offerId, channel,
+contentLanguage, targetCountry, camelCase attributes) and are identified
+everywhere, shadow included, by their REST ID
+channel:contentLanguage:targetCountry:offerId, which is also what deletes
+send as productId.
+
+With a MerchantShadowStore the upload is a delta: products whose payload
+hash matches the last successful push are skipped, offers that left the
+feed are deleted, and quota use scales with churn rather than catalog size.
+The shadow is kept per feed, so syncing another feed never deletes this
+one's offers, and a sync that would delete more than
+MERCHANT_API_MAX_DELETE_FRACTION of them (a truncated feed) deletes nothing
+unless it is a full sync.
+
+Given a quota limiter (MerchantAPIClient passes the process-wide one from
+src/merchant_quota.py), every real request first takes a token from it, and
+429 / RESOURCE_EXHAUSTED responses slow it down.
+
+Errors are handled per item: an entry that comes back with a transient error
+(rate limit, backend error) is resent on its own in a smaller follow-up
+batch, while a permanent error (invalid product data) is recorded without
+failing the rest of the batch. Transport errors and 429/5xx responses retry
+the whole batch with jittered exponential backoff.
+
+Without MERCHANT_API_UPLOAD_ENDPOINT the upload is simulated, as the rest of
+the Phase 3 module is until a Merchant Center account is connected.
+benchmarks/bench_merchant_upload.py runs a local fake endpoint for
+benchmarking and for exercising the retry paths offline.
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.merchant_quota import MerchantQuotaLimiter
+
+logger = logging.getLogger(__name__)
+
+CONTENT_API_SCOPE = "https://www.googleapis.com/auth/content"
+
+UPLOAD_ENDPOINT = os.getenv("MERCHANT_API_UPLOAD_ENDPOINT", "")
+BATCH_SIZE = int(os.getenv("MERCHANT_API_BATCH_SIZE", "250"))
+UPLOAD_CONCURRENCY = int(os.getenv("MERCHANT_API_UPLOAD_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.getenv("MERCHANT_API_MAX_RETRIES", "4"))
+RETRY_BACKOFF_SECONDS = float(os.getenv("MERCHANT_API_RETRY_BACKOFF_SECONDS", "1.0"))
+REQUEST_TIMEOUT = float(os.getenv("MERCHANT_API_REQUEST_TIMEOUT", "60"))
+SHADOW_FILE = os.getenv("MERCHANT_API_SHADOW_FILE", "merchant_shadow.json")
+SHADOW_MAX_AGE_DAYS = float(os.getenv("MERCHANT_API_SHADOW_MAX_AGE_DAYS", "20"))
+# Bumped when shadow keys change meaning; a file in another format is ignored
+SHADOW_FORMAT_VERSION = 2
+# A delta sync that would delete more than this share of the pushed offers is
+# taken to come from a truncated feed: its deletes are skipped unless full=True
+MAX_DELETE_FRACTION = float(os.getenv("MERCHANT_API_MAX_DELETE_FRACTION", "0.2"))
+
+# Where uploaded products are listed (part of their REST ID)
+CHANNEL = "online"
+CONTENT_LANGUAGE = os.getenv("MERCHANT_API_CONTENT_LANGUAGE", "en")
+TARGET_COUNTRY = os.getenv("MERCHANT_API_TARGET_COUNTRY", "NG")
+
+# Per-item error reasons worth resending; anything else is a data problem
+TRANSIENT_ERROR_REASONS = {
+    "backendError", "internalError", "rateLimitExceeded", "quotaExceeded",
+    "userRateLimitExceeded", "deadlineExceeded", "unavailable",
+}
+TRANSIENT_ERROR_CODES = {429, 500, 502, 503, 504}
+QUOTA_ERROR_REASONS = {"rateLimitExceeded", "quotaExceeded", "userRateLimitExceeded"}
+
+# Keep the stats returned to API callers small on badly broken feeds
+MAX_REPORTED_ERRORS = 100
+
+
+class TransientUploadError(Exception):
+    """A batch request that failed as a whole and may succeed if resent."""
+
+
+class PermanentUploadError(Exception):
+    """A batch request the endpoint rejected as a whole (bad request, auth)."""
+
+
+def iter_feed_tsv(feed_path: str) -> Iterator[Dict[str, str]]:
+    """Stream product rows from a generated TSV feed."""
+    with open(feed_path, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f, delimiter="\t")
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _is_quota_error(errors: Dict[str, Any]) -> bool:
+    if errors.get("code") == 429 or errors.get("status") == "RESOURCE_EXHAUSTED":
+        return True
+    return any(e.get("reason") in QUOTA_ERROR_REASONS for e in errors.get("errors", []))
+
+
+def _retry_after(response) -> Optional[float]:
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def _is_transient(errors: Dict[str, Any]) -> bool:
+    if errors.get("code") in TRANSIENT_ERROR_CODES:
+        return True
+    return any(e.get("reason") in TRANSIENT_ERROR_REASONS for e in errors.get("errors", []))
+
+
+def create_upload_session(pool_size: int):
+    """
+    requests session for the upload endpoint, pooled for pool_size threads.
+
+    Uses Application Default Credentials (GOOGLE_APPLICATION_CREDENTIALS)
+    when google-auth is installed and configured; otherwise requests are
+    unauthenticated, which is what a local fake endpoint expects. Both are
+    imported here rather than at module load, so the API's cold start does
+    not pay for them.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = None
+    try:
+        import google.auth
+        from google.auth.exceptions import DefaultCredentialsError
+        from google.auth.transport.requests import AuthorizedSession
+    except ImportError:
+        logger.warning("google-auth not installed; sending unauthenticated Merchant upload requests")
+    else:
+        try:
+            credentials, _ = google.auth.default(scopes=[CONTENT_API_SCOPE])
+            session = AuthorizedSession(credentials)
+        except DefaultCredentialsError as e:
+            logger.warning(f"No Google credentials for Merchant upload ({e}); sending unauthenticated requests")
+    if session is None:
+        session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def product_rest_id(product: Dict[str, Any]) -> str:
+    """Content API REST ID of a product: channel:contentLanguage:targetCountry:offerId."""
+    try:
+        return (f"{product['channel']}:{product['contentLanguage']}:"
+                f"{product['targetCountry']}:{product['offerId']}")
+    except KeyError as e:
+        raise ValueError(f"Not a Content API product (no {e.args[0]})") from None
+
+
+def payload_digest(product: Dict[str, Any]) -> str:
+    """Stable hash of a product payload, independent of key order."""
+    payload = json.dumps(product, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class MerchantShadowStore:
+    """
+    Local shadow of what Merchant Center holds: for each product REST ID,
+    the hash of the last successfully pushed payload and when it was pushed.
+
+    The file keeps one shadow per identity (merchant, endpoint and feed);
+    an identity it has no shadow for (including a simulated run) starts
+    empty, so every product is sent once. Entries older than max_age_days
+    are treated as changed, because Merchant Center expires products that
+    are not updated for 30 days.
+    """
+
+    def __init__(self, path: str = SHADOW_FILE, max_age_days: float = SHADOW_MAX_AGE_DAYS):
+        self.path = path
+        self.max_age_seconds = max_age_days * 86400
+        self.identity = None
+        self._offers: Dict[str, List] = {}
+        self._others: Dict[str, Dict[str, List]] = {}
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def load(self, identity: str):
+        """Load the shadow for identity, starting empty if the file has none."""
+        self.identity = identity
+        self._offers = {}
+        self._others = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable Merchant shadow {self.path}: {e}")
+            return
+        if data.get("version") != SHADOW_FORMAT_VERSION:
+            logger.info(f"Merchant shadow {self.path} is in an older format; sending all products")
+            return
+        shadows = data.get("shadows", {})
+        self._offers = shadows.pop(identity, {})
+        self._others = shadows
+        if not self._offers:
+            logger.info(f"Merchant shadow {self.path} has nothing for {identity}; sending all products")
+
+    def save(self):
+        """Atomically write the shadows; a failure only costs a full resend."""
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": SHADOW_FORMAT_VERSION,
+                           "shadows": {**self._others, self.identity: self._offers}}, f,
+                          separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not save Merchant shadow {self.path}: {e}")
+
+    def state(self, rest_id: str, digest: str) -> str:
+        """"new", "current", or "changed" (also when due a refresh)."""
+        entry = self._offers.get(rest_id)
+        if entry is None:
+            return "new"
+        pushed_digest, pushed_at = entry
+        if pushed_digest == digest and time.time() - pushed_at < self.max_age_seconds:
+            return "current"
+        return "changed"
+
+    def record(self, rest_id: str, digest: str, pushed_at: float):
+        self._offers[rest_id] = [digest, pushed_at]
+
+    def discard(self, rest_id: str):
+        self._offers.pop(rest_id, None)
+
+    def rest_ids(self) -> set:
+        return set(self._offers)
+
+
+class MerchantBatchUploader:
+    """Uploads products to Merchant Center in concurrent custombatch requests."""
+
+    def __init__(self, merchant_id: str, endpoint: Optional[str] = None,
+                 batch_size: int = BATCH_SIZE, concurrency: int = UPLOAD_CONCURRENCY,
+                 max_retries: int = MAX_RETRIES, backoff_seconds: float = RETRY_BACKOFF_SECONDS,
+                 session=None, limiter: Optional[MerchantQuotaLimiter] = None):
+        self.merchant_id = merchant_id
+        self.endpoint = UPLOAD_ENDPOINT if endpoint is None else endpoint
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._session = session
+        self.limiter = limiter
+
+    @property
+    def simulated(self) -> bool:
+        return not self.endpoint
+
+    def identity(self, source: Optional[str] = None) -> str:
+        """What a shadow is valid for: this merchant at this endpoint, fed from source."""
+        return f"{self.merchant_id}|{self.endpoint or 'simulated'}|{source or ''}"
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = create_upload_session(self.concurrency)
+        return self._session
+
+    # --- Transport ---
+
+    def _post_entries(self, entries: List[Dict[str, Any]], lane: str) -> List[Dict[str, Any]]:
+        if self.simulated:
+            return [{"batchId": entry["batchId"]} for entry in entries]
+        import requests
+
+        if self.limiter:
+            self.limiter.acquire(lane)
+        try:
+            response = self._get_session().post(
+                self.endpoint, json={"entries": entries}, timeout=REQUEST_TIMEOUT
+            )
+        except requests.RequestException as e:
+            raise TransientUploadError(str(e)) from e
+        if response.status_code == 429:
+            if self.limiter:
+                self.limiter.throttled(_retry_after(response))
+            raise TransientUploadError("HTTP 429 (quota exhausted)")
+        if response.status_code in TRANSIENT_ERROR_CODES:
+            raise TransientUploadError(f"HTTP {response.status_code}")
+        if response.status_code != 200:
+            raise PermanentUploadError(f"HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            return response.json().get("entries", [])
+        except ValueError as e:
+            raise TransientUploadError(f"Invalid response body: {e}") from e
+
+    def _backoff(self, attempt: int):
+        delay = min(30.0, self.backoff_seconds * (2 ** attempt))
+        time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def _upload_batch(self, ops: List[Tuple[str, str, Optional[Dict[str, Any]], Optional[str]]],
+                      lane: str = "manual") -> Dict[str, Any]:
+        """Send one batch of (kind, rest_id, product, digest) operations, resending transient failures."""
+        result = {"done": [], "failed": 0, "retries": 0, "requests": 0, "errors": []}
+        pending = ops
+        last_error = ""
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                result["retries"] += 1
+                self._backoff(attempt - 1)
+            entries = []
+            for i, (kind, rest_id, product, _) in enumerate(pending):
+                entry = {"batchId": i, "merchantId": self.merchant_id}
+                if kind == "delete":
+                    entry.update(method="delete", productId=rest_id)
+                else:
+                    entry.update(method="insert", product=product)
+                entries.append(entry)
+            result["requests"] += 1
+            try:
+                responses = self._post_entries(entries, lane)
+            except TransientUploadError as e:
+                last_error = str(e)
+                continue
+            except PermanentUploadError as e:
+                last_error = str(e)
+                break
+
+            by_batch_id = {entry.get("batchId"): entry for entry in responses}
+            retry = []
+            quota_hit = False
+            for i, op in enumerate(pending):
+                entry = by_batch_id.get(i)
+                if entry is None:
+                    last_error = "No response entry"
+                    retry.append(op)
+                    continue
+                errors = entry.get("errors")
+                # Deleting an offer Merchant Center no longer has is a success
+                if not errors or (op[0] == "delete" and errors.get("code") == 404):
+                    result["done"].append(op)
+                elif _is_transient(errors) or _is_quota_error(errors):
+                    last_error = errors.get("message", "Transient error")
+                    quota_hit = quota_hit or _is_quota_error(errors)
+                    retry.append(op)
+                else:
+                    result["failed"] += 1
+                    result["errors"].append(f"Product {op[1]}: {errors.get('message', errors)}")
+            pending = retry
+            if self.limiter and not self.simulated:
+                if quota_hit:
+                    self.limiter.throttled()
+                else:
+                    self.limiter.succeeded()
+
+        for op in pending:
+            result["failed"] += 1
+            result["errors"].append(f"Product {op[1]}: {last_error or 'upload failed'}")
+        return result
+
+    def _plan(self, rows: Iterable[Dict[str, Any]], convert: Optional[Callable],
+              shadow: Optional["MerchantShadowStore"], full: bool,
+              stats: Dict[str, Any], add_error: Callable[[str], None]):
+        """Yield the operations needed to bring Merchant Center in line with rows."""
+        seen = set()
+        unconverted = set()  # offer IDs of rows convert failed on
+        # Before this run's pushes are recorded into it
+        pushed = len(shadow) if shadow is not None else 0
+        for row in rows:
+            stats["products_read"] += 1
+            try:
+                product = convert(row) if convert else row
+                rest_id = product_rest_id(product)
+            except Exception as e:
+                offer_id = row.get("offerId") or row.get("id") or "unknown"
+                unconverted.add(offer_id)
+                stats["products_failed"] += 1
+                add_error(f"Product {offer_id}: {e}")
+                continue
+            if shadow is None:
+                yield ("insert", rest_id, product, None)
+                continue
+            seen.add(rest_id)
+            digest = payload_digest(product)
+            state = shadow.state(rest_id, digest)
+            if state == "current" and not full:
+                stats["products_skipped"] += 1
+                continue
+            yield ("insert" if state == "new" else "update", rest_id, product, digest)
+
+        if shadow is None:
+            return
+        if not stats["products_read"]:
+            # An empty feed must not delete the whole catalog, even on a full sync
+            if pushed:
+                logger.warning("Feed has no products; not deleting previously pushed offers")
+            return
+        # A row that failed to convert is still in the feed: keep its offer
+        gone = {key for key in shadow.rest_ids() - seen
+                if key.rsplit(":", 1)[-1] not in unconverted}
+        if not full and len(gone) > pushed * MAX_DELETE_FRACTION:
+            # Most likely a truncated feed rather than a catalog that shrank
+            stats["deletes_skipped"] = len(gone)
+            message = (f"Feed is missing {len(gone)} of {pushed} previously pushed offers; "
+                       f"not deleting them (over {MAX_DELETE_FRACTION:.0%}, run a full sync to apply)")
+            logger.warning(message)
+            add_error(message)
+            return
+        for rest_id in gone:
+            yield ("delete", rest_id, None, None)
+
+    # --- Public API ---
+
+    def upload(self, rows: Iterable[Dict[str, Any]],
+               convert: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+               progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+               shadow: Optional["MerchantShadowStore"] = None,
+               full: bool = False, lane: str = "manual",
+               source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Upload products; return aggregate stats.
+
+        rows is consumed lazily: at most 2 * concurrency batches are
+        materialized at a time. convert, if given, turns a row into a
+        Content API product (with offerId, channel, contentLanguage and
+        targetCountry); a row it raises on is counted as failed. progress, if given, is called with the running stats after
+        each batch completes.
+
+        With a shadow store only products whose payload changed since the
+        last successful push (or that are due a refresh) are sent, offers
+        that disappeared from rows are deleted, and the store is updated
+        with what succeeded. The shadow used is the one for source (the feed
+        rows come from). Deletes of more than MAX_DELETE_FRACTION of the
+        shadow are skipped (reported as deletes_skipped) unless full=True,
+        which also resends every product.
+
+        Requests draw on the uploader's quota limiter in lane ("scheduled"
+        or "manual"), if it has one.
+        """
+        start = time.time()
+        stats = {
+            "products_read": 0,
+            "products_synced": 0,
+            "products_failed": 0,
+            "products_skipped": 0,
+            "products_sent": 0,
+            "inserted": 0,
+            "updated": 0,
+            "deleted": 0,
+            "batches": 0,
+            "requests": 0,
+            "retries": 0,
+            "errors": [],
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "simulated": self.simulated,
+            "delta": shadow is not None and not full,
+            "deletes_skipped": 0,
+        }
+
+        def add_error(message):
+            if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                stats["errors"].append(message)
+
+        if shadow is not None:
+            shadow.load(self.identity(source))
+        if not self.simulated:
+            self._get_session()  # once, before the worker threads share it
+        batches = _batched(self._plan(rows, convert, shadow, full, stats, add_error), self.batch_size)
+
+        def record(result):
+            stats["batches"] += 1
+            stats["products_failed"] += result["failed"]
+            stats["requests"] += result["requests"]
+            stats["retries"] += result["retries"]
+            now = time.time()
+            for kind, rest_id, _, digest in result["done"]:
+                stats["deleted" if kind == "delete" else "inserted" if kind == "insert" else "updated"] += 1
+                if shadow is not None:
+                    if kind == "delete":
+                        shadow.discard(rest_id)
+                    else:
+                        shadow.record(rest_id, digest, now)
+            for message in result["errors"]:
+                add_error(message)
+            if progress:
+                progress(stats)
+
+        def submit(executor, batch):
+            stats["products_sent"] += len(batch)
+            return executor.submit(self._upload_batch, batch, lane)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                in_flight = {submit(executor, batch) for batch in islice(batches, 2 * self.concurrency)}
+                while in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(future.result())
+                    for batch in islice(batches, len(done)):
+                        in_flight.add(submit(executor, batch))
+        finally:
+            # Keep whatever was pushed, even if the run was cut short
+            if shadow is not None:
+                shadow.save()
+
+        stats["products_synced"] = stats["inserted"] + stats["updated"]
+        elapsed = time.time() - start
+        stats["duration_seconds"] = elapsed
+        stats["products_per_sec"] = round(stats["products_sent"] / elapsed, 1) if elapsed > 0 else 0.0
+        return stats
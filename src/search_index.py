@@ -0,0 +1,165 @@
+"""
+Product Search Index
+File: src/search_index.py
+Purpose: Tokenized inverted index for catalog text search
+
+Latin text is split into lowercase words; CJK text (the Chinese titles and
+descriptions CJ returns) has no word boundaries, so each run of CJK characters
+is indexed as overlapping character bigrams plus its single characters, so a
+one-character query matches wherever that character appears, not only at the
+start of a bigram. Queries are AND-ed across terms, every term is matched as
+a prefix, and results are ranked by field weight.
+"""
+
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+# CJK Unified Ideographs + Extension A
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+# Field name -> score contributed by each occurrence of a term in that field
+DEFAULT_FIELD_WEIGHTS = {
+    "title": 3.0,
+    "title_zh": 3.0,
+    "brand": 2.0,
+    "category": 2.0,
+    "description": 1.0,
+    "description_zh": 1.0,
+}
+
+
+def tokenize(text: str, unigrams: bool = False) -> List[str]:
+    """
+    Split text into terms: lowercase words and CJK bigrams.
+
+    A CJK run of one character is its own term. With unigrams=True (used
+    when indexing) every CJK character is also emitted on its own; queries
+    leave it off, since a run's bigrams already imply its characters.
+    """
+    if not text:
+        return []
+    terms = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+                if unigrams:
+                    terms.extend(run)
+        else:
+            terms.append(run)
+    return terms
+
+
+def index_document(postings: Dict[str, Dict[int, float]], doc_id: int,
+                   doc: Mapping[str, str], field_weights: Mapping[str, float] = None):
+    """Add the weighted text fields of one document to a postings dict."""
+    for field, weight in (field_weights or DEFAULT_FIELD_WEIGHTS).items():
+        for term in tokenize(doc.get(field) or "", unigrams=True):
+            entry = postings.setdefault(term, {})
+            entry[doc_id] = entry.get(doc_id, 0.0) + weight
+
+
+class InvertedIndex:
+    """
+    Term -> {doc_id: score} postings over a fixed list of documents.
+
+    Doc IDs are positions in the sequence the index was built from.
+    """
+
+    def __init__(self, postings: Dict[str, Dict[int, float]]):
+        self._postings = postings
+        self._vocab: Sequence[str] = sorted(postings)
+
+    @classmethod
+    def build(cls, docs: Sequence[Mapping[str, str]],
+              field_weights: Mapping[str, float] = None) -> "InvertedIndex":
+        """Index the weighted text fields of each document."""
+        postings: Dict[str, Dict[int, float]] = {}
+        for doc_id, doc in enumerate(docs):
+            index_document(postings, doc_id, doc, field_weights)
+        return cls(postings)
+
+    def __len__(self) -> int:
+        return len(self._vocab)
+
+    def _postings_at(self, i: int) -> Mapping[int, float]:
+        """Postings of the i-th term in sorted vocabulary order."""
+        return self._postings[self._vocab[i]]
+
+    def _expand(self, prefix: str) -> Iterable[Tuple[str, Mapping[int, float]]]:
+        """Yield (term, postings) for every indexed term starting with prefix."""
+        vocab = self._vocab
+        i = bisect_left(vocab, prefix)
+        while i < len(vocab):
+            term = vocab[i]
+            if not term.startswith(prefix):
+                break
+            yield term, self._postings_at(i)
+            i += 1
+
+    def _match_term(self, term: str) -> Dict[int, float]:
+        """Docs matching a single query term, scored by best expansion."""
+        matches: Dict[int, float] = {}
+        # The exact term, if indexed, sorts first among its expansions
+        for expanded, postings in self._expand(term):
+            if expanded == term:
+                matches.update(postings)
+                continue
+            for doc_id, score in postings.items():
+                # Prefix hits count for less than an exact term hit
+                score *= 0.5
+                if score > matches.get(doc_id, 0.0):
+                    matches[doc_id] = score
+        return matches
+
+    def search_scored(self, query: str) -> List[Tuple[int, float]]:
+        """Return (doc_id, score) pairs matching every query term, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        per_term = [self._match_term(term) for term in terms]
+        per_term.sort(key=len)
+        if not per_term[0]:
+            return []
+
+        scores = dict(per_term[0])
+        for matches in per_term[1:]:
+            scores = {
+                doc_id: score + matches[doc_id]
+                for doc_id, score in scores.items()
+                if doc_id in matches
+            }
+            if not scores:
+                return []
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def search(self, query: str) -> List[int]:
+        """Return doc IDs matching every query term, best first."""
+        return [doc_id for doc_id, _ in self.search_scored(query)]
+
+
+class MappedInvertedIndex(InvertedIndex):
+    """
+    InvertedIndex over flat arrays, e.g. memoryviews of a mapped file.
+
+    vocab is the sorted term list; the postings of term i are
+    doc_ids[offsets[i]:offsets[i + 1]] with matching scores.
+    """
+
+    def __init__(self, vocab: Sequence[str], offsets: Sequence[int],
+                 doc_ids: Sequence[int], scores: Sequence[float]):
+        self._vocab = vocab
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._scores = scores
+
+    def _postings_at(self, i: int) -> Mapping[int, float]:
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return dict(zip(self._doc_ids[start:end], self._scores[start:end]))
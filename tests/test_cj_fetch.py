@@ -0,0 +1,146 @@
+"""
+Concurrent CJ fetch (fetch_cjdropshipping_to_csv.fetch_all_pages) against
+the stub CJ API in benchmarks/bench_cj_fetch.py: rate ceiling, jittered
+retries on 429/5xx, and pages that exhaust their retries. Also the
+incremental sync picking up products created between runs.
+"""
+
+import csv
+import importlib
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.bench_cj_fetch import peak_rate, reset, start_stub_cj_server  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def stub():
+    return start_stub_cj_server(total=2000)
+
+
+@pytest.fixture
+def cj(stub, tmp_path, monkeypatch):
+    """The fetcher module, pointed at the stub and writing its files under tmp_path."""
+    monkeypatch.chdir(tmp_path)  # the module logs to fetch_cjdropshipping.log on import
+    monkeypatch.setenv("CJ_API_ENDPOINT", stub.endpoint)
+    module = importlib.import_module("fetch_cjdropshipping_to_csv")
+    monkeypatch.setattr(module, "API_BASE_URL", stub.endpoint)
+    monkeypatch.setattr(module, "API_URL", f"{stub.endpoint}/product/list")
+    monkeypatch.setattr(module, "CATEGORY_URL", f"{stub.endpoint}/product/getCategory")
+    monkeypatch.setattr(module, "token_manager", module.CJTokenManager(str(tmp_path / "token.json")))
+    reset(stub)
+    stub.fail_pages = {}
+    yield module
+    module.token_manager.stop()
+
+
+def fetch(cj, **kwargs):
+    failed = []
+    session = cj.create_session(kwargs.get("concurrency", 6))
+    try:
+        pages = list(cj.fetch_all_pages(session=session, failed_pages=failed, **kwargs))
+    finally:
+        session.close()
+    return pages, failed
+
+
+def test_rate_ceiling_holds_across_threads(cj, stub):
+    rate = 20
+    cj.token_manager.get_token()  # keep the auth request out of the measurement
+    start = time.monotonic()
+    pages, failed = fetch(cj, max_offset=1000, concurrency=8, limiter=cj.RateLimiter(rate))
+    elapsed = time.monotonic() - start
+
+    assert not failed
+    assert [n for n, _ in pages] == list(range(1, 21))
+    assert sum(len(page) for _, page in pages) == 1000
+    assert len(stub.request_times) == 20
+    # 20 request starts spaced 1/rate apart take at least 19/rate seconds
+    assert elapsed >= 19 / rate * 0.95
+    assert peak_rate(stub.request_times) <= rate + 1
+
+
+def test_transient_errors_are_retried_with_jittered_backoff(cj, stub, caplog):
+    stub.fail_pages = {3: [429, 503], 5: [500]}
+    with caplog.at_level(logging.WARNING):
+        pages, failed = fetch(cj, max_offset=500, concurrency=4)
+
+    assert not failed
+    assert [n for n, _ in pages] == list(range(1, 11))
+    assert max(stub.served.values()) == 1 and len(stub.served) == 500
+    assert stub.errors == {429: 1, 503: 1, 500: 1}
+
+    delays = {}
+    for record in caplog.records:
+        match = re.search(r"on page (\d+) \(HTTP (\d+)\); retrying in ([\d.]+)s", record.getMessage())
+        if match:
+            delays.setdefault(int(match.group(1)), []).append((int(match.group(2)), float(match.group(3))))
+    assert [status for status, _ in delays[3]] == [429, 503]
+    assert [status for status, _ in delays[5]] == [500]
+    # Attempt n waits 0.5 * 2**n seconds, scaled by a random factor in [0.5, 1.5]
+    for attempts in delays.values():
+        for attempt, (_, delay) in enumerate(attempts):
+            base = 0.5 * 2 ** attempt
+            assert base * 0.5 - 0.05 <= delay <= base * 1.5 + 0.05
+
+
+def test_pages_that_exhaust_retries_are_reported(cj, stub, monkeypatch):
+    monkeypatch.setattr(cj.time, "sleep", lambda seconds: None)  # skip the backoff waits
+    stub.fail_pages = {4: [503] * (cj.FETCH_MAX_RETRIES + 1)}
+    pages, failed = fetch(cj, max_offset=500, concurrency=4)
+
+    assert failed == [4]
+    assert [n for n, _ in pages] == [1, 2, 3, 5, 6, 7, 8, 9, 10]
+
+
+def feed_pids():
+    with open("feed.csv", newline="", encoding="utf-8") as f:
+        return [row["url"].rsplit("/", 1)[-1] for row in csv.DictReader(f)]
+
+
+def create_product(cj, stub, monkeypatch, index):
+    """Make product `index` exist on the stub, created just now."""
+    monkeypatch.setattr(stub, "total", index + 1)
+    monkeypatch.setattr(stub, "created", {index: datetime.now().strftime(cj.CREATE_TIME_FORMAT)})
+
+
+def test_incremental_sync_adds_products_created_between_runs(cj, stub, monkeypatch):
+    monkeypatch.setattr(stub, "total", 120)
+    cj.fetch_and_update()
+    assert len(feed_pids()) == 120
+    assert cj.incremental_sync(rotation=0)["added"] == 0
+
+    create_product(cj, stub, monkeypatch, 120)
+    summary = cj.incremental_sync(rotation=0)
+
+    assert summary["added"] == 1 and summary["removed"] == 0
+    pids = feed_pids()
+    assert len(pids) == 121 and pids[-1] == "STUB1000120"
+
+
+def test_incremental_sync_trims_oldest_products_at_the_cap(cj, stub, monkeypatch):
+    monkeypatch.setattr(stub, "total", 120)
+    monkeypatch.setattr(cj, "MAX_OFFSET", 120)
+    cj.fetch_and_update()
+
+    create_product(cj, stub, monkeypatch, 120)
+    summary = cj.incremental_sync(rotation=0)
+
+    assert summary["added"] == 1 and summary["removed"] == 1
+    pids = feed_pids()
+    assert len(pids) == 120
+    assert "STUB1000120" in pids and "STUB1000000" not in pids
+
+    # Rotation finds the trimmed product again, but with the feed full it stays out
+    summary = cj.incremental_sync(rotation=1)
+    assert summary["added"] == 0 and summary["removed"] == 0
+    assert len(feed_pids()) == 120